@@ -1,63 +1,428 @@
-import pandas as pd
-import io
-from fastapi import APIRouter, UploadFile, File, Form
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Optional, Union
+from fastapi import APIRouter, Header, HTTPException, Query, Response, UploadFile, File, Form
 from app.models.sales import (
     SalesUploadResponse, 
     SalesHistoryResponse, 
     SalesDataResponse, 
-    PredictDemandResponse
+    PredictDemandResponse,
+    PredictDemandBatchResponse,
+    PredictDemandOutletsResponse,
+    OutletsResponse,
+    OutletHistoryTotalsResponse,
+    IngestJobResponse
 )
 
-from app.services.sales_service import SalesService
+from app.services.etl_pool import EtlPool, EtlPoolClosed, EtlPoolSaturated
+from app.services.ingest_jobs import IngestJobManager
+from app.services.outlet_registry import Outlet, OutletRegistry
+from app.services.sales_service import SalesService, process_sales_file
+from app.services.prediction_service import PredictionService
+from app.api.weather import weather_service
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 sales_service = SalesService()
 
+# Models are loaded here, once, when the application starts
+prediction_service = PredictionService(sales_service)
+
+# Upper bound on dates per batch prediction request
+MAX_BATCH_DATES = 366
+
+# Uploads are parsed and aggregated here, never on the event loop
+etl_pool = EtlPool()
+
+# Seconds a client should wait before retrying a rejected upload
+ETL_RETRY_AFTER = 5
+
+# Background ingestion jobs (upload-history with async_mode)
+ingest_jobs = IngestJobManager(sales_service, etl_pool)
+
+# Per-outlet partitions; the services above are the default outlet's
+outlets = OutletRegistry(Outlet(OutletRegistry.DEFAULT_OUTLET, sales_service, prediction_service, ingest_jobs))
+
+def get_outlet(outlet: Optional[str], create: bool = False) -> Outlet:
+    """Services of the requested outlet (the default one when omitted)"""
+    try:
+        return outlets.get(outlet, create=create)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown outlet: {outlet}")
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in candidates]
+
+
 @router.get("/history", response_model=SalesHistoryResponse)
-async def get_sales_history():
+async def get_sales_history(
+    response: Response,
+    start_date: Optional[str] = Query(None, description="First date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="Last date in YYYY-MM-DD format"),
+    offset: int = Query(0, ge=0, description="Number of dates to skip"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of dates to return"),
+    outlet: Optional[str] = Query(None, description="Outlet name (default outlet when omitted)"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    Get list of available sales history dates
+    Get list of available sales history dates, newest first
+    
+    Parameters:
+    - start_date / end_date: Optional inclusive date range
+    - offset / limit: Pagination over the matching dates
+    - outlet: Outlet whose history to list
+    
+    Responds 304 when the If-None-Match header matches the current ETag.
     """
+    sales = get_outlet(outlet).sales
+    try:
+        snapshot = sales.historical_snapshot()
+        lo, hi = snapshot.date_range(start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    etag = f'"{snapshot.digest[:16]}-{lo}-{hi}-{offset}-{limit}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Newest first: walk the sorted date array backwards from hi
+    stop = max(lo, hi - offset)
+    start = max(lo, stop - limit)
+    dates = snapshot.dates[start:stop][::-1].astype(str).tolist()
+
+    response.headers["ETag"] = etag
     return SalesHistoryResponse(
-        message="Sales history endpoint - placeholder",
-        available_dates=["2025-07-06", "2025-07-05", "2025-07-04"]  # Mock data
+        message=f"{hi - lo} sales history dates available",
+        available_dates=dates,
+        total=hi - lo,
+        offset=offset,
+        limit=limit
     )
 
 
 @router.get("/data/{date}", response_model=SalesDataResponse)
-async def get_sales_data(date: str):
+async def get_sales_data(
+    date: str,
+    response: Response,
+    outlet: Optional[str] = Query(None, description="Outlet name (default outlet when omitted)"),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Get sales data for a specific date
     
     Parameters:
     - date: Date in YYYY-MM-DD format
+    - outlet: Outlet whose upload to return
+    
+    Returns the ingredient pivot and the cleaned product lines of the upload.
+    Responds 304 when the If-None-Match header matches the current ETag.
     """
+    try:
+        date = prediction_service.parse_date(date).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+    sales = get_outlet(outlet).sales
+    snapshot = sales.historical_snapshot()
+    i = snapshot.index_of(date)
+    lines_version = sales.line_store.day_version(date)
+    if i is None and lines_version is None:
+        raise HTTPException(status_code=404, detail=f"No sales data for {date}")
+
+    pivot_version = snapshot.row_digest(i) if i is not None else ""
+    etag = f'"{hashlib.sha1(f"{pivot_version}:{lines_version}".encode()).hexdigest()[:16]}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    response.headers["ETag"] = etag
     return SalesDataResponse(
-        message=f"Sales data for {date} - placeholder",
+        message=f"Sales data for {date}",
         sales_date=date,
-        data={"placeholder": "This will contain actual sales data"}
+        data={
+            "ingredients": snapshot.row(i) if i is not None else {},
+            "products": sales.line_store.get_day(date) if lines_version else []
+        }
     )
 
 
 @router.post("/predict-demand", response_model=PredictDemandResponse)
-async def predict_demand(date: str = Form(..., description="Date for demand prediction in YYYY-MM-DD format")):
+async def predict_demand(
+    date: str = Form(..., description="Date for demand prediction in YYYY-MM-DD format"),
+    location: Optional[str] = Form(None, description="Outlet location for weather features"),
+    api_key: Optional[str] = Form(None, description="Visual Crossing Weather API key"),
+    outlet: Optional[str] = Form(None, description="Outlet name (default outlet when omitted)")
+):
     """
     Predict demand for a specific date
     
     Parameters:
     - date: Date for prediction in YYYY-MM-DD format
+    - location: Location used to fetch weather features (optional)
+    - api_key: Visual Crossing API key, required together with location
+    - outlet: Outlet whose history the prediction is based on
+    
+    Without location and api_key the weather features are left missing.
     """
+    try:
+        prediction_service.parse_date(date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    predictions = get_outlet(outlet).predictions
+
+    weather_day = None
+    if location and api_key:
+        weather_data = await weather_service.fetch_weather_data(location, date, date, api_key)
+        weather_day = (weather_data.get('days') or [None])[0]
+
+    prediction = predictions.predict(date, weather_day)
+
     return PredictDemandResponse(
-        message=f"Demand prediction for {date} - placeholder",
+        message=f"Demand prediction for {date}",
         sales_date=date,
-        prediction={"placeholder": "This will contain AI prediction results"}
+        prediction=prediction
+    )
+
+
+async def batch_inputs(start_date: Optional[str], end_date: Optional[str], dates: Optional[str],
+                       location: Optional[str], api_key: Optional[str]):
+    """Validated dates and their weather records for a multi-date prediction"""
+    date_list = [d.strip() for d in dates.split(',') if d.strip()] if dates else []
+    try:
+        days = prediction_service.expand_dates(start_date, end_date, date_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid dates: {e}. Use YYYY-MM-DD")
+
+    if not days:
+        raise HTTPException(status_code=400, detail="Provide start_date and/or dates")
+    if len(days) > MAX_BATCH_DATES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_DATES} dates per request")
+
+    weather_days = None
+    if location and api_key:
+        # Only the requested dates: sparse dates must not pay for the days between them
+        results = await asyncio.gather(*(
+            weather_service.fetch_weather_data(location, first, last, api_key)
+            for first, last in prediction_service.date_runs(days)
+        ))
+        weather_days = {day['datetime']: day for data in results for day in data.get('days', [])}
+    return days, weather_days
+
+
+@router.post("/predict-demand/batch", response_model=PredictDemandBatchResponse)
+async def predict_demand_batch(
+    start_date: Optional[str] = Form(None, description="First date of the range in YYYY-MM-DD format"),
+    end_date: Optional[str] = Form(None, description="Last date of the range in YYYY-MM-DD format"),
+    dates: Optional[str] = Form(None, description="Comma-separated list of dates in YYYY-MM-DD format"),
+    location: Optional[str] = Form(None, description="Outlet location for weather features"),
+    api_key: Optional[str] = Form(None, description="Visual Crossing Weather API key"),
+    outlet: Optional[str] = Form(None, description="Outlet name (default outlet when omitted)")
+):
+    """
+    Predict demand for many dates in one request
+    
+    Parameters:
+    - start_date / end_date: Inclusive date range (end_date defaults to start_date)
+    - dates: Comma-separated list of dates, combined with the range if both are given
+    - location: Location used to fetch weather features (optional)
+    - api_key: Visual Crossing API key, required together with location
+    - outlet: Outlet whose history the predictions are based on
+    
+    Features for all dates are built in one pass and each model runs once.
+    """
+    service = get_outlet(outlet).predictions
+    days, weather_days = await batch_inputs(start_date, end_date, dates, location, api_key)
+
+    predictions = service.predict_many(days, weather_days)
+
+    return PredictDemandBatchResponse(
+        message=f"Demand prediction for {len(days)} dates",
+        dates=days,
+        predictions=predictions
     )
 
 
-@router.post("/upload-history", response_model=SalesUploadResponse)
+@router.post("/predict-demand/outlets", response_model=PredictDemandOutletsResponse)
+async def predict_demand_outlets(
+    start_date: Optional[str] = Form(None, description="First date of the range in YYYY-MM-DD format"),
+    end_date: Optional[str] = Form(None, description="Last date of the range in YYYY-MM-DD format"),
+    dates: Optional[str] = Form(None, description="Comma-separated list of dates in YYYY-MM-DD format"),
+    location: Optional[str] = Form(None, description="Location for weather features, shared by all outlets"),
+    api_key: Optional[str] = Form(None, description="Visual Crossing Weather API key"),
+    outlet_names: Optional[str] = Form(None, description="Comma-separated outlets (all outlets when omitted)")
+):
+    """
+    Predict demand for many dates at every outlet, outlets in parallel
+    
+    Parameters are those of /sales/predict-demand/batch; outlet_names limits
+    the fan-out. Returns each outlet's predictions plus their sum per date.
+    """
+    names = None
+    if outlet_names:
+        names = [get_outlet(name).name for name in outlet_names.split(',') if name.strip()]
+    days, weather_days = await batch_inputs(start_date, end_date, dates, location, api_key)
+
+    by_outlet = await asyncio.to_thread(outlets.predict_all, days, weather_days, names)
+    totals = {
+        day: {
+            target: round(sum(predictions[day][target] for predictions in by_outlet.values()), 2)
+            for target in next(iter(by_outlet.values()))[day]
+        }
+        for day in days
+    }
+
+    return PredictDemandOutletsResponse(
+        message=f"Demand prediction for {len(days)} dates at {len(by_outlet)} outlets",
+        dates=days,
+        outlets=by_outlet,
+        totals=totals
+    )
+
+
+@router.get("/outlets", response_model=OutletsResponse)
+async def get_outlets():
+    """Outlets with stored history and their number of dates"""
+    counts = await asyncio.to_thread(
+        outlets.fan_out, lambda outlet: len(outlet.sales.historical_snapshot().dates)
+    )
+    return OutletsResponse(
+        message=f"{len(counts)} outlets",
+        outlets=list(counts),
+        dates_per_outlet=counts
+    )
+
+
+@router.get("/outlets/history", response_model=OutletHistoryTotalsResponse)
+async def get_outlet_history_totals(
+    start_date: Optional[str] = Query(None, description="First date in YYYY-MM-DD format"),
+    end_date: Optional[str] = Query(None, description="Last date in YYYY-MM-DD format")
+):
+    """Ingredient quantities summed over every outlet per date, partitions read in parallel"""
+    try:
+        totals = await asyncio.to_thread(outlets.history_totals, start_date, end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    return OutletHistoryTotalsResponse(
+        message=f"Ingredient totals for {len(totals)} dates",
+        outlets=outlets.names(),
+        totals=totals
+    )
+
+
+@router.get("/models")
+async def get_models():
+    """Active model versions (file hashes) and hot-reload state"""
+    return prediction_service.registry.describe()
+
+
+@router.get("/predict-demand/cache/stats")
+async def get_prediction_cache_stats(
+    outlet: Optional[str] = Query(None, description="Outlet name (default outlet when omitted)")
+):
+    """Prediction cache hit rate, invalidations and size"""
+    service = get_outlet(outlet).predictions
+    stats = service.prediction_cache.stats()
+    stats["model_version"] = service.registry.version
+    return stats
+
+
+async def run_upload_etl(sales: SalesService, date: str, file: UploadFile) -> dict:
+    """Run the upload ETL of one outlet on the worker pool"""
+    if not etl_pool.uses_processes:
+        # Starlette has already spooled the upload to a temporary file;
+        # a worker thread parses it from there in fixed-size chunks
+        return await etl_pool.run(sales.process_sales_stream, date, file.file)
+
+    # Worker processes cannot share the spooled file, so hand them a copy on disk
+    def save_copy() -> str:
+        with tempfile.NamedTemporaryFile(dir=sales.data_dir, suffix='.upload', delete=False) as tmp:
+            shutil.copyfileobj(file.file, tmp)
+        return tmp.name
+
+    path = await asyncio.to_thread(save_copy)
+    try:
+        result = await etl_pool.run(process_sales_file, sales.data_dir, date, path)
+    finally:
+        os.remove(path)
+    # The worker wrote to the store from another process; rereading it must not block the loop
+    await asyncio.to_thread(sales.history_cache.reload)
+    return result
+
+
+async def check_new_outlet_upload(date: str, file: UploadFile):
+    """Dry-run the ETL over an upload without writing anything; 400 if it does not parse"""
+    def dry_run():
+        try:
+            chunks = sales_service.read_sales_csv(file.file, sales_service.STREAM_CHUNK_ROWS)
+            sales_service.aggregate_sales_chunks(date, chunks)
+        finally:
+            file.file.seek(0)
+
+    try:
+        await asyncio.to_thread(dry_run)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sales export: {e}")
+
+
+@router.get("/etl/stats")
+async def get_etl_stats():
+    """ETL worker pool queue depth, counters and latencies"""
+    return etl_pool.stats()
+
+
+def job_response(job: dict, message: str, outlet: str = OutletRegistry.DEFAULT_OUTLET) -> IngestJobResponse:
+    result = job['result'] or {}
+    progress = 1.0 if job['status'] == 'succeeded' else (
+        job['bytes_read'] / job['bytes_total'] if job['bytes_total'] else 0.0)
+    return IngestJobResponse(
+        message=message,
+        job_id=job['job_id'],
+        status=job['status'],
+        status_url=f"/sales/jobs/{job['job_id']}" + (
+            "" if outlet == OutletRegistry.DEFAULT_OUTLET else f"?outlet={outlet}"),
+        outlet=outlet,
+        sales_date=job['sales_date'],
+        filename=job['filename'] or "",
+        bytes_total=job['bytes_total'],
+        bytes_read=job['bytes_read'],
+        rows_read=job['rows_read'],
+        progress=round(min(progress, 1.0), 4),
+        created_at=job['created_at'],
+        started_at=job['started_at'],
+        finished_at=job['finished_at'],
+        num_unique_products=result.get('num_unique_products', 0),
+        ingredients_needed=result.get('ingredients_needed', {}),
+        error=job['error']
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(
+    job_id: str,
+    outlet: Optional[str] = Query(None, description="Outlet the upload was made for")
+):
+    """Status, progress and result of a background upload job"""
+    target = get_outlet(outlet)
+    job = target.jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_response(job, f"Upload job for {job['sales_date']} is {job['status']}", target.name)
+
+
+@router.post("/upload-history", response_model=Union[SalesUploadResponse, IngestJobResponse])
 async def upload_sales_history(
+    response: Response,
     date: str = Form(...),
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    async_mode: bool = Form(False, description="Queue the upload as a background job and return its id"),
+    outlet: Optional[str] = Form(None, description="Outlet the sales belong to (default outlet when omitted)")
 ):
     """
     Upload and process sales history using ETL logic
@@ -68,28 +433,51 @@ async def upload_sales_history(
     - Maps menu items to ingredient requirements
     - Updates historical ingredient tracking
     - Creates daily ingredient summaries
-    """
-    content = await file.read()
     
-    # Read CSV with proper handling of the format (skip header rows, set column names)
-    df = pd.read_csv(io.BytesIO(content), skiprows=2, names=["PRODUK", "JUMLAH", "HARGA"])
+    With async_mode the file is persisted and a job id is returned right away
+    (202); poll /sales/jobs/{job_id}. The same date and content map to the same job,
+    which is run again if another upload for that date came in since.
     
-    # Remove the first row if it contains the column headers
-    if len(df) > 0 and str(df.iloc[0]['PRODUK']).upper() == 'PRODUK':
-        df = df.iloc[1:].reset_index(drop=True)
+    Each outlet has its own history partition; a new outlet name creates one,
+    once its first upload has been checked to parse.
+    """
+    try:
+        date = SalesService.canonical_date(date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    try:
+        new_outlet = not outlets.exists(outlet)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if new_outlet:
+        await check_new_outlet_upload(date, file)
+
+    target = get_outlet(outlet, create=True)
+    if async_mode:
+        job, created = await target.jobs.submit(date, file.file, file.filename)
+        response.status_code = 202 if created else 200
+        message = "Upload queued for processing" if created else "Upload already submitted"
+        return job_response(job, message, target.name)
 
-    result = sales_service.process_sales_history(date, df)
+    try:
+        result = await run_upload_etl(target.sales, date, file)
+    except EtlPoolSaturated:
+        raise HTTPException(status_code=429, detail="Too many uploads in progress, retry later",
+                            headers={"Retry-After": str(ETL_RETRY_AFTER)})
+    except EtlPoolClosed:
+        raise HTTPException(status_code=503, detail="Server is shutting down",
+                            headers={"Retry-After": str(ETL_RETRY_AFTER)})
 
     return SalesUploadResponse(
         message=f"Sales history uploaded and processed for {date} using ETL logic",
         sales_date=date,
+        outlet=target.name,
         filename=file.filename,
         status="success",
         unique_products=result["unique_products"],
         num_unique_products=result["num_unique_products"],
         perishable_products=result["perishable_products"],
         non_perishable_products=result["non_perishable_products"],
-        # ingredient_summary_file=result["ingredient_summary_file"],
         historical_file=result["historical_file"],
         ingredients_needed=result["ingredients_needed"]
     )
\ No newline at end of file
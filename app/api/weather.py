@@ -1,13 +1,52 @@
-from fastapi import APIRouter, HTTPException, Query
+import json
+import zlib
+from typing import Iterable, Iterator, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
-import io
+from app.services.weather_prewarm import WeatherPrewarmer
 from app.services.weather_service import WeatherService
-from app.models.weather import WeatherForecastRequest
+from app.models.weather import WeatherBatchRequest, WeatherForecastRequest
 
 
 router = APIRouter(prefix="/weather", tags=["weather"])
 weather_service = WeatherService()
 
+# Optional morning refresh of configured locations, started with the application
+prewarmer = WeatherPrewarmer(weather_service)
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding header allows gzip (an explicit entry wins over *)"""
+    allowed = {}
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        allowed[coding] = q > 0
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in allowed:
+            return allowed[coding]
+    return False
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compress text chunks into one gzip stream as they are produced"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
 
 @router.get("/forecast")
 async def get_weather_forecast(
@@ -16,7 +55,8 @@ async def get_weather_forecast(
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     api_key: str = Query(..., description="Visual Crossing Weather API key"),
     format_type: str = Query("json", description="Output format: 'json' or 'csv'"),
-    include_current: bool = Query(False, description="Include current conditions")
+    include_current: bool = Query(False, description="Include current conditions"),
+    accept_encoding: Optional[str] = Header(None)
 ):
     """
     Get weather forecast data for a specific location and date range.
@@ -28,9 +68,12 @@ async def get_weather_forecast(
     - api_key: Your Visual Crossing Weather API key
     - format_type: Output format ('json' or 'csv')
     - include_current: Whether to include current weather conditions
+    
+    CSV is streamed as it is rendered (one row per hour with include_current),
+    gzip-compressed when the client's Accept-Encoding allows it.
     """
     
-    result = weather_service.get_weather_forecast(
+    result = await weather_service.get_weather_forecast(
         location=location,
         start_date=start_date,
         end_date=end_date,
@@ -40,15 +83,72 @@ async def get_weather_forecast(
     )
     
     if format_type.lower() == "csv":
-        return StreamingResponse(
-            io.StringIO(result["content"]),
-            media_type=result["media_type"],
-            headers={"Content-Disposition": f"attachment; filename={result['filename']}"}
-        )
+        headers = {"Content-Disposition": f"attachment; filename={result['filename']}", "Vary": "Accept-Encoding"}
+        content = result["content"]
+        if accepts_gzip(accept_encoding):
+            headers["Content-Encoding"] = "gzip"
+            content = gzip_chunks(content)
+        return StreamingResponse(content, media_type=result["media_type"], headers=headers)
+    else:
+        return result
+
+
+@router.post("/forecast/batch")
+async def get_weather_forecast_batch(
+    request: WeatherBatchRequest,
+    accept_encoding: Optional[str] = Header(None)
+):
+    """
+    Get weather for several locations and one date range in one request.
+    
+    Locations are fetched concurrently, so the request takes about as long
+    as the slowest location. A location that fails is listed under "errors"
+    (JSON) or in the X-Failed-Locations header (CSV) while the others are
+    still returned. CSV is one long-format table with a location column,
+    streamed and gzip-compressed like /weather/forecast.
+    """
+    result = await weather_service.get_weather_batch(
+        locations=request.locations,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        api_key=request.api_key,
+        format_type=request.format_type,
+        include_current=request.include_current
+    )
+    
+    if request.format_type.lower() == "csv":
+        headers = {
+            "Content-Disposition": f"attachment; filename={result['filename']}",
+            "Vary": "Accept-Encoding",
+            "X-Failed-Locations": json.dumps(list(result["errors"]))
+        }
+        content = result["content"]
+        if accepts_gzip(accept_encoding):
+            headers["Content-Encoding"] = "gzip"
+            content = gzip_chunks(content)
+        return StreamingResponse(content, media_type=result["media_type"], headers=headers)
     else:
         return result
 
 
+@router.get("/cache/stats")
+async def get_weather_cache_stats():
+    """Weather cache hit/miss/eviction counters"""
+    return weather_service.cache.stats()
+
+
+@router.get("/limiter/stats")
+async def get_weather_limiter_stats():
+    """Upstream rate limit and daily quota state per API key (keys shown by fingerprint)"""
+    return weather_service.limiter.stats()
+
+
+@router.get("/prewarm")
+async def get_weather_prewarm():
+    """Forecast pre-warming schedule and the outcome of its last run"""
+    return prewarmer.describe()
+
+
 # Backward compatibility endpoints
 @router.get("/forecast/json")
 async def get_weather_forecast_json(
@@ -58,7 +158,7 @@ async def get_weather_forecast_json(
     api_key: str = Query(..., description="Visual Crossing Weather API key")
 ):
     """Get weather forecast data in JSON format (backward compatibility)"""
-    return await get_weather_forecast(location, start_date, end_date, api_key, "json", False)
+    return await get_weather_forecast(location, start_date, end_date, api_key, "json", False, None)
 
 
 @router.get("/forecast/csv")
@@ -67,7 +167,9 @@ async def get_weather_forecast_csv(
     start_date: str = Query(..., description="Start date in YYYY-MM-DD format"),
     end_date: str = Query(..., description="End date in YYYY-MM-DD format"),
     api_key: str = Query(..., description="Visual Crossing Weather API key"),
-    include_current: bool = Query(False, description="Include current conditions")
+    include_current: bool = Query(False, description="Include current conditions"),
+    accept_encoding: Optional[str] = Header(None)
 ):
     """Get weather forecast data in CSV format (backward compatibility)"""
-    return await get_weather_forecast(location, start_date, end_date, api_key, "csv", include_current)
+    return await get_weather_forecast(location, start_date, end_date, api_key, "csv", include_current,
+                                      accept_encoding)
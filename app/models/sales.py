@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 
 class SalesUploadResponse(BaseModel):
@@ -7,6 +7,7 @@ class SalesUploadResponse(BaseModel):
     sales_date: str
     filename: str
     status: str
+    outlet: str = "default"
     unique_products: List[str] = Field(default_factory=list)
     num_unique_products: int = 0
     perishable_products: List[str] = Field(default_factory=list)
@@ -19,6 +20,9 @@ class SalesUploadResponse(BaseModel):
 class SalesHistoryResponse(BaseModel):
     message: str
     available_dates: List[str]
+    total: int = 0
+    offset: int = 0
+    limit: int = 0
 
 
 class SalesDataResponse(BaseModel):
@@ -31,3 +35,48 @@ class PredictDemandResponse(BaseModel):
     message: str
     sales_date: str
     prediction: Dict[str, Any]
+
+
+class PredictDemandBatchResponse(BaseModel):
+    message: str
+    dates: List[str]
+    predictions: Dict[str, Dict[str, float]]
+
+
+class PredictDemandOutletsResponse(BaseModel):
+    message: str
+    dates: List[str]
+    outlets: Dict[str, Dict[str, Dict[str, float]]]
+    totals: Dict[str, Dict[str, float]]
+
+
+class OutletsResponse(BaseModel):
+    message: str
+    outlets: List[str]
+    dates_per_outlet: Dict[str, int] = Field(default_factory=dict)
+
+
+class OutletHistoryTotalsResponse(BaseModel):
+    message: str
+    outlets: List[str]
+    totals: Dict[str, Dict[str, float]]
+
+
+class IngestJobResponse(BaseModel):
+    message: str
+    job_id: str
+    status: str
+    status_url: str
+    sales_date: str
+    outlet: str = "default"
+    filename: str = ""
+    bytes_total: int = 0
+    bytes_read: int = 0
+    rows_read: int = 0
+    progress: float = 0.0
+    created_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    num_unique_products: int = 0
+    ingredients_needed: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[str] = None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 
 class WeatherForecastRequest(BaseModel):
@@ -11,6 +11,15 @@ class WeatherForecastRequest(BaseModel):
     include_current: bool = Field(False, description="Include current conditions")
 
 
+class WeatherBatchRequest(BaseModel):
+    locations: List[str] = Field(..., description="Locations (city, address, or coordinates lat,lon)")
+    start_date: str = Field(..., description="Start date in YYYY-MM-DD format, shared by all locations")
+    end_date: str = Field(..., description="End date in YYYY-MM-DD format, shared by all locations")
+    api_key: str = Field(..., description="Visual Crossing Weather API key")
+    format_type: str = Field("json", description="Output format: 'json' or 'csv'")
+    include_current: bool = Field(False, description="Include current conditions")
+
+
 class WeatherForecastResponse(BaseModel):
     location: str
     latitude: Optional[float] = None
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+
+class EtlPoolSaturated(Exception):
+    """Every worker is busy and the queue is full"""
+
+
+class EtlPoolClosed(Exception):
+    """The pool is shutting down and accepts no new work"""
+
+
+def _timed_call(fn: Callable, *args):
+    """Runs in the worker; wall-clock timestamps are comparable across processes"""
+    started = time.time()
+    result = fn(*args)
+    return started, time.time(), result
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class EtlPool:
+    """Bounded worker pool for CPU-bound ETL work, off the event loop
+
+    At most max_workers tasks run and at most max_queue more wait; anything
+    beyond that is rejected with EtlPoolSaturated instead of piling up.
+    """
+
+    # Latency samples kept for the percentiles in stats()
+    SAMPLE_SIZE = 1024
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 kind: Optional[str] = None):
+        """
+        Create the pool; every setting can also come from the environment
+
+        Args:
+            max_workers: Concurrent ETL tasks (ETL_WORKERS, default 2)
+            max_queue: Tasks allowed to wait for a worker (ETL_QUEUE_SIZE, default 8)
+            kind: "thread" or "process" (ETL_EXECUTOR, default thread)
+        """
+        env = os.environ.get
+        self.max_workers = max_workers or int(env("ETL_WORKERS", 2))
+        self.max_queue = max_queue if max_queue is not None else int(env("ETL_QUEUE_SIZE", 8))
+        self.kind = kind or env("ETL_EXECUTOR", "thread")
+        if self.kind not in ("thread", "process"):
+            raise ValueError(f"Unknown ETL executor kind: {self.kind}")
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.pending = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self._wait_times = deque(maxlen=self.SAMPLE_SIZE)
+        self._run_times = deque(maxlen=self.SAMPLE_SIZE)
+
+    @property
+    def uses_processes(self) -> bool:
+        """Work for a process pool must be picklable (module-level functions, plain arguments)"""
+        return self.kind == "process"
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def executor(self) -> Executor:
+        """Executor, created on first use"""
+        with self._lock:
+            if self._executor is None:
+                if self.uses_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="etl")
+            return self._executor
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) on a worker and await its result
+
+        Raises EtlPoolSaturated when the queue is full and EtlPoolClosed after shutdown.
+        """
+        with self._lock:
+            if self._closed:
+                raise EtlPoolClosed()
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise EtlPoolSaturated()
+            self.pending += 1
+            self.submitted += 1
+
+        submitted_at = time.time()
+        try:
+            future = self.executor().submit(partial(_timed_call, fn, *args))
+        except Exception:
+            with self._lock:
+                self.pending -= 1
+            raise
+        # The slot is released when the work ends, even if the awaiting request went away
+        future.add_done_callback(lambda done: self._finished(done, submitted_at))
+
+        _, _, result = await asyncio.wrap_future(future)
+        return result
+
+    def _finished(self, future: Future, submitted_at: float):
+        with self._lock:
+            self.pending -= 1
+            if future.cancelled():
+                self.cancelled += 1
+            elif future.exception() is not None:
+                self.failed += 1
+            else:
+                started, finished, _ = future.result()
+                self.completed += 1
+                self._wait_times.append(max(0.0, started - submitted_at))
+                self._run_times.append(finished - started)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work; waits for running tasks by default"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and latency percentiles (seconds)"""
+        with self._lock:
+            running = min(self.pending, self.max_workers)
+            waits, runs = list(self._wait_times), list(self._run_times)
+            return {
+                "executor": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": running,
+                "queue_depth": self.pending - running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "cancelled": self.cancelled,
+                "queue_wait_p50": round(_percentile(waits, 0.5), 4),
+                "queue_wait_p95": round(_percentile(waits, 0.95), 4),
+                "run_time_p50": round(_percentile(runs, 0.5), 4),
+                "run_time_p95": round(_percentile(runs, 0.95), 4),
+                "run_time_max": round(max(runs, default=0.0), 4)
+            }
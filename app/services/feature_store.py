@@ -0,0 +1,140 @@
+import threading
+import warnings
+from typing import List, Optional, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class FeatureStore:
+    """Materialized daily features over the ingredient history
+
+    Row i holds the features of day first_day + i (proleptic ordinals), built
+    only from target values of earlier days: lag_1..lag_L, rolling mean and
+    standard deviation (ddof=0, NaN days skipped) over each window, and the day
+    of week (Monday = 0). Rows exist up to `horizon` days past the last known
+    value; features of any other date are all NaN, so a lookup is one index.
+
+    Setting a day's values recomputes only the `horizon` rows that can see it.
+    """
+
+    def __init__(self, targets: Sequence[str], lags: int = 7, windows: Sequence[int] = (7, 14, 28)):
+        self.targets = list(targets)
+        self.lags = lags
+        self.windows = tuple(windows)
+        self.horizon = max((lags,) + self.windows)
+
+        self.columns = []
+        for target in self.targets:
+            self.columns += [f"{target}_lag_{lag}" for lag in range(1, lags + 1)]
+            for window in self.windows:
+                self.columns += [f"{target}_roll_mean_{window}", f"{target}_roll_std_{window}"]
+        self.columns.append("day_of_week")
+        self.column_index = {name: i for i, name in enumerate(self.columns)}
+
+        self._lock = threading.RLock()
+        self.first_day: Optional[int] = None
+        self.length = 0
+        self._values = np.full((0, len(self.targets)), np.nan)
+        self._features = np.full((0, len(self.columns)), np.nan)
+
+    @property
+    def rows(self) -> int:
+        """Materialized feature rows (days first_day .. last known day + horizon)"""
+        return self.length + self.horizon if self.length else 0
+
+    def _reserve(self, length: int):
+        """Grow the typed arrays (doubling) so `length` days and their rows fit"""
+        rows = length + self.horizon
+        if rows > len(self._features):
+            capacity = max(rows, 2 * len(self._features), 64)
+            values = np.full((capacity, len(self.targets)), np.nan)
+            values[:self.length] = self._values[:self.length]
+            features = np.full((capacity, len(self.columns)), np.nan)
+            features[:self.rows] = self._features[:self.rows]
+            self._values, self._features = values, features
+
+    def _compute_rows(self, lo: int, hi: int):
+        """Recompute feature rows [lo, hi) from the values"""
+        if hi <= lo:
+            return
+        H, T = self.horizon, len(self.targets)
+
+        # Values of days lo-H .. hi-1, NaN outside the known days
+        segment = np.full((hi - lo + H, T), np.nan)
+        src_lo, src_hi = max(lo - H, 0), min(hi, self.length)
+        if src_hi > src_lo:
+            segment[src_lo - (lo - H):src_hi - (lo - H)] = self._values[src_lo:src_hi]
+
+        # previous[r, t, j]: value of target t on day r - H + j (j = H - 1 is the day before)
+        previous = sliding_window_view(segment, H, axis=0)[:hi - lo]
+
+        blocks = []
+        with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+            # Windows without any known day are NaN, not a warning
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for t in range(T):
+                blocks.append(previous[:, t, ::-1][:, :self.lags])
+                for window in self.windows:
+                    recent = previous[:, t, H - window:]
+                    blocks.append(np.nanmean(recent, axis=1)[:, None])
+                    blocks.append(np.nanstd(recent, axis=1)[:, None])
+        ordinals = self.first_day + np.arange(lo, hi)
+        blocks.append(((ordinals - 1) % 7)[:, None])
+        self._features[lo:hi] = np.hstack(blocks)
+
+    def rebuild(self, first_day: Optional[int], values: np.ndarray):
+        """Batch build from dense daily values (rows = consecutive days from first_day)"""
+        with self._lock:
+            self.first_day = first_day if len(values) else None
+            self.length = 0
+            self._values = np.full((0, len(self.targets)), np.nan)
+            self._features = np.full((0, len(self.columns)), np.nan)
+            if len(values):
+                self._reserve(len(values))
+                self.length = len(values)
+                self._values[:self.length] = values
+                self._compute_rows(0, self.rows)
+
+    def set_day(self, day: int, values: Sequence[float]):
+        """Set the target values of one day and refresh the rows that depend on it"""
+        with self._lock:
+            if self.first_day is None:
+                self.rebuild(day, np.asarray([values], dtype=np.float64))
+                return
+            if day < self.first_day:
+                # Earlier than anything stored: shift everything (rare, full rebuild)
+                shift = self.first_day - day
+                dense = np.full((self.length + shift, len(self.targets)), np.nan)
+                dense[shift:] = self._values[:self.length]
+                dense[0] = values
+                self.rebuild(day, dense)
+                return
+
+            i = day - self.first_day
+            old_rows = self.rows
+            if i >= self.length:
+                self._reserve(i + 1)
+                self.length = i + 1
+            self._values[i] = values
+            # Rows past the old end are new; the rest only change within the horizon
+            self._compute_rows(min(i + 1, old_rows), i + self.horizon + 1)
+
+    def lookup(self, days: Sequence[int], columns: Optional[List[str]] = None) -> np.ndarray:
+        """Feature rows for day ordinals, O(1) per date"""
+        days = np.asarray(days, dtype=np.int64)
+        with self._lock:
+            result = np.full((len(days), len(self.columns)), np.nan)
+            if self.first_day is not None:
+                index = days - self.first_day
+                inside = (index >= 0) & (index < self.rows)
+                result[inside] = self._features[index[inside]]
+        result[:, -1] = (days - 1) % 7
+        if columns is not None:
+            result = result[:, [self.column_index[name] for name in columns]]
+        return result
+
+    def batch_features(self) -> np.ndarray:
+        """Copy of every materialized row"""
+        with self._lock:
+            return self._features[:self.rows].copy()
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.history_store import HistoryStore
+
+
+class HistorySnapshot(NamedTuple):
+    """Immutable view of the historical pivot: sorted dates plus one float32 array per column"""
+    revision: int
+    dates: np.ndarray
+    columns: Dict[str, np.ndarray]
+    digest: str
+
+    def date_range(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> Tuple[int, int]:
+        """[lo, hi) positions of the dates within an inclusive range, O(log N)"""
+        lo = 0 if start_date is None else int(np.searchsorted(self.dates, np.datetime64(start_date, 'D'), 'left'))
+        hi = len(self.dates) if end_date is None else int(
+            np.searchsorted(self.dates, np.datetime64(end_date, 'D'), 'right'))
+        return lo, max(lo, hi)
+
+    def index_of(self, date: str) -> Optional[int]:
+        """Position of a date, O(log N), or None when it is not stored"""
+        day = np.datetime64(date, 'D')
+        i = int(np.searchsorted(self.dates, day))
+        return i if i < len(self.dates) and self.dates[i] == day else None
+
+    def row(self, i: int) -> Dict[str, float]:
+        """Pivot row at a position"""
+        row = {'TANGGAL': str(self.dates[i])}
+        row.update({
+            col: None if np.isnan(values[i]) else round(float(values[i]), 2)
+            for col, values in self.columns.items()
+        })
+        return row
+
+    def row_digest(self, i: int) -> str:
+        """Content hash of the pivot row at a position"""
+        digest = hashlib.sha1(self.dates[i].tobytes())
+        for values in self.columns.values():
+            digest.update(values[i].tobytes())
+        return digest.hexdigest()
+
+    def to_frame(self) -> pd.DataFrame:
+        """Pivot as a DataFrame indexed by date"""
+        index = pd.DatetimeIndex(self.dates.astype('datetime64[ns]'), name='TANGGAL')
+        return pd.DataFrame({col: values.astype(np.float64) for col, values in self.columns.items()}, index=index)
+
+
+class HistoryCache:
+    """Process-wide in-memory copy of the historical pivot
+
+    Reads are served from memory. Our own upserts are applied incrementally;
+    changes made by anyone else are picked up when the store's version (file
+    inode and SQLite data_version) changes, checked at most every
+    check_interval seconds.
+    Recent revisions remember which dates they changed (see changed_dates).
+    """
+
+    # Revisions kept in the change log
+    CHANGE_LOG_SIZE = 256
+
+    def __init__(self, store: HistoryStore, check_interval: float = 1.0):
+        self.store = store
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._revision = 0
+        self._version = None
+        self._checked = 0.0
+        self._snapshot = None
+        self._changes = deque(maxlen=self.CHANGE_LOG_SIZE)
+        self.reload()
+
+    def file_version(self):
+        """Store version (see HistoryStore.version), None when the file does not exist"""
+        return self.store.version()
+
+    def _publish(self, dates: np.ndarray, columns: Dict[str, np.ndarray], changed: Optional[List[str]] = None):
+        for values in columns.values():
+            values.setflags(write=False)
+        dates.setflags(write=False)
+
+        # Content hash, identical across processes holding the same data
+        digest = hashlib.sha1(dates.tobytes())
+        for values in columns.values():
+            digest.update(values.tobytes())
+
+        self._revision += 1
+        self._snapshot = HistorySnapshot(self._revision, dates, columns, digest.hexdigest())
+        # None marks a full reload: anything may have changed
+        self._changes.append((self._revision, changed))
+
+    def reload(self):
+        """Rebuild the cache from the store"""
+        with self._lock:
+            try:
+                inode = os.stat(self.store.db_file).st_ino
+            except FileNotFoundError:
+                inode = None
+            if self._version is not None and inode is not None and inode != self._version[0]:
+                # The file was replaced; the open connection still points at the old one
+                self.store.reopen()
+            # Taken before the read: a write in between only triggers another reload
+            version = self.file_version()
+            df = self.store.load()
+            dates = df.index.values.astype('datetime64[D]')
+            columns = {col: df[col].to_numpy(dtype=np.float32) for col in self.store.columns}
+            self._version = version
+            self._checked = time.monotonic()
+            self._publish(dates, columns)
+
+    def snapshot(self) -> HistorySnapshot:
+        """Current snapshot; reloads only when the file changed externally"""
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            version = self.file_version()
+            with self._lock:
+                stale = version != self._version
+            if stale:
+                self.reload()
+        return self._snapshot
+
+    def apply(self, rows: List[Dict], write_version=None):
+        """Merge rows we just wrote to the store without rereading it
+
+        write_version is the version the store returned for our write (taken
+        inside its transaction). If it differs from ours, someone else wrote
+        before us and the cache is reloaded instead. A write by someone else
+        after ours leaves the stored version behind, so the next snapshot()
+        check reloads.
+        """
+        with self._lock:
+            stale = write_version is None or write_version != self._version
+        if stale:
+            self.reload()
+            return
+
+        with self._lock:
+            if write_version != self._version:
+                # A reload ran in between and already holds our rows
+                return
+            current = self._snapshot
+            dates = current.dates.copy()
+            columns = {col: values.copy() for col, values in current.columns.items()}
+
+            changed = []
+            for row in rows:
+                day = np.datetime64(pd.Timestamp(row['TANGGAL']).strftime('%Y-%m-%d'), 'D')
+                changed.append(str(day))
+                i = int(np.searchsorted(dates, day))
+                if i < len(dates) and dates[i] == day:
+                    # Columns missing from the row (a partial update) keep their value
+                    for col in self.store.columns:
+                        if col in row:
+                            columns[col][i] = np.nan if row[col] is None else row[col]
+                else:
+                    dates = np.insert(dates, i, day)
+                    for col in self.store.columns:
+                        columns[col] = np.insert(columns[col], i, np.nan if row.get(col) is None else row[col])
+
+            self._publish(dates, columns, changed)
+
+    def changed_dates(self, since_revision: int, until_revision: int) -> Optional[List[str]]:
+        """Dates changed by revisions (since, until], or None when that needs a full rebuild
+
+        None is returned when one of those revisions was a reload or has
+        already dropped out of the change log.
+        """
+        with self._lock:
+            entries = [(revision, dates) for revision, dates in self._changes
+                       if since_revision < revision <= until_revision]
+        if len(entries) != until_revision - since_revision:
+            return None
+        if any(dates is None for _, dates in entries):
+            return None
+        return sorted({day for _, dates in entries for day in dates})
@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+class HistoryStore:
+    """SQLite store for the historical ingredient pivot, one row per TANGGAL
+
+    Upserts are O(log N) primary-key writes inside a transaction, so a write
+    never rewrites the history and concurrent uploads cannot lose rows.
+    Writes return the store version seen inside their transaction (see version).
+    """
+
+    TABLE = "ingredients_historical"
+
+    def __init__(self, db_file: str, columns: List[str], csv_file: Optional[str] = None):
+        """Open (or create) the store and import the legacy CSV once"""
+        self.db_file = db_file
+        self.columns = list(columns)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = self._connect()
+
+        column_defs = ", ".join(f'"{col}" REAL' for col in self.columns)
+        with self._lock:
+            self._conn.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLE} ("TANGGAL" TEXT PRIMARY KEY, {column_defs})')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+        if csv_file:
+            self.import_csv(csv_file)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_file, timeout=30, check_same_thread=False, isolation_level=None)
+
+    def reopen(self):
+        """Reconnect, e.g. after the database file was replaced on disk"""
+        with self._lock:
+            self._conn.close()
+            self._conn = self._connect()
+
+    def _version(self):
+        try:
+            inode = os.stat(self.db_file).st_ino
+        except FileNotFoundError:
+            return None
+        # data_version changes with commits of every other connection, never with our own
+        return (inode, self._conn.execute('PRAGMA data_version').fetchone()[0])
+
+    def version(self):
+        """(inode, data_version) of the store, None when the file does not exist
+
+        Equal versions mean no other connection or process committed in between.
+        """
+        with self._lock:
+            return self._version()
+
+    def _write(self, sql: str, params):
+        """Run a write in its own IMMEDIATE transaction (serialized across threads and processes)
+
+        Returns the version taken inside the transaction: it covers every
+        commit before ours and, as our own commit does not change it, stays
+        current until someone else writes.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._version()
+                self._conn.executemany(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def _upsert_sql(self) -> str:
+        names = ", ".join(f'"{col}"' for col in ["TANGGAL"] + self.columns)
+        placeholders = ", ".join("?" for _ in range(len(self.columns) + 1))
+        updates = ", ".join(f'"{col}" = excluded."{col}"' for col in self.columns)
+        return (f'INSERT INTO {self.TABLE} ({names}) VALUES ({placeholders}) '
+                f'ON CONFLICT("TANGGAL") DO UPDATE SET {updates}')
+
+    def _params(self, row: Dict) -> tuple:
+        date = pd.Timestamp(row['TANGGAL']).strftime('%Y-%m-%d')
+        return (date,) + tuple(row.get(col) for col in self.columns)
+
+    def upsert(self, row: Dict):
+        """Insert or overwrite the pivot row for one date"""
+        return self._write(self._upsert_sql(), [self._params(row)])
+
+    def upsert_many(self, rows: List[Dict]):
+        """Insert or overwrite many pivot rows in a single transaction"""
+        return self._write(self._upsert_sql(), [self._params(row) for row in rows])
+
+    def update_columns(self, rows: List[Dict], columns: List[str]):
+        """Overwrite only the given columns of existing dates, in a single transaction"""
+        assignments = ", ".join(f'"{col}" = ?' for col in columns)
+        params = [
+            tuple(row.get(col) for col in columns) + (pd.Timestamp(row['TANGGAL']).strftime('%Y-%m-%d'),)
+            for row in rows
+        ]
+        return self._write(f'UPDATE {self.TABLE} SET {assignments} WHERE "TANGGAL" = ?', params)
+
+    def replace_all(self, rows: List[Dict]):
+        """Replace the whole pivot with rows in a single transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._version()
+                self._conn.execute(f'DELETE FROM {self.TABLE}')
+                self._conn.executemany(self._upsert_sql(), [self._params(row) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return version
+
+    def get(self, date: str) -> Optional[Dict]:
+        """Pivot row for one date, or None"""
+        with self._lock:
+            cursor = self._conn.execute(f'SELECT * FROM {self.TABLE} WHERE "TANGGAL" = ?', (date,))
+            row = cursor.fetchone()
+            names = [d[0] for d in cursor.description]
+        return dict(zip(names, row)) if row else None
+
+    def load(self) -> pd.DataFrame:
+        """Whole pivot as a DataFrame indexed by date, sorted ascending"""
+        with self._lock:
+            df = pd.read_sql_query(f'SELECT * FROM {self.TABLE} ORDER BY "TANGGAL"', self._conn)
+        df['TANGGAL'] = pd.to_datetime(df['TANGGAL'])
+        return df.set_index('TANGGAL').astype(float)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(f'SELECT COUNT(*) FROM {self.TABLE}').fetchone()[0]
+
+    def import_csv(self, csv_file: str):
+        """One-time import of an existing ingredients_historical.csv"""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM store_meta WHERE key = 'csv_imported'").fetchone()
+        if done or not os.path.exists(csv_file):
+            return
+
+        df = pd.read_csv(csv_file, dtype={'TANGGAL': str})
+        df['TANGGAL'] = pd.to_datetime(df['TANGGAL']).dt.strftime('%Y-%m-%d')
+        # The old append-only ETL script could write a date twice; the last one wins
+        df = df.drop_duplicates('TANGGAL', keep='last').reindex(columns=['TANGGAL'] + self.columns)
+        rows = [
+            (r[0],) + tuple(None if pd.isna(v) else float(v) for v in r[1:])
+            for r in df.itertuples(index=False)
+        ]
+
+        # Rows already in the store (written after startup) take precedence over the CSV
+        names = ", ".join(f'"{col}"' for col in ["TANGGAL"] + self.columns)
+        placeholders = ", ".join("?" for _ in range(len(self.columns) + 1))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(f'INSERT OR IGNORE INTO {self.TABLE} ({names}) VALUES ({placeholders})', rows)
+                self._conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('csv_imported', ?)",
+                                   (csv_file,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        print(f"✅ Imported {len(rows)} rows from {csv_file} into {self.db_file}")
+
+    def export_csv(self, csv_file: str):
+        """Atomically write the whole pivot as CSV (temp file + rename)"""
+        df = self.load().reset_index()
+        df['TANGGAL'] = df['TANGGAL'].dt.strftime('%Y-%m-%d')
+
+        tmp_file = f"{csv_file}.tmp"
+        df.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, csv_file)
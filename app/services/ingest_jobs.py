@@ -0,0 +1,246 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from app.services.etl_pool import EtlPool, EtlPoolSaturated
+from app.services.sales_service import SalesService, process_sales_file
+
+
+JOB_COLUMNS = ['job_id', 'sales_date', 'filename', 'content_sha256', 'bytes_total', 'status', 'rows_read',
+               'bytes_read', 'created_at', 'started_at', 'finished_at', 'result', 'error']
+
+
+class JobProgress:
+    """Progress callback for one job; picklable, so process workers can report too
+
+    The first call, made when a worker picks the job up, marks it running.
+    """
+
+    def __init__(self, db_file: str, job_id: str):
+        self.db_file = db_file
+        self.job_id = job_id
+
+    def __call__(self, rows_read: int, bytes_read: int):
+        conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        try:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = 'running', started_at = COALESCE(started_at, ?), "
+                "rows_read = ?, bytes_read = ? WHERE job_id = ?",
+                (time.time(), rows_read, bytes_read, self.job_id)
+            )
+        finally:
+            conn.close()
+
+
+class IngestJobStore:
+    """SQLite table of upload jobs, shared by every worker of the service"""
+
+    def __init__(self, db_file: str):
+        """Open (or create) the store"""
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS ingest_jobs (job_id TEXT PRIMARY KEY, sales_date TEXT, filename TEXT, '
+                'content_sha256 TEXT, bytes_total INTEGER, status TEXT, rows_read INTEGER, bytes_read INTEGER, '
+                'created_at REAL, started_at REAL, finished_at REAL, result TEXT, error TEXT)'
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """One job, with its result decoded, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f'SELECT {", ".join(JOB_COLUMNS)} FROM ingest_jobs WHERE job_id = ?', (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def create(self, job_id: str, sales_date: str, filename: str, content_sha256: str,
+               bytes_total: int) -> Tuple[Dict[str, Any], bool]:
+        """Insert a queued job unless a live one exists; returns (job, created)
+
+        Queued and running jobs are always reused, and succeeded ones while
+        they are the latest job for their date. A failed one is requeued, and
+        so is a succeeded one that a newer upload for the same date has
+        superseded since.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute('SELECT status FROM ingest_jobs WHERE job_id = ?', (job_id,)).fetchone()
+                latest = self._conn.execute(
+                    'SELECT job_id FROM ingest_jobs WHERE sales_date = ? ORDER BY created_at DESC LIMIT 1',
+                    (sales_date,)
+                ).fetchone()
+                created = row is None or row[0] == 'failed' or (row[0] == 'succeeded' and latest[0] != job_id)
+                if created:
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO ingest_jobs VALUES (?, ?, ?, ?, ?, ?, 0, 0, ?, NULL, NULL, NULL, NULL)',
+                        (job_id, sales_date, filename, content_sha256, bytes_total, 'queued', time.time())
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id), created
+
+    def update(self, job_id: str, **fields):
+        self._update('job_id = ?', (job_id,), fields)
+
+    def finish(self, job_id: str, created_at: float, **fields) -> bool:
+        """update() a job only if it was not requeued since created_at; returns whether it was"""
+        return self._update('job_id = ? AND created_at = ?', (job_id, created_at), fields) == 1
+
+    def _update(self, where: str, params: tuple, fields: Dict[str, Any]) -> int:
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        assignments = ', '.join(f'{name} = ?' for name in fields)
+        with self._lock:
+            cursor = self._conn.execute(f'UPDATE ingest_jobs SET {assignments} WHERE {where}',
+                                        (*fields.values(), *params))
+        return cursor.rowcount
+
+    def unfinished(self) -> list:
+        """Ids of jobs that were queued or running when the service stopped"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class IngestJobManager:
+    """Accepts uploads as background jobs and runs them on the ETL pool
+
+    The upload is persisted under uploads_dir before the request returns, so a
+    job survives a restart. The job id is derived from the date and the file's
+    SHA-256, which makes resubmitting the same upload idempotent, as long as
+    no other upload for that date came in between. Jobs of one date run one
+    at a time, in the order they were submitted.
+    """
+
+    # Seconds between attempts while the ETL pool is saturated
+    RETRY_INTERVAL = 1.0
+
+    def __init__(self, sales_service: SalesService, etl_pool: EtlPool, data_dir: Optional[str] = None):
+        self.sales_service = sales_service
+        self.etl_pool = etl_pool
+        data_dir = data_dir or sales_service.data_dir
+        self.uploads_dir = os.path.join(data_dir, "uploads")
+        self.store = IngestJobStore(os.path.join(data_dir, "ingest_jobs.db"))
+        self._tasks = set()
+        self._date_locks: Dict[str, asyncio.Lock] = {}
+
+    @staticmethod
+    def job_id_for(sales_date: str, content_sha256: str) -> str:
+        return hashlib.sha256(f"{sales_date}:{content_sha256}".encode()).hexdigest()[:32]
+
+    def upload_path(self, job_id: str) -> str:
+        return os.path.join(self.uploads_dir, f"{job_id}.csv")
+
+    def persist(self, fileobj: BinaryIO) -> Tuple[str, str, int]:
+        """Copy an upload to uploads_dir while hashing it; returns (temp path, sha256, size)"""
+        os.makedirs(self.uploads_dir, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        path = os.path.join(self.uploads_dir, f".incoming-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}")
+        with open(path, 'wb') as out:
+            while True:
+                block = fileobj.read(1024 * 1024)
+                if not block:
+                    break
+                digest.update(block)
+                size += len(block)
+                out.write(block)
+        return path, digest.hexdigest(), size
+
+    async def submit(self, sales_date: str, fileobj: BinaryIO, filename: str) -> Tuple[Dict[str, Any], bool]:
+        """Persist an upload and queue it; returns (job, created)
+
+        Raises ValueError for an unparseable date.
+        """
+        sales_date = SalesService.canonical_date(sales_date)
+        incoming, content_sha256, size = await asyncio.to_thread(self.persist, fileobj)
+
+        job_id = self.job_id_for(sales_date, content_sha256)
+        job, created = await asyncio.to_thread(self.store.create, job_id, sales_date, filename, content_sha256, size)
+        if created:
+            os.replace(incoming, self.upload_path(job_id))
+            self.start(job_id)
+        else:
+            os.remove(incoming)
+        return job, created
+
+    def start(self, job_id: str):
+        task = asyncio.get_running_loop().create_task(self.run(job_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def resume(self):
+        """Restart jobs left unfinished by a previous run (call on startup)"""
+        for job_id in self.store.unfinished():
+            if os.path.exists(self.upload_path(job_id)):
+                self.store.update(job_id, status='queued', rows_read=0, bytes_read=0, started_at=None)
+                self.start(job_id)
+            else:
+                self.store.update(job_id, status='failed', error='Upload file is missing', finished_at=time.time())
+
+    @staticmethod
+    def remove_upload(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def run(self, job_id: str):
+        job = self.store.get(job_id)
+        path = self.upload_path(job_id)
+        progress = JobProgress(self.store.db_file, job_id)
+
+        # Later uploads of a date must land after earlier ones; asyncio.Lock wakes waiters in order
+        async with self._date_locks.setdefault(job['sales_date'], asyncio.Lock()):
+            await self.process(job, path, progress)
+
+    async def process(self, job: Dict[str, Any], path: str, progress: JobProgress):
+        job_id = job['job_id']
+        while True:
+            try:
+                if self.etl_pool.uses_processes:
+                    result = await self.etl_pool.run(
+                        process_sales_file, self.sales_service.data_dir, job['sales_date'], path, progress
+                    )
+                    # The worker wrote to the store from another process; rereading it must not block the loop
+                    await asyncio.to_thread(self.sales_service.history_cache.reload)
+                else:
+                    result = await self.etl_pool.run(
+                        self.sales_service.process_sales_file, job['sales_date'], path, progress
+                    )
+                break
+            except EtlPoolSaturated:
+                # Background jobs wait for a free slot instead of failing
+                await asyncio.sleep(self.RETRY_INTERVAL)
+            except Exception as e:
+                self.store.finish(job_id, job['created_at'], status='failed', error=str(e), finished_at=time.time())
+                self.remove_upload(path)
+                return
+
+        self.store.finish(job_id, job['created_at'], status='succeeded', result=result, finished_at=time.time())
+        self.remove_upload(path)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    async def wait(self):
+        """Wait for the jobs started by this process (tests and shutdown)"""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -0,0 +1,116 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+
+class ResolvedProduct(NamedTuple):
+    """Ingredient weights (grams per serving, one per ingredient column) and perishable flag"""
+    weights: np.ndarray
+    is_perishable: bool
+
+
+class MenuResolver:
+    """Resolve product names to ingredient weights and perishable flag
+
+    All keywords (fallback rules and perishable keywords) are compiled into a
+    single regex, so a product name is scanned once. Results are memoized per
+    distinct product name in a bounded LRU cache.
+    """
+
+    def __init__(self, menu_ingredients: Dict[str, Dict[str, float]],
+                 fallback_rules: List[Tuple[List[str], Dict[str, float]]],
+                 ingredient_portions: Dict[str, float], ingredient_columns: List[str],
+                 perishable_keywords: List[str], maxsize: int = 1024):
+        self.menu_ingredients = menu_ingredients
+        self.fallback_rules = fallback_rules
+        self.ingredient_portions = ingredient_portions
+        self.ingredient_columns = ingredient_columns
+        self.perishable_keywords = set(perishable_keywords)
+        self.maxsize = maxsize
+
+        keywords = set(self.perishable_keywords)
+        for rule_keywords, _ in fallback_rules:
+            keywords.update(rule_keywords)
+
+        # Zero-width lookahead so overlapping keywords are all reported; a match
+        # of a longer keyword also implies every keyword that is its prefix
+        alternatives = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        self._pattern = re.compile(f'(?=({alternatives}))')
+        self._implied = {k: {p for p in keywords if k.startswith(p)} for k in keywords}
+
+        self._cache: "OrderedDict[str, ResolvedProduct]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def match_keywords(self, menu_name: str) -> set:
+        """Return every keyword contained in the lowercased product name"""
+        found = set()
+        for match in self._pattern.finditer(str(menu_name).lower()):
+            found |= self._implied[match.group(1)]
+        return found
+
+    def detect(self, menu_name: str, keywords: set = None) -> Dict[str, float]:
+        """Fallback ingredient detection for products missing from the menu mapping"""
+        if keywords is None:
+            keywords = self.match_keywords(menu_name)
+
+        ingredients = {}
+        for rule_keywords, rule_ingredients in self.fallback_rules:
+            if any(word in keywords for word in rule_keywords):
+                for ingredient, multiplier in rule_ingredients.items():
+                    ingredients[ingredient] = ingredients.get(ingredient, 0) + multiplier
+        return ingredients
+
+    def _build(self, menu_name: str) -> ResolvedProduct:
+        keywords = self.match_keywords(menu_name)
+
+        if menu_name in self.menu_ingredients:
+            ingredients = self.menu_ingredients[menu_name]
+        else:
+            ingredients = self.detect(menu_name, keywords)
+
+        weights = np.array(
+            [ingredients.get(col, 0) * self.ingredient_portions[col] for col in self.ingredient_columns],
+            dtype=np.float64
+        )
+        weights.setflags(write=False)
+        return ResolvedProduct(weights, bool(keywords & self.perishable_keywords))
+
+    def resolve(self, menu_name: str) -> ResolvedProduct:
+        """Return cached weights and perishable flag for a product name"""
+        with self._lock:
+            resolved = self._cache.get(menu_name)
+            if resolved is not None:
+                self._cache.move_to_end(menu_name)
+                self.hits += 1
+                return resolved
+            self.misses += 1
+
+        resolved = self._build(menu_name)
+
+        with self._lock:
+            self._cache[menu_name] = resolved
+            if len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return resolved
+
+    def clear(self):
+        """Drop all cached products (e.g. after the menu mapping changed)"""
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Cache hit/miss counters"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._cache),
+                "maxsize": self.maxsize
+            }
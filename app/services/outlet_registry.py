@@ -0,0 +1,144 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.services.ingest_jobs import IngestJobManager
+from app.services.prediction_service import PredictionService
+from app.services.sales_service import SalesService
+
+
+class Outlet(NamedTuple):
+    """Services of one outlet's partition"""
+    name: str
+    sales: SalesService
+    predictions: PredictionService
+    jobs: IngestJobManager
+
+
+class OutletRegistry:
+    """One storage partition and set of services per outlet
+
+    The default outlet keeps the root data directory, so existing history stays
+    where it is. Every other outlet lives in data_dir/outlets/<name>/ with its
+    own history, line and count stores, caches and job table: a write to one
+    outlet never waits on another outlet's files or locks. Partitions are
+    opened on first use and share the loaded models and the ETL pool.
+    """
+
+    DEFAULT_OUTLET = "default"
+    NAME_PATTERN = re.compile(r'^[a-z0-9][a-z0-9_-]{0,63}$')
+
+    def __init__(self, default: Outlet, max_workers: Optional[int] = None):
+        """
+        Args:
+            default: Services of the default outlet (the root data directory)
+            max_workers: Threads for fan-out over outlets (OUTLET_WORKERS, default 4)
+        """
+        self.outlets_dir = os.path.join(default.sales.data_dir, "outlets")
+        self.max_workers = max_workers or int(os.environ.get("OUTLET_WORKERS", 4))
+        self._outlets: Dict[str, Outlet] = {self.DEFAULT_OUTLET: default}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def normalize(cls, name: Optional[str]) -> str:
+        """Canonical outlet name; raises ValueError for names unsafe as a directory"""
+        name = '-'.join((name or cls.DEFAULT_OUTLET).strip().lower().split())
+        if not cls.NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid outlet name: {name!r}")
+        return name
+
+    def names(self) -> List[str]:
+        """Default outlet first, then every outlet with a partition on disk"""
+        on_disk = set(os.listdir(self.outlets_dir)) if os.path.isdir(self.outlets_dir) else set()
+        with self._lock:
+            loaded = set(self._outlets)
+        others = {name for name in on_disk | loaded if self.NAME_PATTERN.match(name)} - {self.DEFAULT_OUTLET}
+        return [self.DEFAULT_OUTLET] + sorted(others)
+
+    def exists(self, name: str) -> bool:
+        name = self.normalize(name)
+        return name in self._outlets or os.path.isdir(os.path.join(self.outlets_dir, name))
+
+    def get(self, name: Optional[str] = None, create: bool = True) -> Outlet:
+        """Services of one outlet, opening its partition on first use
+
+        Raises ValueError for an invalid name and KeyError for an unknown
+        outlet when create is False.
+        """
+        name = self.normalize(name)
+        outlet = self._outlets.get(name)
+        if outlet is not None:
+            return outlet
+        if not create and not self.exists(name):
+            raise KeyError(name)
+
+        with self._lock:
+            outlet = self._outlets.get(name)
+            if outlet is None:
+                default = self._outlets[self.DEFAULT_OUTLET]
+                sales = SalesService(data_dir=os.path.join(self.outlets_dir, name))
+                outlet = Outlet(
+                    name,
+                    sales,
+                    PredictionService(sales, default.predictions.registry),
+                    IngestJobManager(sales, default.jobs.etl_pool)
+                )
+                self._outlets[name] = outlet
+        return outlet
+
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="outlet")
+            return self._executor
+
+    def fan_out(self, fn: Callable[[Outlet], Any], names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run fn on every outlet (or the named ones) in parallel; {outlet: result}"""
+        outlets = [self.get(name, create=False) for name in (names or self.names())]
+        if len(outlets) == 1:
+            return {outlets[0].name: fn(outlets[0])}
+        futures = {outlet.name: self.executor().submit(fn, outlet) for outlet in outlets}
+        return {name: future.result() for name, future in futures.items()}
+
+    def predict_all(self, dates: List[str], weather_days: Optional[Dict[str, Dict[str, Any]]] = None,
+                    names: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """{outlet: {date: prediction}} for every outlet, outlets scored in parallel"""
+        return self.fan_out(lambda outlet: outlet.predictions.predict_many(dates, weather_days), names)
+
+    def history_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Ingredient pivot summed over outlets per date, read from each partition in parallel"""
+        def read(outlet: Outlet):
+            snapshot = outlet.sales.historical_snapshot()
+            lo, hi = snapshot.date_range(start_date, end_date)
+            return snapshot.dates[lo:hi], {col: values[lo:hi] for col, values in snapshot.columns.items()}
+
+        parts = list(self.fan_out(read, names).values())
+        dates = np.unique(np.concatenate([part[0] for part in parts])) if parts else np.array([], 'datetime64[D]')
+        totals = {}
+        for col in SalesService.PIVOT_COLUMNS:
+            summed = np.zeros(len(dates))
+            for part_dates, columns in parts:
+                # NaN (no value stored) counts as zero in the total
+                np.add.at(summed, np.searchsorted(dates, part_dates), np.nan_to_num(columns[col].astype(np.float64)))
+            totals[col] = summed
+        return {
+            str(day): {col: round(float(totals[col][i]), 2) for col in SalesService.PIVOT_COLUMNS}
+            for i, day in enumerate(dates)
+        }
+
+    def resume_jobs(self):
+        """Restart unfinished upload jobs of every outlet (call on startup)"""
+        for name in self.names():
+            self.get(name).jobs.resume()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
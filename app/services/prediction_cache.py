@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Set, Tuple
+
+# (date, model version, history revision, weather digest)
+CacheKey = Tuple[str, str, int, Hashable]
+
+
+class PredictionCache:
+    """LRU cache of per-date predictions
+
+    Keys combine the date, the version of the loaded models, the revision at
+    which the date's history inputs last changed and a digest of its weather
+    inputs, so a stale entry is never served. Entries whose history changed
+    are dropped eagerly through invalidate_dates()/clear(); entries of
+    replaced models age out.
+    """
+
+    def __init__(self, max_entries: int = 8192):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, Dict[str, float]]" = OrderedDict()
+        self._by_date: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, float]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: CacheKey, value: Dict[str, float]):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._by_date.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: CacheKey):
+        del self._entries[key]
+        keys = self._by_date[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._by_date[key[0]]
+
+    def invalidate_dates(self, dates: Iterable[str]) -> int:
+        """Drop every entry of the given dates; returns the number dropped"""
+        dropped = 0
+        with self._lock:
+            for date in dates:
+                for key in list(self._by_date.get(date, ())):
+                    self._remove(key)
+                    dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> int:
+        """Drop every entry; returns the number dropped"""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._by_date.clear()
+            self.invalidations += dropped
+        return dropped
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/invalidation counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries
+            }
@@ -0,0 +1,455 @@
+import hashlib
+import io
+import os
+import threading
+import time
+from datetime import date as date_type, datetime, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from app.services.feature_store import FeatureStore
+from app.services.prediction_cache import PredictionCache
+from app.services.sales_service import SalesService
+
+
+class LoadedModel(NamedTuple):
+    """One loaded model file"""
+    booster: Any
+    feature_names: List[str]
+    sha256: str
+    signature: Tuple[int, int]
+    loaded_at: float
+
+
+class ModelSet(NamedTuple):
+    """Immutable set of the models in use; swapped as a whole on reload"""
+    version: str
+    models: Dict[str, LoadedModel]
+
+    @property
+    def boosters(self) -> Dict[str, Any]:
+        return {target: model.booster for target, model in self.models.items()}
+
+    @property
+    def feature_names(self) -> Dict[str, List[str]]:
+        return {target: model.feature_names for target, model in self.models.items()}
+
+
+class ModelRegistry:
+    """Keeps the XGBoost models resident and hot-reloads changed model files
+
+    A watcher thread polls the models directory. A changed file is loaded in
+    the background once it has stopped changing, checked with a smoke
+    prediction and only then swapped in, together with the unchanged models,
+    as a new ModelSet. Callers take `current` once per request, so in-flight
+    predictions finish on the set they started with.
+
+    Args (environment):
+        MODEL_RELOAD_INTERVAL: Seconds between directory polls; 0 disables watching (default 5)
+    """
+
+    MODEL_TARGETS = ['beef', 'chicken', 'squid', 'tempe_tahu']
+    MODEL_FILE_TEMPLATE = "xgboost_all_features_{target}.joblib"
+
+    def __init__(self, models_dir: Optional[str] = None, poll_interval: Optional[float] = None):
+        """Initialize the registry and load all models"""
+        BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        self.models_dir = models_dir or os.path.join(BASE_DIR, "models")
+        self.poll_interval = float(os.getenv("MODEL_RELOAD_INTERVAL", "5")) if poll_interval is None else poll_interval
+        # Feature names a new model may use (set by the prediction service)
+        self.known_features: Optional[set] = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        self._rejected: Dict[str, Tuple[int, int]] = {}
+        self.reloads = 0
+        self.last_reload: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+        start = time.perf_counter()
+        self.current = self._model_set({target: self.load_model(target) for target in self.MODEL_TARGETS})
+        self.load_seconds = time.perf_counter() - start
+        print(f"✅ Loaded {len(self.current.models)} models in {self.load_seconds * 1000:.0f} ms")
+
+    @property
+    def version(self) -> str:
+        return self.current.version
+
+    @property
+    def boosters(self) -> Dict[str, Any]:
+        return self.current.boosters
+
+    @property
+    def feature_names(self) -> Dict[str, List[str]]:
+        return self.current.feature_names
+
+    def model_path(self, target: str) -> str:
+        return os.path.join(self.models_dir, self.MODEL_FILE_TEMPLATE.format(target=target))
+
+    def file_signature(self, target: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.model_path(target))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _model_set(self, models: Dict[str, LoadedModel]) -> ModelSet:
+        # Changes whenever any model file does
+        version = hashlib.sha256(''.join(models[target].sha256 for target in self.MODEL_TARGETS).encode())
+        return ModelSet(version.hexdigest()[:16], models)
+
+    def load_model(self, target: str) -> LoadedModel:
+        """Load one model file and validate it with a smoke prediction
+
+        The smoke prediction also builds the booster's internal buffers, so the
+        first request on a new model is not slower than any other.
+        """
+        path = self.model_path(target)
+        signature = self.file_signature(target)
+        with open(path, 'rb') as f:
+            content = f.read()
+        booster = joblib.load(io.BytesIO(content)).get_booster()
+        feature_names = list(booster.feature_names or [])
+
+        if not feature_names:
+            raise ValueError(f"{path}: model has no feature names")
+        if self.known_features is not None and not set(feature_names) <= self.known_features:
+            unknown = sorted(set(feature_names) - self.known_features)
+            raise ValueError(f"{path}: unknown features {unknown}")
+        smoke = booster.inplace_predict(np.zeros((1, len(feature_names)), dtype=np.float32))
+        if np.shape(smoke) != (1,) or not np.isfinite(smoke).all():
+            raise ValueError(f"{path}: smoke prediction returned {smoke!r}")
+
+        return LoadedModel(booster, feature_names, hashlib.sha256(content).hexdigest(), signature, time.time())
+
+    def check_for_updates(self) -> bool:
+        """Reload model files that changed and have since stopped changing; True when swapped
+
+        A file is picked up on the first poll that sees the same new signature
+        twice, so a copy in progress is never loaded half written. A file that
+        fails validation is skipped until it changes again.
+        """
+        current = self.current
+        ready = []
+        for target in self.MODEL_TARGETS:
+            signature = self.file_signature(target)
+            if signature is None or signature == current.models[target].signature \
+                    or signature == self._rejected.get(target):
+                self._pending.pop(target, None)
+                continue
+            if self._pending.get(target) == signature:
+                ready.append(target)
+            else:
+                self._pending[target] = signature
+        if not ready:
+            return False
+
+        models = dict(current.models)
+        for target in ready:
+            self._pending.pop(target, None)
+            try:
+                model = self.load_model(target)
+            except Exception as e:
+                self._rejected[target] = self.file_signature(target)
+                self.last_error = f"{target}: {e}"
+                print(f"❌ Keeping the current {target} model: {e}")
+                continue
+            if model.sha256 != current.models[target].sha256:
+                models[target] = model
+            else:
+                # Touched but identical: remember the new signature only
+                models[target] = current.models[target]._replace(signature=model.signature)
+
+        new_set = self._model_set(models)
+        with self._lock:
+            if self.current is not current:
+                return False
+            self.current = new_set
+        if new_set.version != current.version:
+            self.reloads += 1
+            self.last_reload = time.time()
+            print(f"✅ Swapped in models {new_set.version} (was {current.version})")
+            return True
+        return False
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_for_updates()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Model watcher error: {e}")
+
+    def start_watching(self):
+        """Start the background watcher (no-op when disabled or already running)"""
+        if self.poll_interval <= 0 or (self._watcher is not None and self._watcher.is_alive()):
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def describe(self) -> Dict[str, Any]:
+        """Active model versions and reload state"""
+        current = self.current
+        return {
+            "version": current.version,
+            "models": {
+                target: {
+                    "file": os.path.basename(self.model_path(target)),
+                    "sha256": model.sha256,
+                    "loaded_at": datetime.fromtimestamp(model.loaded_at).isoformat(timespec='seconds'),
+                    "features": len(model.feature_names)
+                }
+                for target, model in current.models.items()
+            },
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+            "poll_interval": self.poll_interval,
+            "reloads": self.reloads,
+            "last_reload": datetime.fromtimestamp(self.last_reload).isoformat(timespec='seconds')
+            if self.last_reload else None,
+            "last_error": self.last_error
+        }
+
+
+class PredictionService:
+    """Service for demand prediction using the XGBoost ingredient models"""
+
+    LAGS = 7
+    WEATHER_FEATURES = ['temp', 'feelslike', 'dew', 'humidity', 'precip']
+    CALENDAR_FEATURES = ['is_ramadhan', 'is_holiday', 'is_weekend']
+
+    # Model target -> historical pivot columns summed into it
+    TARGET_COLUMNS = {
+        'beef': ['beef'],
+        'chicken': ['chicken'],
+        'squid': ['squid'],
+        'tempe_tahu': ['tempe', 'tahu']
+    }
+
+    # Indonesian national holidays (extend as new calendars are published)
+    HOLIDAYS = {
+        # 2024
+        '2024-01-01', '2024-02-08', '2024-02-10', '2024-03-11', '2024-03-29', '2024-03-31',
+        '2024-04-10', '2024-04-11', '2024-05-01', '2024-05-09', '2024-05-23', '2024-06-01',
+        '2024-06-17', '2024-07-07', '2024-08-17', '2024-09-16', '2024-12-25',
+        # 2025
+        '2025-01-01', '2025-01-27', '2025-01-29', '2025-03-29', '2025-03-31', '2025-04-01',
+        '2025-04-18', '2025-04-20', '2025-05-01', '2025-05-12', '2025-05-29', '2025-06-01',
+        '2025-06-06', '2025-06-27', '2025-08-17', '2025-09-05', '2025-12-25',
+        # 2026
+        '2026-01-01', '2026-01-16', '2026-02-17', '2026-03-19', '2026-03-20', '2026-03-21',
+        '2026-04-03', '2026-04-05', '2026-05-01', '2026-05-14', '2026-05-27', '2026-05-31',
+        '2026-06-01', '2026-06-16', '2026-08-17', '2026-08-25', '2026-12-25',
+    }
+
+    # Ramadan fasting periods (first day, last day)
+    RAMADHAN_PERIODS = [
+        ('2024-03-12', '2024-04-09'),
+        ('2025-03-01', '2025-03-30'),
+        ('2026-02-18', '2026-03-19'),
+    ]
+
+    def __init__(self, sales_service: SalesService, registry: Optional[ModelRegistry] = None):
+        """Initialize the prediction service"""
+        self.sales_service = sales_service
+        self.registry = registry or ModelRegistry()
+
+        # Lag/rolling features of every target, kept in step with the history
+        self.feature_store = FeatureStore(list(self.TARGET_COLUMNS), lags=self.LAGS)
+        self._feature_revision = None
+        self._feature_digest = None
+        self._feature_lock = threading.Lock()
+
+        # Memoized predictions, keyed by the revision of their history inputs
+        self.prediction_cache = PredictionCache()
+        self._history_base_revision = 0
+        self._history_revisions: Dict[str, int] = {}
+
+        # One shared feature layout; each model reads its own columns from it
+        self.feature_columns = self.feature_store.columns + self.WEATHER_FEATURES + self.CALENDAR_FEATURES
+        self.feature_position = {name: i for i, name in enumerate(self.feature_columns)}
+        self.registry.known_features = set(self.feature_columns)
+        self._model_columns = (None, {})
+
+    def parse_date(self, date: str) -> date_type:
+        """Parse a YYYY-MM-DD string"""
+        return datetime.strptime(date, '%Y-%m-%d').date()
+
+    def expand_dates(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     dates: Optional[List[str]] = None) -> List[str]:
+        """Normalize an inclusive date range and/or an explicit list into sorted unique dates"""
+        days = {self.parse_date(date) for date in dates or []}
+        if start_date:
+            start = self.parse_date(start_date)
+            end = self.parse_date(end_date) if end_date else start
+            if end < start:
+                raise ValueError("end_date must not be before start_date")
+            days.update(start + timedelta(days=i) for i in range((end - start).days + 1))
+        return [day.isoformat() for day in sorted(days)]
+
+    def date_runs(self, days: List[str]) -> List[Tuple[str, str]]:
+        """Contiguous (first, last) runs of sorted unique dates"""
+        runs = []
+        for day in days:
+            if runs and (self.parse_date(day) - self.parse_date(runs[-1][1])).days == 1:
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs.append((day, day))
+        return runs
+
+    def calendar_features(self, day: date_type) -> List[float]:
+        """Ramadan, holiday and weekend flags for a date"""
+        day_str = day.isoformat()
+        is_ramadhan = any(start <= day_str <= end for start, end in self.RAMADHAN_PERIODS)
+        return [float(is_ramadhan), float(day_str in self.HOLIDAYS), float(day.weekday() >= 5)]
+
+    def weather_features(self, weather_day: Optional[Dict[str, Any]]) -> List[float]:
+        """Weather features for a date; missing values are left to the model as NaN"""
+        weather_day = weather_day or {}
+        return [
+            np.nan if weather_day.get(name) is None else float(weather_day[name])
+            for name in self.WEATHER_FEATURES
+        ]
+
+    def target_values(self, snapshot, i: int) -> np.ndarray:
+        """Value of every model target on the snapshot row at a position"""
+        return np.array([
+            sum(float(snapshot.columns[col][i]) for col in columns) for columns in self.TARGET_COLUMNS.values()
+        ])
+
+    def dense_targets(self, snapshot) -> Tuple[Optional[int], np.ndarray]:
+        """(first day ordinal, days x targets array) with NaN for days without history"""
+        if not len(snapshot.dates):
+            return None, np.empty((0, len(self.TARGET_COLUMNS)))
+        first, last = snapshot.dates[0], snapshot.dates[-1]
+        positions = (snapshot.dates - first).astype(np.int64)
+        dense = np.full((int((last - first).astype(np.int64)) + 1, len(self.TARGET_COLUMNS)), np.nan)
+        for t, columns in enumerate(self.TARGET_COLUMNS.values()):
+            dense[positions, t] = np.sum([snapshot.columns[col].astype(np.float64) for col in columns], axis=0)
+        return pd.Timestamp(first).toordinal(), dense
+
+    def sync_features(self):
+        """Bring the feature store up to the current history snapshot
+
+        Days changed since the last sync are applied incrementally; a reload
+        of the history (or a long gap) rebuilds the store.
+        """
+        snapshot = self.sales_service.historical_snapshot()
+        with self._feature_lock:
+            if self._feature_revision == snapshot.revision:
+                return
+            changed = None
+            if self._feature_revision is not None:
+                changed = self.sales_service.history_cache.changed_dates(self._feature_revision, snapshot.revision)
+
+            if changed is None:
+                self.feature_store.rebuild(*self.dense_targets(snapshot))
+                if snapshot.digest != self._feature_digest:
+                    self._history_base_revision = snapshot.revision
+                    self._history_revisions.clear()
+                    self.prediction_cache.clear()
+            else:
+                for day in changed:
+                    self.feature_store.set_day(
+                        self.parse_date(day).toordinal(), self.target_values(snapshot, snapshot.index_of(day))
+                    )
+                # A day is an input of the predictions of the next `horizon` days
+                affected = {
+                    (self.parse_date(day) + timedelta(days=offset)).isoformat()
+                    for day in changed for offset in range(1, self.feature_store.horizon + 1)
+                }
+                self._history_revisions.update(dict.fromkeys(affected, snapshot.revision))
+                self.prediction_cache.invalidate_dates(affected)
+            self._feature_revision = snapshot.revision
+            self._feature_digest = snapshot.digest
+
+    def history_features(self, days: List[date_type]) -> np.ndarray:
+        """Lag/rolling/day-of-week features of many dates, one lookup each"""
+        self.sync_features()
+        return self.feature_store.lookup([day.toordinal() for day in days])
+
+    def build_feature_matrix(self, days: List[date_type],
+                             weather_days: Optional[Dict[str, Dict[str, Any]]] = None) -> np.ndarray:
+        """Build the shared feature matrix, one row per date"""
+        weather_days = weather_days or {}
+        weather = [self.weather_features(weather_days.get(day.isoformat())) for day in days]
+        calendar = [self.calendar_features(day) for day in days]
+        return np.hstack([
+            self.history_features(days),
+            np.array(weather, dtype=np.float64).reshape(len(days), len(self.WEATHER_FEATURES)),
+            np.array(calendar, dtype=np.float64).reshape(len(days), len(self.CALENDAR_FEATURES))
+        ]).astype(np.float32)
+
+    def build_features(self, date: str, weather_day: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Build the shared feature row for one date"""
+        day = self.parse_date(date)
+        return self.build_feature_matrix([day], {day.isoformat(): weather_day})
+
+    def model_columns(self, models: ModelSet) -> Dict[str, np.ndarray]:
+        """Positions of each model's features in the shared layout"""
+        version, columns = self._model_columns
+        if version != models.version:
+            columns = {
+                target: np.array([self.feature_position[name] for name in names])
+                for target, names in models.feature_names.items()
+            }
+            self._model_columns = (models.version, columns)
+        return columns
+
+    def predict_matrix(self, features: np.ndarray, models: Optional[ModelSet] = None) -> Dict[str, np.ndarray]:
+        """Score every model of one model set (the current one by default) on a shared feature matrix"""
+        models = models or self.registry.current
+        columns = self.model_columns(models)
+        return {
+            target: booster.inplace_predict(features[:, columns[target]])
+            for target, booster in models.boosters.items()
+        }
+
+    def predict_many(self, dates: List[str],
+                     weather_days: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, float]]:
+        """Predict every ingredient for many dates, running each model once on the uncached ones
+
+        Predictions are memoized per (date, model version, history revision,
+        weather digest), looked up before any feature is built: a repeated
+        request costs one dictionary lookup per date.
+        """
+        days = [self.parse_date(date) for date in dates]
+        weather_days = weather_days or {}
+
+        # One model set for the whole request, even if a reload swaps it meanwhile
+        models = self.registry.current
+        self.sync_features()
+        with self._feature_lock:
+            revisions = [self._history_revisions.get(day.isoformat(), self._history_base_revision) for day in days]
+        keys = [
+            (day.isoformat(), models.version, revision,
+             hashlib.sha1(np.array(self.weather_features(weather_days.get(day.isoformat()))).tobytes()).hexdigest())
+            for day, revision in zip(days, revisions)
+        ]
+        results = [self.prediction_cache.get(key) for key in keys]
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            features = self.build_feature_matrix([days[i] for i in missing], weather_days)
+            predictions = self.predict_matrix(features, models)
+            for j, i in enumerate(missing):
+                results[i] = {target: round(float(values[j]), 2) for target, values in predictions.items()}
+                self.prediction_cache.put(keys[i], results[i])
+        return {day.isoformat(): dict(result) for day, result in zip(days, results)}
+
+    def predict(self, date: str, weather_day: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+        """Predict the quantity of every ingredient for one date"""
+        day = self.parse_date(date).isoformat()
+        return self.predict_many([day], {day: weather_day})[day]
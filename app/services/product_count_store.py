@@ -0,0 +1,111 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+
+class ProductCountStore:
+    """SQLite store of servings per day and product, plus the mapping that priced them
+
+    product_counts is the intermediate layer between raw uploads and the
+    ingredient pivot. It is clustered by (TANGGAL, PRODUK) and indexed by
+    PRODUK, so "every day that sold X" is one index range scan.
+    product_weights keeps the per-serving pivot weights each product was last
+    aggregated with, which is what a mapping change is diffed against.
+    """
+
+    def __init__(self, db_file: str):
+        """Open (or create) the store"""
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS product_counts ("TANGGAL" TEXT, "PRODUK" TEXT, servings REAL, '
+                'PRIMARY KEY ("TANGGAL", "PRODUK")) WITHOUT ROWID'
+            )
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS product_counts_by_product ON product_counts ("PRODUK", "TANGGAL")'
+            )
+            self._conn.execute('CREATE TABLE IF NOT EXISTS product_weights ("PRODUK" TEXT PRIMARY KEY, weights TEXT)')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS mapping_meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _transaction(self, statements: List[Tuple[str, list]]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.executemany(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def replace_days(self, day_counts: Dict[str, Dict[str, float]], weights: Dict[str, Dict[str, float]],
+                     clear: bool = False):
+        """Replace the counts of whole days and record the weights used, in one transaction
+
+        day_counts is {date: {product: servings}}; weights is {product: {pivot column: grams}}.
+        clear drops the counts of every other day as well.
+        """
+        deletes = [('DELETE FROM product_counts', [()])] if clear else [
+            ('DELETE FROM product_counts WHERE "TANGGAL" = ?', [(date,) for date in day_counts])
+        ]
+        self._transaction(deletes + [
+            ('INSERT INTO product_counts VALUES (?, ?, ?)', [
+                (date, product, float(servings))
+                for date, counts in day_counts.items() for product, servings in counts.items()
+            ]),
+            ('INSERT OR REPLACE INTO product_weights VALUES (?, ?)', [
+                (product, json.dumps(product_weights, sort_keys=True))
+                for product, product_weights in weights.items()
+            ]),
+        ])
+
+    def put_weights(self, weights: Dict[str, Dict[str, float]]):
+        self._transaction([('INSERT OR REPLACE INTO product_weights VALUES (?, ?)', [
+            (product, json.dumps(product_weights, sort_keys=True)) for product, product_weights in weights.items()
+        ])])
+
+    def get_weights(self) -> Dict[str, Dict[str, float]]:
+        """Weights every stored product was last aggregated with"""
+        with self._lock:
+            rows = self._conn.execute('SELECT "PRODUK", weights FROM product_weights').fetchall()
+        return {product: json.loads(weights) for product, weights in rows}
+
+    def products(self) -> List[str]:
+        """Every product that appears in the counts"""
+        with self._lock:
+            rows = self._conn.execute('SELECT DISTINCT "PRODUK" FROM product_counts').fetchall()
+        return [row[0] for row in rows]
+
+    def days_with_products(self, products: List[str]) -> List[str]:
+        """Sorted dates on which any of the products sold"""
+        days = set()
+        with self._lock:
+            for product in products:
+                days.update(row[0] for row in self._conn.execute(
+                    'SELECT "TANGGAL" FROM product_counts WHERE "PRODUK" = ?', (product,)))
+        return sorted(days)
+
+    def counts_for_days(self, days: List[str]) -> pd.DataFrame:
+        """TANGGAL/PRODUK/servings rows of the given dates"""
+        with self._lock:
+            rows = [
+                row for day in days for row in self._conn.execute(
+                    'SELECT "TANGGAL", "PRODUK", servings FROM product_counts WHERE "TANGGAL" = ?', (day,))
+            ]
+        return pd.DataFrame(rows, columns=['TANGGAL', 'PRODUK', 'servings'])
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute('SELECT value FROM mapping_meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, values: Dict[str, str]):
+        self._transaction([('INSERT OR REPLACE INTO mapping_meta VALUES (?, ?)', list(values.items()))])
@@ -0,0 +1,194 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+
+class SalesLineStore:
+    """Columnar store for the cleaned PRODUK/JUMLAH lines of each uploaded day
+
+    Lines live in one Parquet file per day under TANGGAL=YYYY-MM-DD/ (hive
+    partitioning), in upload order. PRODUK is dictionary encoded and files are
+    zstd compressed. Date ranges are pruned by directory name before any
+    file is opened, product filters are pushed down to the Parquet scan, and
+    files are read through memory maps. The content hash of a day's file is
+    its version, used for ETags.
+    """
+
+    SCHEMA = pa.schema([
+        ("PRODUK", pa.dictionary(pa.int32(), pa.string())),
+        ("JUMLAH", pa.float64()),
+    ])
+    PARTITIONING = ds.partitioning(pa.schema([("TANGGAL", pa.string())]), flavor="hive")
+    DATASET_SCHEMA = pa.schema([("TANGGAL", pa.string())] + list(SCHEMA))
+    FILE_NAME = "lines.parquet"
+
+    def __init__(self, root_dir: str, legacy_db_file: Optional[str] = None):
+        """Open (or create) the store; lines of a legacy SQLite store are imported once"""
+        self.root_dir = root_dir
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._versions: Dict[str, tuple] = {}
+        os.makedirs(root_dir, exist_ok=True)
+
+        if legacy_db_file and os.path.exists(legacy_db_file) and not self.days():
+            self.import_sqlite(legacy_db_file)
+
+    def day_path(self, date: str) -> str:
+        return os.path.join(self.root_dir, f"TANGGAL={date}", self.FILE_NAME)
+
+    def days(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+        """Sorted dates that have lines, optionally within an inclusive range"""
+        days = sorted(
+            name.split("=", 1)[1] for name in os.listdir(self.root_dir)
+            if name.startswith("TANGGAL=") and os.path.exists(os.path.join(self.root_dir, name, self.FILE_NAME))
+        )
+        return [
+            day for day in days
+            if (start_date is None or day >= start_date) and (end_date is None or day <= end_date)
+        ]
+
+    def replace_day(self, date: str, df_lines: pd.DataFrame):
+        """Replace all lines of one date"""
+        with self.day_writer(date) as writer:
+            writer.add(df_lines)
+
+    @contextmanager
+    def day_writer(self, date: str):
+        """Replace one date's lines from a stream of chunks
+
+        Chunks are appended as row groups to a temporary file that replaces the
+        day's file atomically on success, so readers see the old or the new day.
+        """
+        day_dir = os.path.dirname(self.day_path(date))
+        os.makedirs(day_dir, exist_ok=True)
+        fd, tmp_file = tempfile.mkstemp(dir=day_dir, suffix=".tmp")
+        os.close(fd)
+
+        writer = DayWriter(tmp_file, self.SCHEMA)
+        try:
+            yield writer
+            writer.close()
+            os.replace(tmp_file, self.day_path(date))
+        except BaseException:
+            writer.close()
+            os.remove(tmp_file)
+            raise
+
+    def day_version(self, date: str) -> Optional[str]:
+        """Content hash of one date's lines, None when the date has no lines
+
+        Hashes are cached per (inode, mtime, size), so a day is hashed once per write.
+        """
+        path = self.day_path(date)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._versions.get(date)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        self._versions[date] = (key, digest.hexdigest())
+        return digest.hexdigest()
+
+    def get_day(self, date: str) -> List[Dict]:
+        """Cleaned lines of one date in upload order"""
+        try:
+            table = pq.read_table(self.day_path(date), memory_map=True)
+        except FileNotFoundError:
+            return []
+        return [
+            {"PRODUK": product, "JUMLAH": qty}
+            for product, qty in zip(table.column("PRODUK").to_pylist(), table.column("JUMLAH").to_pylist())
+        ]
+
+    def scan(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+             products: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> pa.Table:
+        """Lines of an inclusive date range as an Arrow table with a TANGGAL column
+
+        Only the partitions inside the range are opened; the product filter is
+        evaluated by the Parquet scanner (row group statistics, then rows).
+        """
+        paths = [self.day_path(day) for day in self.days(start_date, end_date)]
+        columns = columns or ["TANGGAL", "PRODUK", "JUMLAH"]
+        if not paths:
+            return self.DATASET_SCHEMA.empty_table().select(columns)
+
+        dataset = ds.dataset(paths, schema=self.DATASET_SCHEMA, format="parquet", filesystem=self.filesystem,
+                             partitioning=self.PARTITIONING, partition_base_dir=self.root_dir)
+        expression = None
+        if products is not None:
+            expression = ds.field("PRODUK").isin(pa.array(products, pa.string()))
+        return dataset.to_table(columns=columns, filter=expression)
+
+    def product_totals(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       products: Optional[List[str]] = None) -> pd.DataFrame:
+        """Sum of JUMLAH per date and product"""
+        table = self.scan(start_date, end_date, products)
+        table = table.set_column(1, "PRODUK", pc.cast(table.column("PRODUK"), pa.string()))
+        return table.group_by(["TANGGAL", "PRODUK"]).aggregate([("JUMLAH", "sum")]).to_pandas().rename(
+            columns={"JUMLAH_sum": "JUMLAH"}
+        ).sort_values(["TANGGAL", "PRODUK"], ignore_index=True)
+
+    def size_bytes(self) -> int:
+        """Bytes on disk of every day file"""
+        return sum(os.path.getsize(self.day_path(day)) for day in self.days())
+
+    def import_sqlite(self, db_file: str):
+        """One-time import of the lines of the previous SQLite store"""
+        conn = sqlite3.connect(db_file)
+        try:
+            dates = [row[0] for row in conn.execute('SELECT "TANGGAL" FROM sales_days ORDER BY "TANGGAL"')]
+            for date in dates:
+                df = pd.read_sql_query(
+                    'SELECT "PRODUK", "JUMLAH" FROM sales_lines WHERE "TANGGAL" = ? ORDER BY line', conn, params=(date,)
+                )
+                self.replace_day(date, df)
+        finally:
+            conn.close()
+        print(f"✅ Imported lines of {len(dates)} dates from {db_file} into {self.root_dir}")
+
+
+class DayWriter:
+    """Collects the lines of one day chunk by chunk (see SalesLineStore.day_writer)"""
+
+    def __init__(self, path: str, schema: pa.Schema):
+        self.path = path
+        self.schema = schema
+        self.count = 0
+        self._writer = None
+        self._closed = False
+
+    def add(self, df_lines: pd.DataFrame):
+        """Append one chunk of cleaned PRODUK/JUMLAH lines as a row group"""
+        table = pa.table({
+            "PRODUK": pa.array(df_lines['PRODUK'].astype(str), pa.string()).dictionary_encode(),
+            "JUMLAH": pa.array(df_lines['JUMLAH'].to_numpy(dtype='float64')),
+        }, schema=self.schema)
+        self._open().write_table(table)
+        self.count += table.num_rows
+
+    def _open(self) -> pq.ParquetWriter:
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression="zstd", use_dictionary=True)
+        return self._writer
+
+    def close(self):
+        """Finish the file (an empty day still gets a valid, empty file)"""
+        if not self._closed:
+            self._closed = True
+            self._open().close()
@@ -1,5 +1,15 @@
+import hashlib
+import json
+import numpy as np
 import pandas as pd
 import os
+from typing import Callable, Dict, List, Optional
+
+from app.services.history_cache import HistoryCache
+from app.services.history_store import HistoryStore
+from app.services.menu_resolver import MenuResolver
+from app.services.product_count_store import ProductCountStore
+from app.services.sales_line_store import SalesLineStore
 
 class SalesService:
     """Service for processing sales history CSV using ETL logic"""
@@ -64,32 +74,70 @@ class SalesService:
         'Nasi goreng cumi ': {'squid': 0.75},
     }
 
-    def __init__(self):
+    # Fallback detection rules for products missing from MENU_INGREDIENTS:
+    # any matching keyword adds the listed ingredient multipliers
+    FALLBACK_RULES = [
+        (['bolognese'], {'ground_meat': 0.75, 'tomato': 0.75}),
+        (['katsu', 'ayam'], {'chicken': 1}),
+        (['daging', 'sapi'], {'beef': 1}),
+        (['cumi'], {'squid': 1}),
+        (['tempe'], {'tempe': 1}),
+        (['tahu'], {'tofu': 1}),
+    ]
+
+    # Bump when the detection logic in MenuResolver changes; part of the mapping fingerprint
+    MAPPING_RULES_VERSION = 1
+
+    # Rows per chunk when an upload is streamed
+    STREAM_CHUNK_ROWS = 100_000
+
+    # Column order of the product x ingredient weight matrix
+    INGREDIENT_COLUMNS = list(INGREDIENT_PORTIONS)
+
+    # Pivot column -> ingredient column
+    PIVOT_COLUMNS = {
+        'chicken': 'chicken',
+        'beef': 'beef',
+        'squid': 'squid',
+        'tempe': 'tempe',
+        'tahu': 'tofu'
+    }
+
+    def __init__(self, data_dir: Optional[str] = None):
         """Initialize the sales service"""
         BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-        self.historical_file = os.path.join(BASE_DIR, "data", "ingredients_historical.csv")
+        self.data_dir = data_dir or os.path.join(BASE_DIR, "data")
+        self.historical_file = os.path.join(self.data_dir, "ingredients_historical.csv")
+        self.historical_db = os.path.join(self.data_dir, "ingredients_historical.db")
+
+        # Date-keyed store for the pivot; the legacy CSV is imported on first start
+        self.history_store = HistoryStore(self.historical_db, list(self.PIVOT_COLUMNS), self.historical_file)
+
+        # In-memory copy of the pivot; reads never go to the store on the hot path
+        self.history_cache = HistoryCache(self.history_store)
+
+        # Cleaned product lines of every uploaded day
+        self.line_store = SalesLineStore(
+            os.path.join(self.data_dir, "sales_lines"), legacy_db_file=os.path.join(self.data_dir, "sales_lines.db")
+        )
+
+        # Servings per day and product, used to reprice history when the mapping changes
+        self.count_store = ProductCountStore(os.path.join(self.data_dir, "product_counts.db"))
+
+        # Compiled keyword matcher with per-product cache, shared by all uploads
+        self.resolver = MenuResolver(
+            self.MENU_INGREDIENTS,
+            self.FALLBACK_RULES,
+            self.INGREDIENT_PORTIONS,
+            self.INGREDIENT_COLUMNS,
+            self.PERISHABLE_KEYWORDS
+        )
 
 
     def detect_ingredients(self, menu_name: str):
         """Enhanced ingredient detection from etl-sales.py"""
-        menu_lower = menu_name.lower()
-        ingredients = {}
-
-        if 'bolognese' in menu_lower:
-            ingredients['ground_meat'] = ingredients.get('ground_meat', 0) + 0.75
-            ingredients['tomato'] = ingredients.get('tomato', 0) + 0.75
-        if 'katsu' in menu_lower or 'ayam' in menu_lower:
-            ingredients['chicken'] = ingredients.get('chicken', 0) + 1
-        if any(word in menu_lower for word in ['daging', 'sapi']):
-            ingredients['beef'] = ingredients.get('beef', 0) + 1
-        if 'cumi' in menu_lower:
-            ingredients['squid'] = ingredients.get('squid', 0) + 1
-        if 'tempe' in menu_lower:
-            ingredients['tempe'] = ingredients.get('tempe', 0) + 1
-        if 'tahu' in menu_lower:
-            ingredients['tofu'] = ingredients.get('tofu', 0) + 1
-        return ingredients
+        return self.resolver.detect(menu_name)
 
     def clean_and_filter_data(self, df: pd.DataFrame, date: str) -> pd.DataFrame:
         """Clean and filter data using ETL logic"""
@@ -113,96 +161,276 @@ class SalesService:
         
         return df
 
+    def build_ingredient_matrix(self, products) -> np.ndarray:
+        """Compile menu mapping and fallback rules into a product x ingredient weight matrix"""
+        matrix = np.zeros((len(products), len(self.INGREDIENT_COLUMNS)), dtype=np.float64)
+        for i, product in enumerate(products):
+            matrix[i] = self.resolver.resolve(product).weights
+        return matrix
+
+    def build_pivot_row(self, totals: np.ndarray, date: str) -> dict:
+        """Build pivot row similar to ETL from per-ingredient totals"""
+        pivot_row = {'TANGGAL': date}
+        for pivot_col, ingredient in self.PIVOT_COLUMNS.items():
+            pivot_row[pivot_col] = round(float(totals[self.INGREDIENT_COLUMNS.index(ingredient)]), 2)
+        return pivot_row
+
+    def ingredient_totals(self, df_perishable: pd.DataFrame) -> np.ndarray:
+        """Total grams per ingredient column for perishable sales lines"""
+        # Servings are truncated per line, exactly like int(row['JUMLAH'])
+        codes, products = pd.factorize(df_perishable['PRODUK'])
+        servings = df_perishable['JUMLAH'].to_numpy(dtype=np.float64).astype(np.int64)
+
+        # Sum servings per distinct product, then weight them in one matrix product
+        servings_per_product = np.bincount(codes, weights=servings, minlength=len(products))
+        return servings_per_product @ self.build_ingredient_matrix(products)
+
     def calculate_ingredients_from_sales(self, df_perishable: pd.DataFrame, date: str) -> dict:
         """Calculate total ingredients needed using ETL logic"""
-        total_ingredients = {}
-
-        for _, row in df_perishable.iterrows():
-            menu_item = row['PRODUK']
-            servings = int(row['JUMLAH'])
-
-            if menu_item in self.MENU_INGREDIENTS:
-                ingredients = self.MENU_INGREDIENTS[menu_item]
-            else:
-                ingredients = self.detect_ingredients(menu_item)
-
-            for ingredient, portion_multiplier in ingredients.items():
-                qty = portion_multiplier * servings * self.INGREDIENT_PORTIONS.get(ingredient, 0)
-                total_ingredients[ingredient] = total_ingredients.get(ingredient, 0) + qty
-
-        # Build pivot row similar to ETL
-        pivot_row = {
-            'TANGGAL': date,
-            'chicken': round(total_ingredients.get('chicken', 0), 2),
-            'beef': round(total_ingredients.get('beef', 0), 2),
-            'squid': round(total_ingredients.get('squid', 0), 2),
-            'tempe': round(total_ingredients.get('tempe', 0), 2),
-            'tahu': round(total_ingredients.get('tofu', 0), 2)
-        }
+        return self.build_pivot_row(self.ingredient_totals(df_perishable), date)
 
-        return pivot_row
+    def historical_snapshot(self):
+        """Current in-memory snapshot of the historical pivot"""
+        return self.history_cache.snapshot()
+
+    def load_historical_data(self) -> pd.DataFrame:
+        """Load the historical ingredient pivot indexed by date"""
+        return self.history_cache.snapshot().to_frame()
 
     def update_historical_data(self, pivot_row: dict):
         """Upsert (overwrite) pivot row for the same date"""
-        pivot_df = pd.DataFrame([pivot_row])
+        version = self.history_store.upsert(pivot_row)
+        self.history_cache.apply([pivot_row], version)
+        print(f"✅ Upserted {pivot_row['TANGGAL']} into {self.historical_db}")
 
-        if os.path.exists(self.historical_file):
-            # Load existing CSV
-            df_existing = pd.read_csv(self.historical_file)
+    def bulk_update_historical_data(self, rows: List[dict], replace: bool = False,
+                                    day_counts: Optional[Dict[str, Dict[str, float]]] = None):
+        """Write many pivot rows in one transaction; replace drops every other date
 
-            # Drop rows with same date
-            df_existing = df_existing[df_existing['TANGGAL'] != pivot_row['TANGGAL']]
+        day_counts ({date: {product: servings}}) is stored in the count layer too.
+        """
+        if replace:
+            self.history_store.replace_all(rows)
+            self.history_cache.reload()
+        else:
+            version = self.history_store.upsert_many(rows)
+            self.history_cache.apply(rows, version)
+        if day_counts:
+            products = {product for counts in day_counts.values() for product in counts}
+            self.count_store.replace_days(day_counts, self.pivot_weights(products), clear=replace)
+        print(f"✅ Wrote {len(rows)} dates into {self.historical_db}")
+
+    def pivot_weights(self, products) -> Dict[str, Dict[str, float]]:
+        """Grams per serving for each pivot column under the current mapping (0 for non-perishables)"""
+        indices = {pivot_col: self.INGREDIENT_COLUMNS.index(ingredient)
+                   for pivot_col, ingredient in self.PIVOT_COLUMNS.items()}
+        weights = {}
+        for product in products:
+            resolved = self.resolver.resolve(product)
+            weights[product] = {
+                pivot_col: float(resolved.weights[i]) if resolved.is_perishable else 0.0
+                for pivot_col, i in indices.items()
+            }
+        return weights
 
-            # Append the new pivot row
-            df_updated = pd.concat([df_existing, pivot_df], ignore_index=True)
+    def mapping_fingerprint(self) -> str:
+        """Hash of everything that decides how a product is priced"""
+        mapping = {
+            "rules_version": self.MAPPING_RULES_VERSION,
+            "menu_ingredients": self.MENU_INGREDIENTS,
+            "fallback_rules": self.FALLBACK_RULES,
+            "ingredient_portions": self.INGREDIENT_PORTIONS,
+            "perishable_keywords": self.PERISHABLE_KEYWORDS,
+            "pivot_columns": self.PIVOT_COLUMNS
+        }
+        return hashlib.sha1(json.dumps(mapping, sort_keys=True).encode()).hexdigest()
 
-            # Sort by date in descending order (newest first)
-            df_updated = df_updated.sort_values('TANGGAL')
+    def recompute_for_mapping(self, force: bool = False) -> dict:
+        """Reprice stored history after a mapping change, touching only what changed
 
-            # Write back to CSV
-            df_updated.to_csv(self.historical_file, index=False)
-            print(f"✅ Overwrote existing date and saved: {self.historical_file}")
+        Products whose pivot weights differ from the ones they were aggregated
+        with are found by diffing product_weights. Only the pivot columns that
+        changed are recomputed, and only for days on which those products sold.
+        """
+        fingerprint = self.mapping_fingerprint()
+        summary = {"fingerprint": fingerprint, "changed_products": [], "changed_columns": [], "days_updated": 0}
+        if not force and self.count_store.get_meta("fingerprint") == fingerprint:
+            return summary
+
+        stored = self.count_store.get_weights()
+        current = self.pivot_weights(self.count_store.products())
+        changed = {product: weights for product, weights in current.items() if stored.get(product) != weights}
+        columns = [
+            col for col in self.PIVOT_COLUMNS
+            if any(stored.get(product, {}).get(col) != weights[col] for product, weights in changed.items())
+        ]
+
+        rows = []
+        if changed and columns:
+            days = self.count_store.days_with_products(list(changed))
+            counts = self.count_store.counts_for_days(days)
+
+            # Exact recompute of the changed columns from that day's counts
+            day_codes, day_values = pd.factorize(counts['TANGGAL'])
+            product_codes, products = pd.factorize(counts['PRODUK'])
+            matrix = np.array([[current[p][col] for col in columns] for p in products], dtype=np.float64)
+            contributions = counts['servings'].to_numpy(dtype=np.float64)[:, None] * matrix[product_codes]
+            totals = np.zeros((len(day_values), len(columns)))
+            np.add.at(totals, day_codes, contributions)
+
+            rows = [
+                {'TANGGAL': day, **{col: round(float(totals[i, j]), 2) for j, col in enumerate(columns)}}
+                for i, day in enumerate(day_values)
+            ]
+            version = self.history_store.update_columns(rows, columns)
+            self.history_cache.apply(rows, version)
+
+        self.count_store.put_weights(changed)
+        version = int(self.count_store.get_meta("version") or 0) + 1
+        self.count_store.set_meta({"fingerprint": fingerprint, "version": str(version)})
+
+        summary.update(changed_products=sorted(changed), changed_columns=columns, days_updated=len(rows),
+                       version=version)
+        if rows:
+            print(f"✅ Repriced {', '.join(columns)} on {len(rows)} dates for {len(changed)} changed products")
+        return summary
+
+    def export_historical_csv(self, csv_file: Optional[str] = None) -> str:
+        """Write the historical pivot as CSV (atomic replace) and return its path"""
+        csv_file = csv_file or self.historical_file
+        self.history_store.export_csv(csv_file)
+        return csv_file
 
-        else:
-            # No file yet: create new one
-            pivot_df.to_csv(self.historical_file, index=False)
-            print(f"✅ Created new historical file: {self.historical_file}")
 
+    @staticmethod
+    def canonical_date(date: str) -> str:
+        """YYYY-MM-DD form of a date, the key of every store; raises ValueError if unparseable"""
+        return pd.Timestamp(date).strftime('%Y-%m-%d')
+
+    def read_sales_csv(self, source, chunksize: Optional[int] = None):
+        """Read a rekaphari_produk export (two title rows, then PRODUK,JUMLAH,HARGA)"""
+        return pd.read_csv(source, skiprows=2, names=["PRODUK", "JUMLAH", "HARGA"],
+                           dtype={"PRODUK": str}, chunksize=chunksize)
+
+    def process_sales_stream(self, date: str, source, chunksize: Optional[int] = None,
+                             progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        """Process an export file object chunk by chunk with bounded memory
+
+        progress, when given, is called with (rows read, bytes read) before the
+        first chunk and after every chunk.
+        """
+        chunks = self.read_sales_csv(source, chunksize or self.STREAM_CHUNK_ROWS)
+        if progress is None:
+            return self.process_sales_chunks(date, chunks)
+
+        def reported():
+            rows = 0
+            progress(rows, 0)
+            for chunk in chunks:
+                rows += len(chunk)
+                yield chunk
+                progress(rows, source.tell())
+
+        return self.process_sales_chunks(date, reported())
 
     def process_sales_history(self, date: str, df: pd.DataFrame) -> dict:
         """Main processing function using ETL logic"""
-        # Clean and filter the data using ETL approach
-        df_cleaned = self.clean_and_filter_data(df, date)
-        
-        # Get unique products before filtering
-        unique_products = sorted(df_cleaned['PRODUK'].dropna().unique())
-        num_unique_products = len(unique_products)
+        return self.process_sales_chunks(date, [df])
 
-        # Filter only perishable items using ETL logic
-        df_cleaned['is_perishable'] = df_cleaned['PRODUK'].str.lower().str.contains('|'.join(self.PERISHABLE_KEYWORDS))
-        df_perishable = df_cleaned[df_cleaned['is_perishable']].copy()
+    def aggregate_sales_chunks(self, date: str, chunks, on_lines: Optional[Callable[[pd.DataFrame], None]] = None):
+        """Aggregate raw DataFrame chunks of one day without writing anything
+
+        Returns (pivot row, perishable products, non-perishable products,
+        {product: servings}). Only running totals and per-product servings are
+        kept between chunks; cleaned lines go to on_lines.
+        """
+        # Store keys are canonical YYYY-MM-DD dates
+        date = self.canonical_date(date)
+
+        totals = np.zeros(len(self.INGREDIENT_COLUMNS), dtype=np.float64)
+        perishable_products, non_perishable_products = set(), set()
+        product_servings: Dict[str, float] = {}
+
+        for chunk in chunks:
+            # Clean and filter the data using ETL approach
+            df_cleaned = self.clean_and_filter_data(chunk, date)
+
+            # Servings per distinct product, truncated per line like int(row['JUMLAH'])
+            codes, products = pd.factorize(df_cleaned['PRODUK'])
+            servings = df_cleaned['JUMLAH'].to_numpy(dtype=np.float64).astype(np.int64)
+            servings_per_product = np.bincount(codes, weights=servings, minlength=len(products))
+
+            # Filter only perishable items using ETL logic
+            perishable_flags = np.array([self.resolver.resolve(p).is_perishable for p in products], dtype=bool)
+            for product, is_perishable, count in zip(products, perishable_flags, servings_per_product):
+                (perishable_products if is_perishable else non_perishable_products).add(product)
+                product_servings[product] = product_servings.get(product, 0.0) + float(count)
+
+            # Calculate ingredients using ETL logic
+            totals += (servings_per_product * perishable_flags) @ self.build_ingredient_matrix(products)
+
+            if on_lines is not None:
+                on_lines(df_cleaned[['PRODUK', 'JUMLAH']])
+
+        pivot_row = self.build_pivot_row(totals, date)
+        return pivot_row, perishable_products, non_perishable_products, product_servings
+
+    def process_sales_chunks(self, date: str, chunks) -> dict:
+        """Run the ETL over an iterable of raw DataFrame chunks
+
+        Cleaned lines are staged to the line store for /sales/data.
+        """
+        date = self.canonical_date(date)
+
+        with self.line_store.day_writer(date) as lines:
+            pivot_row, perishable_products, non_perishable_products, product_servings = self.aggregate_sales_chunks(
+                date, chunks, lines.add
+            )
 
-        # Calculate ingredients using ETL logic
-        pivot_row = self.calculate_ingredients_from_sales(df_perishable, date)
-        
         # Update historical data
         self.update_historical_data(pivot_row)
-        
-        # Create ingredient summary for the specific date
-        # data_dir = "data"
-        # os.makedirs(data_dir, exist_ok=True)
-        # output_file = os.path.join(data_dir, f"ingredients_needed_{date}.csv")
-        
-        # Save the ingredients needed for this date
-        # ingredient_df = pd.DataFrame([pivot_row])
-        # ingredient_df.to_csv(output_file, index=False)
+        self.count_store.replace_days({date: product_servings}, self.pivot_weights(product_servings))
+
+        unique_products = sorted(perishable_products | non_perishable_products)
 
         return {
             "unique_products": unique_products,
-            "num_unique_products": num_unique_products,
-            "perishable_products": sorted(df_perishable['PRODUK'].unique()),
-            "non_perishable_products": sorted(df_cleaned[~df_cleaned['is_perishable']]['PRODUK'].unique()),
-            # "ingredient_summary_file": output_file,
-            "historical_file": self.historical_file,
+            "num_unique_products": len(unique_products),
+            "perishable_products": sorted(perishable_products),
+            "non_perishable_products": sorted(non_perishable_products),
+            "historical_file": self.historical_db,
             "ingredients_needed": pivot_row
-        }
\ No newline at end of file
+        }
+
+    def process_sales_file(self, date: str, path: str, progress: Optional[Callable[[int, int], None]] = None) -> dict:
+        """Process an export saved on disk"""
+        with open(path, 'rb') as f:
+            return self.process_sales_stream(date, f, progress=progress)
+
+
+# One SalesService per worker process, created on its first task
+_worker_services: Dict[str, SalesService] = {}
+
+
+def worker_sales_service(data_dir: str) -> SalesService:
+    """This process's SalesService for a data directory"""
+    service = _worker_services.get(data_dir)
+    if service is None:
+        service = _worker_services[data_dir] = SalesService(data_dir=data_dir)
+    return service
+
+
+def process_sales_file(data_dir: str, date: str, path: str,
+                       progress: Optional[Callable[[int, int], None]] = None) -> dict:
+    """Process-pool entry point: process an export on disk with this process's SalesService"""
+    return worker_sales_service(data_dir).process_sales_file(date, path, progress)
+
+
+def aggregate_sales_file(data_dir: str, date: str, path: str) -> dict:
+    """Process-pool entry point: pivot row and product servings of an export on disk, without writing"""
+    service = worker_sales_service(data_dir)
+    with open(path, 'rb') as f:
+        pivot_row, _, _, product_servings = service.aggregate_sales_chunks(
+            date, service.read_sales_csv(f, service.STREAM_CHUNK_ROWS)
+        )
+    return {"pivot_row": pivot_row, "product_servings": product_servings}
@@ -0,0 +1,77 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class WeatherArchive:
+    """On-disk archive of observed (past) daily weather per location
+
+    Rows are clustered by (location, hours, month, day), so one location-month
+    is a contiguous index range. Past days never change, so entries never expire.
+    """
+
+    def __init__(self, db_file: str):
+        """Open (or create) the archive"""
+        self.db_file = db_file
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(db_file) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS weather_days (location TEXT, hours INTEGER, month TEXT, day TEXT, '
+                'record TEXT, PRIMARY KEY (location, hours, month, day)) WITHOUT ROWID'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS weather_locations (location TEXT, hours INTEGER, meta TEXT, '
+                'PRIMARY KEY (location, hours))'
+            )
+
+    def get_days(self, location_key: Tuple[str, bool], start_date: str, end_date: str) -> Dict[str, Dict[str, Any]]:
+        """Archived records of an inclusive date range, keyed by date"""
+        location, hours = location_key
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT day, record FROM weather_days WHERE location = ? AND hours = ? '
+                'AND month BETWEEN ? AND ? AND day BETWEEN ? AND ?',
+                (location, int(hours), start_date[:7], end_date[:7], start_date, end_date)
+            ).fetchall()
+        return {day: json.loads(record) for day, record in rows}
+
+    def put_days(self, location_key: Tuple[str, bool], records: List[Dict[str, Any]]):
+        """Archive records (each with a 'datetime' date) in one transaction"""
+        if not records:
+            return
+        location, hours = location_key
+        rows = [
+            (location, int(hours), record['datetime'][:7], record['datetime'], json.dumps(record))
+            for record in records
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany('INSERT OR REPLACE INTO weather_days VALUES (?, ?, ?, ?, ?)', rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_meta(self, location_key: Tuple[str, bool]) -> Optional[Dict[str, Any]]:
+        """Archived response fields other than days"""
+        location, hours = location_key
+        with self._lock:
+            row = self._conn.execute('SELECT meta FROM weather_locations WHERE location = ? AND hours = ?',
+                                     (location, int(hours))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_meta(self, location_key: Tuple[str, bool], meta: Dict[str, Any]):
+        location, hours = location_key
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO weather_locations VALUES (?, ?, ?)',
+                               (location, int(hours), json.dumps(meta)))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM weather_days').fetchone()[0]
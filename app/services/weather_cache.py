@@ -0,0 +1,151 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+
+
+class CacheEntry(NamedTuple):
+    value: Dict[str, Any]
+    expires_at: float
+    size: int
+
+
+class WeatherCache:
+    """Per-day weather cache keyed by (normalized location, include hours, date)
+
+    Past days and forecast days get different TTLs, expired entries are kept
+    as stale fallbacks, entries are evicted in LRU order once the estimated
+    size passes max_bytes, and concurrent identical upstream fetches are
+    coalesced into a single request.
+    """
+
+    def __init__(self, historical_ttl: float = 24 * 3600, forecast_ttl: float = 3600,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.historical_ttl = historical_ttl
+        self.forecast_ttl = forecast_ttl
+        self.max_bytes = max_bytes
+
+        self._days: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._meta: Dict[Hashable, Dict[str, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.upstream_requests = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def normalize_location(location: str) -> str:
+        """Case- and whitespace-insensitive location key"""
+        return re.sub(r'\s*,\s*', ',', ' '.join(location.lower().split()))
+
+    def ttl_for(self, day: str) -> float:
+        """Past days change rarely; today and later are forecasts"""
+        return self.historical_ttl if day < date.today().isoformat() else self.forecast_ttl
+
+    def get_day(self, location_key: Hashable, day: str) -> Optional[Dict[str, Any]]:
+        """Cached record for one day, or None when missing or expired
+
+        Expired records stay in the cache (until replaced or evicted) as a
+        fallback for get_stale_day.
+        """
+        key = (location_key, day)
+        with self._lock:
+            entry = self._days.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._days.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def get_stale_day(self, location_key: Hashable, day: str,
+                      max_stale: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Cached record for one day even when expired, or None when missing
+
+        With max_stale, only a record expired for at most max_stale seconds
+        is returned, and it counts as a stale hit.
+        """
+        with self._lock:
+            entry = self._days.get((location_key, day))
+            if entry is None:
+                return None
+            if max_stale is not None:
+                if time.monotonic() - entry.expires_at > max_stale:
+                    return None
+                self._days.move_to_end((location_key, day))
+                self.stale_hits += 1
+            return entry.value
+
+    def put_day(self, location_key: Hashable, day: str, record: Dict[str, Any]):
+        """Cache one day's record with the TTL for its kind"""
+        key = (location_key, day)
+        size = len(json.dumps(record, separators=(',', ':')))
+        with self._lock:
+            if key in self._days:
+                self._remove(key)
+            self._days[key] = CacheEntry(record, time.monotonic() + self.ttl_for(day), size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and self._days:
+                self._remove(next(iter(self._days)))
+                self.evictions += 1
+
+    def _remove(self, key: Hashable):
+        entry = self._days.pop(key)
+        self.bytes -= entry.size
+
+    def get_meta(self, location_key: Hashable) -> Optional[Dict[str, Any]]:
+        """Response fields other than days (address, coordinates, timezone...)"""
+        return self._meta.get(location_key)
+
+    def put_meta(self, location_key: Hashable, meta: Dict[str, Any]):
+        self._meta[location_key] = meta
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a single_flight fetch of key is running"""
+        return key in self._inflight
+
+    async def single_flight(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fetch once per key; concurrent callers with the same key share the result"""
+        future = self._inflight.get(key)
+        if future is None:
+            self.upstream_requests += 1
+            future = asyncio.ensure_future(fetch())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the shared fetch
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "upstream_requests": self.upstream_requests,
+                "coalesced_requests": self.coalesced,
+                "stale_hits": self.stale_hits,
+                "revalidations": self.revalidations,
+                "entries": len(self._days),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes
+            }
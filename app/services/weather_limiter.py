@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, NamedTuple, Optional
+
+
+class KeyLimits(NamedTuple):
+    """Upstream budget of one API key"""
+    rate: float          # requests per second, sustained
+    burst: int           # requests allowed back to back
+    daily_quota: int     # records per UTC day
+
+
+class BudgetExceeded(Exception):
+    """An upstream request was not sent: quota or wait budget exhausted"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class KeyBudget:
+    """Token bucket and daily record count of one API key
+
+    The bucket is kept as a theoretical arrival time (GCRA): each request
+    reserves the next free slot synchronously, so waiters are served in the
+    order they arrived and nobody holds a lock while sleeping.
+    """
+
+    def __init__(self, limits: KeyLimits):
+        self.limits = limits
+        self.next_free = 0.0
+        self.day = None
+        self.used = 0
+        self.waiting = 0
+        self.requests = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.rejected = 0
+        self.stale_fallbacks = 0
+        # Records per requested day last reported by the upstream, by include_current
+        self.cost_per_day: Dict[bool, float] = {}
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.limits.rate
+
+    def tokens(self, now: float) -> float:
+        """Requests that could start right now without waiting"""
+        free = (now - self.next_free) / self.interval + self.limits.burst
+        return max(0.0, min(float(self.limits.burst), free))
+
+    def roll_over(self, today):
+        if self.day != today:
+            self.day = today
+            self.used = 0
+
+
+class WeatherRateLimiter:
+    """Per API key token bucket plus daily record quota for upstream requests
+
+    Every upstream attempt first asks acquire() for its estimated record
+    cost (see estimate()). Requests over the sustained rate wait for their turn (FIFO); the
+    quota is charged up front and settled with the real cost afterwards.
+    When a request has a stale fallback, it is refused instead once the
+    quota would drop into the reserve or its wait would pass max_wait, so
+    cached data is served and the budget is kept for requests that have
+    nothing to fall back to.
+    """
+
+    def __init__(self, rate: float = 5.0, burst: int = 10, daily_quota: int = 1000,
+                 reserve: float = 0.1, max_wait: float = 30.0,
+                 key_limits: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Args:
+            rate: Default upstream requests per second per key
+            burst: Default requests a key may send back to back
+            daily_quota: Default records per key per UTC day
+            reserve: Share of the quota kept for requests without a stale fallback
+            max_wait: Longest queueing time in seconds before a request is refused
+            key_limits: Per-key overrides, {api_key: {"rate", "burst", "daily_quota"}}
+        """
+        self.defaults = KeyLimits(float(rate), int(burst), int(daily_quota))
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.key_limits = {key: self.limits_from(overrides) for key, overrides in (key_limits or {}).items()}
+        self._budgets: Dict[str, KeyBudget] = {}
+        self._lock = threading.Lock()
+
+    def limits_from(self, overrides: Dict[str, float]) -> KeyLimits:
+        return KeyLimits(
+            float(overrides.get("rate", self.defaults.rate)),
+            int(overrides.get("burst", self.defaults.burst)),
+            int(overrides.get("daily_quota", self.defaults.daily_quota))
+        )
+
+    def configure(self, api_key: str, **overrides):
+        """Set the rate, burst and/or daily_quota of one key"""
+        limits = self.limits_from({**self.key_limits.get(api_key, self.defaults)._asdict(), **overrides})
+        with self._lock:
+            self.key_limits[api_key] = limits
+            if api_key in self._budgets:
+                self._budgets[api_key].limits = limits
+
+    @staticmethod
+    def today():
+        return datetime.now(timezone.utc).date()
+
+    @staticmethod
+    def fingerprint(api_key: str) -> str:
+        """Short stable id of a key, safe to show on the metrics endpoint"""
+        return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+    def budget(self, api_key: str) -> KeyBudget:
+        budget = self._budgets.get(api_key)
+        if budget is None:
+            budget = self._budgets.setdefault(api_key, KeyBudget(self.key_limits.get(api_key, self.defaults)))
+        return budget
+
+    async def acquire(self, api_key: str, records: int, has_fallback: bool = False) -> None:
+        """
+        Wait for this key's turn and charge records against its daily quota
+
+        Raises BudgetExceeded when the quota cannot cover the request, or
+        when has_fallback is set and the request would dip into the reserve
+        or wait longer than max_wait. Nothing is charged in that case.
+        """
+        with self._lock:
+            budget = self.budget(api_key)
+            budget.roll_over(self.today())
+            limits = budget.limits
+            remaining = limits.daily_quota - budget.used
+
+            refusal = None
+            if records > remaining:
+                refusal = "daily quota exhausted"
+            elif has_fallback and remaining - records < self.reserve * limits.daily_quota:
+                refusal = "daily quota reserve"
+
+            now = time.monotonic()
+            start = max(now, budget.next_free - (limits.burst - 1) * budget.interval)
+            wait = start - now
+            if refusal is None and wait > self.max_wait:
+                refusal = "rate limit"
+            if refusal is None and has_fallback and wait > 0:
+                refusal = "rate limit"
+
+            if refusal is not None:
+                if has_fallback:
+                    budget.stale_fallbacks += 1
+                else:
+                    budget.rejected += 1
+                retry_after = wait if refusal == "rate limit" else self.seconds_to_reset()
+                raise BudgetExceeded(refusal, retry_after)
+
+            budget.next_free = max(now, budget.next_free) + budget.interval
+            budget.used += records
+            budget.requests += 1
+            if wait > 0:
+                budget.waits += 1
+                budget.wait_seconds += wait
+                budget.waiting += 1
+
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                with self._lock:
+                    budget.waiting -= 1
+
+    def estimate(self, api_key: str, days: int, include_current: bool) -> int:
+        """Records a request of `days` days will likely cost
+
+        Uses the cost per day the upstream last reported for this key and
+        kind of request, one record per day until it has reported one.
+        """
+        with self._lock:
+            budget = self.budget(api_key)
+            return max(1, math.ceil(days * budget.cost_per_day.get(include_current, 1.0)))
+
+    def settle(self, api_key: str, charged: int, cost: Optional[int],
+               days: int = 0, include_current: bool = False):
+        """
+        Replace the estimated charge with the real cost (0 when the request failed)
+
+        A real cost reported for `days` days also becomes the per-day
+        estimate of the key's next requests.
+        """
+        if cost is None:
+            return
+        with self._lock:
+            budget = self.budget(api_key)
+            if days > 0 and cost > 0:
+                budget.cost_per_day[include_current] = cost / days
+            if cost != charged and budget.day == self.today():
+                budget.used = max(0, budget.used + cost - charged)
+
+    def defer(self, api_key: str, seconds: float):
+        """Hold back this key's next request for `seconds` (upstream Retry-After)"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            budget = self.budget(api_key)
+            resume = time.monotonic() + seconds + (budget.limits.burst - 1) * budget.interval
+            budget.next_free = max(budget.next_free, resume)
+
+    def seconds_to_reset(self) -> float:
+        now = datetime.now(timezone.utc)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+        return (midnight - now).total_seconds()
+
+    def stats(self) -> Dict[str, Any]:
+        """Limiter state per key (by fingerprint, never the key itself)"""
+        with self._lock:
+            now = time.monotonic()
+            today = self.today()
+            keys = {}
+            for api_key, budget in self._budgets.items():
+                budget.roll_over(today)
+                limits = budget.limits
+                keys[self.fingerprint(api_key)] = {
+                    "rate_per_second": limits.rate,
+                    "burst": limits.burst,
+                    "tokens_available": round(budget.tokens(now), 2),
+                    "waiting": budget.waiting,
+                    "requests": budget.requests,
+                    "waited_requests": budget.waits,
+                    "wait_seconds": round(budget.wait_seconds, 3),
+                    "rejected": budget.rejected,
+                    "stale_fallbacks": budget.stale_fallbacks,
+                    "daily_quota": limits.daily_quota,
+                    "records_used": budget.used,
+                    "records_remaining": max(0, limits.daily_quota - budget.used)
+                }
+            return {
+                "defaults": self.defaults._asdict(),
+                "reserve": self.reserve,
+                "max_wait": self.max_wait,
+                "quota_resets_in": round(self.seconds_to_reset()),
+                "keys": keys
+            }
@@ -0,0 +1,112 @@
+import asyncio
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.services.weather_service import WeatherService
+
+
+class WeatherPrewarmer:
+    """Refreshes the forecast of configured locations at fixed times of day
+
+    Meant to run ahead of the morning purchasing run: the next days of each
+    location are fetched upstream into the cache, so the forecasts read
+    afterwards (and by stale-while-revalidate, the rest of the day) are
+    served from memory. Disabled unless locations and an API key are set.
+    """
+
+    def __init__(self, service: WeatherService, locations: Optional[List[str]] = None,
+                 api_key: Optional[str] = None, times: Optional[List[str]] = None,
+                 days: Optional[int] = None):
+        """
+        Args:
+            service: Weather service whose cache is warmed
+            locations: Locations to warm (WEATHER_PREWARM_LOCATIONS, separated by ';')
+            api_key: Visual Crossing key used by the scheduler (WEATHER_PREWARM_API_KEY)
+            times: Local times of day HH:MM (WEATHER_PREWARM_TIMES, comma-separated, default 05:30)
+            days: Days from today to refresh (WEATHER_PREWARM_DAYS, default 15)
+        """
+        env = os.environ.get
+        self.service = service
+        if locations is None:
+            locations = env("WEATHER_PREWARM_LOCATIONS", "").split(';')
+        self.locations = [location.strip() for location in locations if location.strip()]
+        self.api_key = api_key or env("WEATHER_PREWARM_API_KEY")
+        self.times = sorted(
+            time.fromisoformat(value.strip())
+            for value in (times or env("WEATHER_PREWARM_TIMES", "05:30").split(',')) if value.strip()
+        )
+        self.days = days or int(env("WEATHER_PREWARM_DAYS", 15))
+
+        self.last_run: Optional[datetime] = None
+        self.last_result: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.locations and self.api_key and self.times)
+
+    def next_run(self, now: datetime) -> datetime:
+        """First scheduled time after now"""
+        return min(
+            datetime.combine(now.date() + timedelta(days=offset), at)
+            for offset in (0, 1) for at in self.times
+            if datetime.combine(now.date() + timedelta(days=offset), at) > now
+        )
+
+    async def run_once(self) -> Dict[str, Any]:
+        """Refresh every location now, concurrently; {location: days refreshed or error}"""
+        start = date.today()
+        end = start + timedelta(days=self.days - 1)
+        outcomes = await asyncio.gather(*(
+            self.service.refresh(location, start.isoformat(), end.isoformat(), self.api_key)
+            for location in self.locations
+        ), return_exceptions=True)
+
+        result = {}
+        for location, outcome in zip(self.locations, outcomes):
+            if isinstance(outcome, Exception):
+                result[location] = {"error": str(getattr(outcome, 'detail', outcome))}
+                print(f"❌ Pre-warming {location} failed: {result[location]['error']}")
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                result[location] = {"days": outcome}
+        self.last_run = datetime.now()
+        self.last_result = result
+        return result
+
+    async def _run(self):
+        while True:
+            due = self.next_run(datetime.now())
+            # Short sleeps follow wall clock changes (DST, NTP steps)
+            while (remaining := (due - datetime.now()).total_seconds()) > 0:
+                await asyncio.sleep(min(remaining, 300))
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"❌ Weather pre-warm error: {e}")
+
+    def start(self):
+        """Schedule pre-warming on the running event loop (no-op when disabled or running)"""
+        if not self.enabled or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def describe(self) -> Dict[str, Any]:
+        """Schedule and outcome of the last run"""
+        return {
+            "enabled": self.enabled,
+            "locations": self.locations,
+            "times": [at.strftime('%H:%M') for at in self.times],
+            "days": self.days,
+            "next_run": self.next_run(datetime.now()).isoformat(timespec='seconds') if self.enabled else None,
+            "last_run": self.last_run.isoformat(timespec='seconds') if self.last_run else None,
+            "last_result": self.last_result
+        }
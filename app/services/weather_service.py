@@ -1,18 +1,158 @@
-import requests
-import pandas as pd
+import asyncio
+import csv
+import os
+import random
+import httpx
 import io
-from datetime import datetime
-from typing import Dict, Any, Tuple
+import itertools
+import json
+import math
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from fastapi import HTTPException
 
+from app.services.weather_archive import WeatherArchive
+from app.services.weather_cache import WeatherCache
+from app.services.weather_limiter import BudgetExceeded, WeatherRateLimiter
+
 
 class WeatherService:
     """Service for fetching weather data from Visual Crossing API"""
     
     BASE_URL = "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline"
     
-    def __init__(self):
-        pass
+    # Upstream responses worth retrying
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+    
+    # Leading CSV columns; the rest follow in order of first appearance
+    CSV_LOCATION_COLUMNS = ['location', 'latitude', 'longitude']
+    
+    # Rows rendered per yielded chunk of iter_csv
+    CSV_CHUNK_ROWS = 512
+    
+    # Upper bound on locations per batch request
+    MAX_BATCH_LOCATIONS = 50
+    
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 connect_timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 backoff: Optional[float] = None, max_connections: Optional[int] = None,
+                 archive_file: Optional[str] = None, window_days: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        """
+        Initialize the service; every setting can also come from the environment
+        
+        Args:
+            base_url: Timeline API URL (WEATHER_BASE_URL)
+            timeout: Read/write/pool timeout in seconds (WEATHER_TIMEOUT, default 10)
+            connect_timeout: Connect timeout in seconds (WEATHER_CONNECT_TIMEOUT, default 5)
+            max_retries: Retries after the first attempt (WEATHER_MAX_RETRIES, default 3)
+            backoff: Base delay of the exponential backoff in seconds (WEATHER_BACKOFF, default 0.5)
+            max_connections: Size of the shared connection pool (WEATHER_MAX_CONNECTIONS, default 20)
+            archive_file: SQLite archive of past days (WEATHER_ARCHIVE_FILE, default data/weather_archive.db)
+            window_days: Longest range per upstream request (WEATHER_WINDOW_DAYS, default 31)
+            max_concurrency: Upstream requests in flight per service (WEATHER_MAX_CONCURRENCY, default 6)
+        
+        Cache settings: WEATHER_CACHE_HISTORICAL_TTL (seconds, default 86400),
+        WEATHER_CACHE_FORECAST_TTL (seconds, default 3600), WEATHER_CACHE_MAX_BYTES (default 64 MiB),
+        WEATHER_CACHE_STALE_TTL (seconds an expired forecast day is still served while it
+        is refreshed in the background, default 21600; 0 disables)
+        
+        Rate limit settings, per API key: WEATHER_RATE_PER_SECOND (default 5),
+        WEATHER_RATE_BURST (default 10), WEATHER_DAILY_QUOTA (records, default 1000),
+        WEATHER_QUOTA_RESERVE (share kept for requests without stale data, default 0.1),
+        WEATHER_RATE_MAX_WAIT (seconds, default 30) and WEATHER_KEY_LIMITS, a JSON
+        object of per-key overrides: {"<api key>": {"rate": 2, "burst": 4, "daily_quota": 10000}}
+        """
+        env = os.environ.get
+        self.base_url = base_url or env("WEATHER_BASE_URL", self.BASE_URL)
+        self.timeout = httpx.Timeout(
+            timeout if timeout is not None else float(env("WEATHER_TIMEOUT", 10)),
+            connect=connect_timeout if connect_timeout is not None else float(env("WEATHER_CONNECT_TIMEOUT", 5))
+        )
+        self.max_retries = max_retries if max_retries is not None else int(env("WEATHER_MAX_RETRIES", 3))
+        self.backoff = backoff if backoff is not None else float(env("WEATHER_BACKOFF", 0.5))
+        max_connections = max_connections or int(env("WEATHER_MAX_CONNECTIONS", 20))
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.window_days = window_days or int(env("WEATHER_WINDOW_DAYS", 31))
+        self.max_concurrency = max_concurrency or int(env("WEATHER_MAX_CONCURRENCY", 6))
+        
+        self._client = None
+        self._client_loop = None
+        self._client_keeper = None
+        self._slots = None
+        self._slots_loop = None
+        self._refreshes: Dict[Tuple, asyncio.Task] = {}
+        self._refresh_paused: Dict[str, float] = {}
+        
+        self.cache = WeatherCache(
+            historical_ttl=float(env("WEATHER_CACHE_HISTORICAL_TTL", 24 * 3600)),
+            forecast_ttl=float(env("WEATHER_CACHE_FORECAST_TTL", 3600)),
+            max_bytes=int(env("WEATHER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+        )
+        self.stale_ttl = float(env("WEATHER_CACHE_STALE_TTL", 6 * 3600))
+        
+        self.limiter = WeatherRateLimiter(
+            rate=float(env("WEATHER_RATE_PER_SECOND", 5)),
+            burst=int(env("WEATHER_RATE_BURST", 10)),
+            daily_quota=int(env("WEATHER_DAILY_QUOTA", 1000)),
+            reserve=float(env("WEATHER_QUOTA_RESERVE", 0.1)),
+            max_wait=float(env("WEATHER_RATE_MAX_WAIT", 30)),
+            key_limits=json.loads(env("WEATHER_KEY_LIMITS", "{}"))
+        )
+        
+        BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        self.archive = WeatherArchive(
+            archive_file or env("WEATHER_ARCHIVE_FILE", os.path.join(BASE_DIR, "data", "weather_archive.db"))
+        )
+    
+    def client(self) -> httpx.AsyncClient:
+        """Shared pooled client, created lazily on the running event loop
+        
+        The client is closed with its loop: a keeper task closes it when it is
+        cancelled, which asyncio.run does to leftover tasks at exit. A client
+        left behind on another, still open loop is closed there.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._discard_client()
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._client_loop = loop
+            self._client_keeper = loop.create_task(self._close_with_loop(self._client))
+        return self._client
+    
+    async def _close_with_loop(self, client: httpx.AsyncClient) -> None:
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await client.aclose()
+    
+    def _discard_client(self) -> None:
+        """Have the current client closed on its own loop and forget it"""
+        if self._client_keeper is not None and not self._client_loop.is_closed():
+            self._client_loop.call_soon_threadsafe(self._client_keeper.cancel)
+        self._client = self._client_loop = self._client_keeper = None
+    
+    def upstream_slots(self) -> asyncio.Semaphore:
+        """Bounds concurrent upstream requests; created lazily on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._slots_loop = loop
+        return self._slots
+    
+    async def aclose(self) -> None:
+        """Cancel background refreshes and close the pooled client (application shutdown)"""
+        tasks = list(self._refreshes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            keeper = self._client_keeper
+            keeper.cancel()
+            await asyncio.gather(keeper, return_exceptions=True)
+        self._discard_client()
     
     def validate_dates(self, start_date: str, end_date: str) -> None:
         """Validate date format"""
@@ -22,78 +162,400 @@ class WeatherService:
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
     
-    def fetch_weather_data(self, location: str, start_date: str, end_date: str, 
-                          api_key: str, include_current: bool = False) -> Dict[str, Any]:
+    @staticmethod
+    def retry_after(response: httpx.Response) -> float:
+        """Seconds asked for by a Retry-After header (delay or HTTP date), 0 without one"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return 0.0
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return 0.0
+    
+    async def request_with_retry(self, url: str, params: Dict[str, Any], api_key: str, records: int,
+                                 has_fallback: bool = False) -> Dict[str, Any]:
         """
-        Fetch weather data from Visual Crossing API
+        GET with exponential backoff on connection errors, timeouts, 429 and 5xx
         
-        Args:
-            location: Location (city, address, or coordinates)
-            start_date: Start date in YYYY-MM-DD format
-            end_date: End date in YYYY-MM-DD format
-            api_key: Visual Crossing API key
-            include_current: Whether to include current conditions
+        Every attempt, retries included, waits for its turn in the key's rate
+        limit and is charged `records` (WeatherRateLimiter.acquire, which may
+        raise BudgetExceeded). Failed attempts are refunded, except a 429: the
+        upstream counts it, and its Retry-After holds back the whole key. The
+        charge of the successful attempt is left for the caller to settle with
+        the real cost. Backoff sleeps hold no upstream slot.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(api_key, records, has_fallback)
+            try:
+                async with self.upstream_slots():
+                    response = await self.client().get(url, params=params)
+            except BaseException as e:
+                self.limiter.settle(api_key, records, 0)
+                if not isinstance(e, httpx.TransportError) or attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code == 429:
+                    self.limiter.defer(api_key, self.retry_after(response))
+                elif response.is_error:
+                    self.limiter.settle(api_key, records, 0)
+                if response.status_code not in self.RETRY_STATUS_CODES or attempt == self.max_retries:
+                    response.raise_for_status()
+                    return response.json()
             
-        Returns:
-            Dictionary containing weather data
+            # Full jitter keeps many clients from retrying in lockstep
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+    
+    async def fetch_upstream(self, location: str, start_date: str, end_date: str,
+                             api_key: str, include_current: bool = False,
+                             has_fallback: bool = False) -> Dict[str, Any]:
         """
-        self.validate_dates(start_date, end_date)
+        Fetch one date range from Visual Crossing, bypassing the cache
         
-        url = f"{self.BASE_URL}/{location}/{start_date}/{end_date}"
+        Charges the key's daily quota with the real cost of the request.
+        Raises BudgetExceeded when the limiter refuses an attempt.
+        """
+        url = f"{self.base_url}/{location}/{start_date}/{end_date}"
+        days = len(self.date_list(start_date, end_date))
+        records = self.limiter.estimate(api_key, days, include_current)
         
         params = {
             "key": api_key,
             "include": "days,hours" if include_current else "days",
-            "elements": "datetime,tempmax,tempmin,temp,humidity,precip,windspeed,winddir,pressure,cloudcover,visibility,conditions,description"
+            "elements": "datetime,tempmax,tempmin,temp,feelslike,dew,humidity,precip,windspeed,winddir,pressure,cloudcover,visibility,conditions,description"
         }
         
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            data = await self.request_with_retry(url, params, api_key, records, has_fallback)
+        except BudgetExceeded:
+            raise
+        except httpx.HTTPError as e:
             raise HTTPException(status_code=400, detail=f"Error fetching weather data: {str(e)}")
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        self.limiter.settle(api_key, records, data.get('queryCost'), days, include_current)
+        return data
     
-    def convert_to_csv(self, weather_data: Dict[str, Any], location: str, 
-                      start_date: str, end_date: str) -> Tuple[str, str]:
+    def date_list(self, start_date: str, end_date: str) -> List[str]:
+        """Every date of an inclusive range"""
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(end_date, '%Y-%m-%d').date()
+        if end < start:
+            raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+        return [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    
+    def missing_runs(self, days: List[str], records: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """Contiguous (start, end) runs of days that are not cached, cut into request windows
+
+        A run longer than window_days is cut on a fixed grid of window_days
+        (by day ordinal), so overlapping long requests ask for the same
+        windows and share their fetches. Shorter runs go out as one request.
         """
-        Convert weather data to CSV format
+        runs = []
+        for day in days:
+            if records.get(day) is not None:
+                continue
+            previous = (datetime.strptime(day, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+            if runs and runs[-1][1] == previous:
+                runs[-1] = (runs[-1][0], day)
+            else:
+                runs.append((day, day))
+        
+        windows = []
+        for run_start, run_end in runs:
+            first = datetime.strptime(run_start, '%Y-%m-%d').date().toordinal()
+            last = datetime.strptime(run_end, '%Y-%m-%d').date().toordinal()
+            if last - first < self.window_days:
+                windows.append((run_start, run_end))
+                continue
+            while first <= last:
+                end = min(last, (first // self.window_days + 1) * self.window_days - 1)
+                windows.append((date.fromordinal(first).isoformat(), date.fromordinal(end).isoformat()))
+                first = end + 1
+        return windows
+    
+    async def load_archived(self, location_key, days: List[str], records: Dict[str, Any]) -> None:
+        """Fill past days missing from the memory cache from the on-disk archive"""
+        today = date.today().isoformat()
+        past_missing = [day for day in days if records[day] is None and day < today]
+        if not past_missing:
+            return
+        
+        archived = await asyncio.to_thread(self.archive.get_days, location_key, past_missing[0], past_missing[-1])
+        for day in past_missing:
+            if day in archived:
+                records[day] = archived[day]
+                self.cache.put_day(location_key, day, archived[day])
+    
+    async def fetch_run(self, location: str, location_key, start_date: str, end_date: str,
+                        api_key: str, include_current: bool, has_fallback: bool = False) -> Dict[str, Any]:
+        """
+        Fetch one missing run upstream (coalesced) and cache its days
+        
+        Each attempt first waits for its turn in the API key's rate limit and
+        is charged against its daily quota. Raises BudgetExceeded when the
+        limiter refuses it (see WeatherRateLimiter.acquire).
+        """
+        async def fetch_and_store():
+            data = await self.fetch_upstream(location, start_date, end_date, api_key, include_current, has_fallback)
+            meta = {k: v for k, v in data.items() if k != 'days'}
+            self.cache.put_meta(location_key, meta)
+            for record in data.get('days') or []:
+                self.cache.put_day(location_key, record['datetime'], record)
+            
+            # Observed days never change: keep them on disk for good
+            today = date.today().isoformat()
+            past = [record for record in data.get('days') or [] if record.get('datetime', today) < today]
+            if past:
+                await asyncio.to_thread(self.archive.put_days, location_key, past)
+                await asyncio.to_thread(self.archive.put_meta, location_key, meta)
+            return data
+        
+        flight_key = (location_key, start_date, end_date, api_key)
+        return await self.cache.single_flight(flight_key, fetch_and_store)
+    
+    def serve_stale(self, location_key, days: List[str], records: Dict[str, Any]) -> List[str]:
+        """Fill missing forecast days with records expired less than stale_ttl ago; returns their dates"""
+        if self.stale_ttl <= 0:
+            return []
+        today = date.today().isoformat()
+        stale = []
+        for day in days:
+            if records[day] is None and day >= today:
+                record = self.cache.get_stale_day(location_key, day, max_stale=self.stale_ttl)
+                if record is not None:
+                    records[day] = record
+                    stale.append(day)
+        return stale
+    
+    def revalidate(self, location: str, location_key, days: List[str], api_key: str,
+                   include_current: bool) -> None:
+        """
+        Refresh days in the background (stale-while-revalidate); callers do not wait
+        
+        Runs already being fetched are left to that fetch. A refresh that would
+        wait or dip into the quota reserve is refused by the limiter; the key's
+        refreshes then pause for the refusal's retry_after instead of being
+        refused again on every request. cache.revalidations counts the
+        refreshes that were sent upstream.
+        """
+        if time.monotonic() < self._refresh_paused.get(api_key, 0.0):
+            return
+        for run_start, run_end in self.missing_runs(days, {}):
+            flight_key = (location_key, run_start, run_end, api_key)
+            if flight_key in self._refreshes or self.cache.in_flight(flight_key):
+                continue
+            task = asyncio.ensure_future(self.fetch_run(location, location_key, run_start, run_end, api_key,
+                                                        include_current, has_fallback=True))
+            self._refreshes[flight_key] = task
+            task.add_done_callback(lambda task, flight_key=flight_key: self._refresh_done(flight_key, task))
+    
+    def _refresh_done(self, flight_key: Tuple, task: asyncio.Task) -> None:
+        self._refreshes.pop(flight_key, None)
+        api_key = flight_key[-1]
+        if task.cancelled():
+            return
+        error = task.exception()
+        if isinstance(error, BudgetExceeded):
+            resume = time.monotonic() + max(error.retry_after, self.backoff)
+            self._refresh_paused[api_key] = max(self._refresh_paused.get(api_key, 0.0), resume)
+            return
+        self.cache.revalidations += 1
+        if error is not None:
+            print(f"❌ Background weather refresh failed: {getattr(error, 'detail', error)}")
+    
+    async def refresh(self, location: str, start_date: str, end_date: str, api_key: str,
+                      include_current: bool = False) -> int:
+        """Fetch a range upstream whatever the cache holds (pre-warming); returns the days stored"""
+        self.validate_dates(start_date, end_date)
+        location_key = (self.cache.normalize_location(location), include_current)
+        results = await asyncio.gather(*(
+            self.fetch_run(location, location_key, run_start, run_end, api_key, include_current)
+            for run_start, run_end in self.missing_runs(self.date_list(start_date, end_date), {})
+        ))
+        return sum(len(data.get('days') or []) for data in results)
+    
+    async def fetch_weather_data(self, location: str, start_date: str, end_date: str, 
+                                 api_key: str, include_current: bool = False) -> Dict[str, Any]:
+        """
+        Fetch weather data from Visual Crossing API
+        
+        Days are served from the in-memory cache, then from the on-disk
+        archive (past days); only the remaining runs of the range go
+        upstream, in windows of at most window_days fetched concurrently
+        (max_concurrency at a time) and cached one by one. Identical
+        concurrent misses share one request.
         
+        Forecast days that expired less than stale_ttl ago are returned as
+        they are and refreshed in the background (stale-while-revalidate).
+        
+        Upstream requests go through the rate limiter. A window whose days
+        are all still cached, though expired, is served from those stale
+        records when the limiter refuses it. Without stale records a refusal
+        is a 429. Dates served stale either way are listed under `stale_days`.
+        
+        Args:
+            location: Location (city, address, or coordinates)
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            api_key: Visual Crossing API key
+            include_current: Whether to include current conditions
+            
         Returns:
-            Tuple of (csv_content, filename)
+            Dictionary containing weather data
         """
-        if 'days' not in weather_data:
-            raise HTTPException(status_code=404, detail="No weather data found for the specified location and date range")
+        self.validate_dates(start_date, end_date)
+        days = self.date_list(start_date, end_date)
+        location_key = (self.cache.normalize_location(location), include_current)
         
-        df = pd.DataFrame(weather_data['days'])
+        records = {day: self.cache.get_day(location_key, day) for day in days}
+        await self.load_archived(location_key, days, records)
+        stale_days = self.serve_stale(location_key, days, records)
+        if stale_days:
+            self.revalidate(location, location_key, stale_days, api_key, include_current)
+        runs = self.missing_runs(days, records)
+        if runs:
+            # Expired records covering a whole run are its fallback
+            stale = {}
+            for run in runs:
+                found = {day: self.cache.get_stale_day(location_key, day) for day in self.date_list(*run)}
+                stale[run] = found if None not in found.values() else None
+            results = await asyncio.gather(*(
+                self.fetch_run(location, location_key, run_start, run_end, api_key, include_current,
+                               has_fallback=stale[(run_start, run_end)] is not None)
+                for run_start, run_end in runs
+            ), return_exceptions=True)
+            
+            for i, (run, data) in enumerate(zip(runs, results)):
+                if not isinstance(data, BaseException):
+                    continue
+                if not isinstance(data, BudgetExceeded):
+                    raise data
+                if stale[run] is None:
+                    raise HTTPException(status_code=429, detail=f"Weather API budget exhausted: {data.reason}",
+                                        headers={"Retry-After": str(math.ceil(data.retry_after))})
+                records.update(stale[run])
+                stale_days.extend(stale[run])
+                results[i] = {}
+            
+            # Each day is taken from the window that asked for it, once
+            for (run_start, run_end), data in zip(runs, results):
+                for record in data.get('days') or []:
+                    day = record.get('datetime')
+                    if day in records and run_start <= day <= run_end and records[day] is None:
+                        records[day] = record
         
-        # Add location info
-        df['location'] = weather_data.get('address', location)
-        df['latitude'] = weather_data.get('latitude', '')
-        df['longitude'] = weather_data.get('longitude', '')
+        meta = self.cache.get_meta(location_key)
+        if meta is None:
+            meta = await asyncio.to_thread(self.archive.get_meta, location_key)
+            if meta is not None:
+                self.cache.put_meta(location_key, meta)
         
-        # Reorder columns for better readability
-        columns_order = ['location', 'latitude', 'longitude', 'datetime'] + [
-            col for col in df.columns if col not in ['location', 'latitude', 'longitude', 'datetime']
+        weather_data = dict(meta or {})
+        weather_data['days'] = [records[day] for day in days if records[day] is not None]
+        if stale_days:
+            weather_data['stale_days'] = sorted(stale_days)
+        return weather_data
+    
+    def csv_filename(self, location: str, start_date: str, end_date: str) -> str:
+        safe_location = location.replace(',', '_').replace(' ', '_')
+        return f"weather_forecast_{safe_location}_{start_date}_to_{end_date}.csv"
+    
+    def csv_columns(self, days: List[Dict[str, Any]]) -> Tuple[List[str], bool]:
+        """CSV header and whether rows are hourly (any day carries hours)"""
+        hourly = any(day.get('hours') for day in days)
+        fields = {}
+        if hourly:
+            for day in days:
+                for hour in day.get('hours') or []:
+                    fields.update(dict.fromkeys(hour))
+            fields.pop('datetime', None)
+            leading = self.CSV_LOCATION_COLUMNS + ['datetime', 'hour']
+        else:
+            leading = self.CSV_LOCATION_COLUMNS + ['datetime']
+        for day in days:
+            fields.update(dict.fromkeys(key for key in day if key not in fields))
+        for column in leading + ['hours']:
+            fields.pop(column, None)
+        return leading + list(fields), hourly
+    
+    def iter_csv(self, weather_data: Dict[str, Any], location: str) -> Iterator[str]:
+        """
+        Render weather data as CSV text chunks, one row per day
+        
+        When the days include hours (include_current) there is one row per
+        hour instead: the hour's values, its day's date in `datetime`, the
+        hour in `hour`, and the day-only fields (tempmax, description...).
+        Only one chunk of rows is held in memory at a time.
+        
+        Raises HTTPException (404) right away when there are no days.
+        """
+        return self.iter_batch_csv({location: weather_data})
+    
+    def iter_batch_csv(self, results: Dict[str, Dict[str, Any]]) -> Iterator[str]:
+        """
+        Render weather data of several locations as one long-format CSV
+        
+        Rows are those of iter_csv, location after location, under one
+        header covering the fields of every location.
+        
+        Raises HTTPException (404) right away when no location has days.
+        """
+        places = [
+            ([weather_data.get('address', location), weather_data.get('latitude', ''),
+              weather_data.get('longitude', '')], weather_data.get('days') or [])
+            for location, weather_data in results.items()
         ]
-        df = df.reindex(columns=columns_order)
+        if not any(days for _, days in places):
+            raise HTTPException(status_code=404, detail="No weather data found for the specified location and date range")
         
-        # Convert DataFrame to CSV
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_content = csv_buffer.getvalue()
+        columns, hourly = self.csv_columns([day for _, days in places for day in days])
+        fields = columns[len(self.CSV_LOCATION_COLUMNS) + (2 if hourly else 1):]
         
-        # Create filename
-        safe_location = location.replace(',', '_').replace(' ', '_')
-        filename = f"weather_forecast_{safe_location}_{start_date}_to_{end_date}.csv"
+        def rows():
+            for place, days in places:
+                for day in days:
+                    if not hourly:
+                        yield place + [day.get('datetime')] + [day.get(field) for field in fields]
+                        continue
+                    for hour in day.get('hours') or []:
+                        yield place + [day.get('datetime'), hour.get('datetime')] + [
+                            hour[field] if field in hour else day.get(field) for field in fields
+                        ]
+        
+        def chunks():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator='\n')
+            writer.writerow(columns)
+            remaining = rows()
+            while True:
+                writer.writerows(itertools.islice(remaining, self.CSV_CHUNK_ROWS))
+                if not buffer.tell():
+                    return
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        return chunks()
+    
+    def convert_to_csv(self, weather_data: Dict[str, Any], location: str, 
+                      start_date: str, end_date: str) -> Tuple[str, str]:
+        """
+        Convert weather data to CSV format
         
-        return csv_content, filename
+        Returns:
+            Tuple of (csv_content, filename)
+        """
+        content = ''.join(self.iter_csv(weather_data, location))
+        return content, self.csv_filename(location, start_date, end_date)
     
-    def get_weather_forecast(self, location: str, start_date: str, end_date: str, 
-                           api_key: str, format_type: str = "json", 
-                           include_current: bool = False) -> Dict[str, Any]:
+    async def get_weather_forecast(self, location: str, start_date: str, end_date: str, 
+                                   api_key: str, format_type: str = "json", 
+                                   include_current: bool = False) -> Dict[str, Any]:
         """
         Get weather forecast in specified format
         
@@ -108,14 +570,89 @@ class WeatherService:
         Returns:
             Weather data in requested format
         """
-        weather_data = self.fetch_weather_data(location, start_date, end_date, api_key, include_current)
+        weather_data = await self.fetch_weather_data(location, start_date, end_date, api_key, include_current)
         
         if format_type.lower() == "csv":
-            csv_content, filename = self.convert_to_csv(weather_data, location, start_date, end_date)
+            # content is an iterator of CSV text chunks, rendered as it is consumed
             return {
-                "content": csv_content,
-                "filename": filename,
+                "content": self.iter_csv(weather_data, location),
+                "filename": self.csv_filename(location, start_date, end_date),
                 "media_type": "text/csv"
             }
         else:
             return weather_data
+    
+    async def fetch_weather_batch(self, locations: List[str], start_date: str, end_date: str,
+                                  api_key: str, include_current: bool = False) -> Dict[str, Any]:
+        """
+        Fetch one date range for several locations concurrently
+        
+        Each location goes through fetch_weather_data (cache, archive,
+        windows), all at once on the pooled client, so the wall time is
+        about that of the slowest location while no more than
+        max_concurrency upstream requests are in flight. A location that
+        fails is reported under `errors` instead of failing the batch.
+        
+        Args:
+            locations: Locations (duplicates are fetched once)
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            api_key: Visual Crossing API key
+            include_current: Whether to include current conditions
+            
+        Returns:
+            {"start_date", "end_date", "locations": {location: weather data},
+             "errors": {location: {"status_code", "detail"}}}
+        """
+        self.validate_dates(start_date, end_date)
+        self.date_list(start_date, end_date)
+        locations = list(dict.fromkeys(location.strip() for location in locations if location.strip()))
+        if not locations:
+            raise HTTPException(status_code=400, detail="Provide at least one location")
+        if len(locations) > self.MAX_BATCH_LOCATIONS:
+            raise HTTPException(status_code=400, detail=f"At most {self.MAX_BATCH_LOCATIONS} locations per request")
+        
+        outcomes = await asyncio.gather(*(
+            self.fetch_weather_data(location, start_date, end_date, api_key, include_current)
+            for location in locations
+        ), return_exceptions=True)
+        
+        results, errors = {}, {}
+        for location, outcome in zip(locations, outcomes):
+            if isinstance(outcome, HTTPException):
+                errors[location] = {"status_code": outcome.status_code, "detail": outcome.detail}
+            elif isinstance(outcome, Exception):
+                errors[location] = {"status_code": 500, "detail": f"Internal server error: {str(outcome)}"}
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[location] = outcome
+        
+        return {"start_date": start_date, "end_date": end_date, "locations": results, "errors": errors}
+    
+    async def get_weather_batch(self, locations: List[str], start_date: str, end_date: str,
+                                api_key: str, format_type: str = "json",
+                                include_current: bool = False) -> Dict[str, Any]:
+        """
+        Get weather for several locations in specified format
+        
+        JSON is the result of fetch_weather_batch. CSV is one long-format
+        table (a `location` column per row) of the locations that succeeded,
+        with the failed ones under "errors".
+        """
+        batch = await self.fetch_weather_batch(locations, start_date, end_date, api_key, include_current)
+        
+        if format_type.lower() == "csv":
+            try:
+                content = self.iter_batch_csv(batch["locations"])
+            except HTTPException as e:
+                # Nothing to render: say why each location came back empty
+                raise HTTPException(status_code=e.status_code, detail={"message": e.detail, "errors": batch["errors"]})
+            return {
+                "content": content,
+                "filename": f"weather_batch_{start_date}_to_{end_date}.csv",
+                "media_type": "text/csv",
+                "errors": batch["errors"]
+            }
+        else:
+            return batch
@@ -0,0 +1,97 @@
+# Rebuild the ingredient history from a directory of rekaphari_produk exports
+#
+# Every rekaphari_produk_YYYY-MM-DD.csv is aggregated in parallel with the same
+# logic as SalesService, then all pivot rows are written in one sorted
+# transaction and ingredients_historical.csv is exported atomically once.
+#
+#   python backfill-sales.py data/exports
+#   python backfill-sales.py data/exports --workers 8 --replace
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app.services.sales_service import SalesService, aggregate_sales_file
+
+EXPORT_PATTERN = re.compile(r'^rekaphari_produk_(\d{4}-\d{2}-\d{2})\.csv$')
+
+
+def discover_exports(exports_dir: str, recursive: bool = False) -> dict:
+    """{date: path} of every export under exports_dir"""
+    exports = {}
+    for root, dirs, files in os.walk(exports_dir):
+        for name in files:
+            match = EXPORT_PATTERN.match(name)
+            if match:
+                if match.group(1) in exports:
+                    print(f"⚠️  Duplicate export for {match.group(1)}, using {os.path.join(root, name)}")
+                exports[match.group(1)] = os.path.join(root, name)
+        if not recursive:
+            break
+    return dict(sorted(exports.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill ingredients_historical from rekaphari_produk exports")
+    parser.add_argument('exports_dir', nargs='?', default='data', help='directory with the exports (default: data)')
+    parser.add_argument('--data-dir', default=None, help='service data directory (default: data)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (default: all cores)')
+    parser.add_argument('--recursive', action='store_true', help='also search subdirectories')
+    parser.add_argument('--replace', action='store_true', help='drop dates that have no export')
+    parser.add_argument('--dry-run', action='store_true', help='aggregate and report without writing')
+    args = parser.parse_args()
+
+    exports = discover_exports(args.exports_dir, args.recursive)
+    if not exports:
+        print(f"❌ No rekaphari_produk_YYYY-MM-DD.csv files in {args.exports_dir}")
+        return 1
+
+    service = SalesService(data_dir=args.data_dir)
+    print(f"Found {len(exports)} exports ({next(iter(exports))} .. {next(reversed(exports))}), "
+          f"{args.workers} workers")
+
+    rows, day_counts, failed = [], {}, {}
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(aggregate_sales_file, service.data_dir, date, path): date
+            for date, path in exports.items()
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            date = futures[future]
+            try:
+                result = future.result()
+                rows.append(result['pivot_row'])
+                day_counts[result['pivot_row']['TANGGAL']] = result['product_servings']
+            except Exception as e:
+                failed[date] = str(e)
+            if done % 100 == 0 or done == len(futures):
+                print(f"   {done}/{len(futures)} days aggregated")
+    aggregate_seconds = time.perf_counter() - start
+
+    rows.sort(key=lambda row: row['TANGGAL'])
+    if failed and args.replace and not args.dry_run:
+        # --replace drops every date not in rows: a failed export would delete that day's history
+        for date, error in failed.items():
+            print(f"❌ {date}: {error}")
+        print(f"❌ Refusing to --replace with {len(failed)} failed exports; nothing was written. "
+              f"Fix them or rerun without --replace")
+        return 1
+    if not args.dry_run and rows:
+        service.bulk_update_historical_data(rows, replace=args.replace, day_counts=day_counts)
+        service.export_historical_csv()
+        print(f"✅ Exported {service.historical_file}")
+    total_seconds = time.perf_counter() - start
+
+    for date, error in failed.items():
+        print(f"❌ {date}: {error}")
+    print(f"Processed {len(rows)} days in {total_seconds:.2f}s "
+          f"({len(rows) / aggregate_seconds:.1f} days/s aggregating, {len(rows) / total_seconds:.1f} days/s overall)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
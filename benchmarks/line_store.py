@@ -0,0 +1,94 @@
+# Benchmark: columnar line store vs re-reading the raw rekaphari_produk exports
+#
+# Writes synthetic exports for a span of days, stores their cleaned lines in a
+# SalesLineStore and compares disk size plus the time of a 30-day range scan,
+# a single-product scan over the whole span and a full scan against parsing
+# and cleaning the matching raw CSVs.
+#
+# Run from the repository root:
+#   python -m benchmarks.line_store
+
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pandas as pd
+
+from app.services.sales_service import SalesService
+
+DAYS = 180
+LINES_PER_DAY = 10_000
+EXTRA_PRODUCTS = [
+    'Es Teh Manis', 'Nasi Putih', 'Tahu Goreng', 'Tempe Mendoan', 'Bakso Sapi',
+    'Ayam Geprek Sambal', 'Spaghetti Bolognese', 'Kopi Susu', 'Cumi Goreng Tepung'
+]
+
+
+def write_export(path: str, day_seed: int, menu: list):
+    rng = random.Random(day_seed)
+    with open(path, 'w') as f:
+        f.write('REKAP HARIAN PRODUK,,\nOutlet Demo,,\nPRODUK,JUMLAH,HARGA\n')
+        for _ in range(LINES_PER_DAY):
+            f.write(f'"{rng.choice(menu)}",{rng.randint(1, 9)},{rng.randint(5, 50) * 1000}\n')
+        f.write('HARGA JUAL,,100000\nDiskon,,0\n')
+
+
+def read_raw(service: SalesService, exports: dict, days: list, product: str = None) -> pd.DataFrame:
+    """The alternative without a line store: parse and clean the raw exports again"""
+    frames = []
+    for day in days:
+        df = service.clean_and_filter_data(service.read_sales_csv(exports[day]), day)
+        frames.append(df[df['PRODUK'] == product] if product else df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def timed(fn, repeat: int = 3):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        service = SalesService(data_dir=os.path.join(tmp, 'data'))
+        store = service.line_store
+        menu = list(service.MENU_INGREDIENTS) + EXTRA_PRODUCTS
+        days = [(date(2025, 1, 1) + timedelta(days=i)).isoformat() for i in range(DAYS)]
+
+        exports = {}
+        for i, day in enumerate(days):
+            exports[day] = os.path.join(tmp, f'rekaphari_produk_{day}.csv')
+            write_export(exports[day], i, menu)
+            df = service.clean_and_filter_data(service.read_sales_csv(exports[day]), day)
+            store.replace_day(day, df[['PRODUK', 'JUMLAH']])
+
+        raw_mb = sum(os.path.getsize(path) for path in exports.values()) / 1e6
+        store_mb = store.size_bytes() / 1e6
+        print(f"{DAYS} days x {LINES_PER_DAY} lines: raw exports {raw_mb:.1f} MB, "
+              f"line store {store_mb:.1f} MB ({store_mb / raw_mb:.1%})")
+
+        window = days[60:90]
+        product = 'Nasi rempah cumi'
+        cases = [
+            ("30-day range", lambda: store.scan(window[0], window[-1]),
+             lambda: read_raw(service, exports, window)),
+            ("1 product, all days", lambda: store.scan(products=[product]),
+             lambda: read_raw(service, exports, days, product)),
+            ("all days", lambda: store.scan(),
+             lambda: read_raw(service, exports, days)),
+        ]
+        print(f"{'scan':>20} {'rows':>10} {'store (ms)':>11} {'raw CSV (ms)':>13}")
+        for name, scan, raw in cases:
+            store_seconds, table = timed(scan)
+            raw_seconds, frame = timed(raw, repeat=1)
+            assert table.num_rows == len(frame)
+            print(f"{name:>20} {table.num_rows:>10} {store_seconds * 1000:>11.1f} {raw_seconds * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
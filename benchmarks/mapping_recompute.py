@@ -0,0 +1,86 @@
+# Benchmark: sparse repricing after a mapping change vs recomputing every day
+#
+# Fills a temporary data directory with three years of synthetic per-product
+# counts (squid dishes sell on about one day in five), changes the squid
+# portion and times SalesService.recompute_for_mapping. The baseline recomputes
+# and rewrites every column of every day from the same counts (already a lot
+# cheaper than reprocessing the raw exports); results must match.
+#
+# Run from the repository root:
+#   python -m benchmarks.mapping_recompute
+
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services.sales_service import SalesService
+
+DAYS = 3 * 365
+SQUID_DAY_SHARE = 0.2
+
+
+class SquidPortionChanged(SalesService):
+    INGREDIENT_PORTIONS = {**SalesService.INGREDIENT_PORTIONS, 'squid': 90}
+
+
+def make_counts(service: SalesService, seed: int = 0) -> dict:
+    """{date: {product: servings}} with squid dishes on a share of the days"""
+    rng = random.Random(seed)
+    menu = list(service.MENU_INGREDIENTS) + ['Es Teh Manis', 'Nasi Putih', 'Kopi Susu', 'Cumi Goreng Tepung']
+    squid = [p for p in menu if 'squid' in service.detect_ingredients(p) or 'cumi' in p.lower()]
+    others = [p for p in menu if p not in squid]
+
+    counts = {}
+    for i in range(DAYS):
+        day = (date(2023, 1, 1) + timedelta(days=i)).isoformat()
+        products = rng.sample(others, 25) + (squid if rng.random() < SQUID_DAY_SHARE else [])
+        counts[day] = {p: float(rng.randint(1, 40)) for p in products}
+    return counts
+
+
+def full_recompute(service: SalesService, counts: dict) -> dict:
+    """Every pivot column of every day from the counts"""
+    weights = service.pivot_weights({p for day in counts.values() for p in day})
+    return {
+        day: {col: round(sum(n * weights[p][col] for p, n in day_counts.items()), 2) for col in service.PIVOT_COLUMNS}
+        for day, day_counts in counts.items()
+    }
+
+
+def main():
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = SalesService(data_dir=data_dir)
+        counts = make_counts(service)
+        rows = [{'TANGGAL': day, **values} for day, values in full_recompute(service, counts).items()]
+        service.bulk_update_historical_data(rows, day_counts=counts)
+        service.recompute_for_mapping()
+
+        changed = SquidPortionChanged(data_dir=data_dir)
+        start = time.perf_counter()
+        summary = changed.recompute_for_mapping()
+        sparse_ms = (time.perf_counter() - start) * 1000
+
+        frame = changed.load_historical_data()
+        baseline = SquidPortionChanged(data_dir=data_dir)
+        start = time.perf_counter()
+        expected = full_recompute(baseline, counts)
+        baseline.bulk_update_historical_data([{'TANGGAL': day, **values} for day, values in expected.items()],
+                                             day_counts=counts)
+        full_ms = (time.perf_counter() - start) * 1000
+
+        for day, values in expected.items():
+            for col, value in values.items():
+                assert np.isclose(frame.at[np.datetime64(day), col], value, rtol=1e-6), (day, col)
+
+        print(f"{DAYS} days, {len(summary['changed_products'])} changed products, "
+              f"columns {summary['changed_columns']}, {summary['days_updated']} days rewritten")
+        print(f"sparse recompute: {sparse_ms:8.1f} ms")
+        print(f"full recompute:   {full_ms:8.1f} ms (all columns of all days, counts already in memory)")
+        print(f"sparse speedup:   {full_ms / sparse_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# Benchmark: model load time and single-date prediction latency
+#
+# Run from the repository root:
+#   python -m benchmarks.prediction
+
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.services.prediction_service import ModelRegistry, PredictionService
+from app.services.sales_service import SalesService
+
+REQUESTS = 2_000
+BATCH_SIZES = [1, 7, 14, 30, 90]
+WARMUP = 50
+HISTORY_DAYS = 365 * 3
+
+
+def make_history(path: str, days: int = HISTORY_DAYS, end: str = '2025-07-10'):
+    """Write a synthetic ingredients_historical.csv"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'TANGGAL': pd.date_range(end=end, periods=days, freq='D').strftime('%Y-%m-%d')})
+    for column, mean in [('chicken', 9000), ('beef', 3000), ('squid', 2000), ('tempe', 300), ('tahu', 300)]:
+        df[column] = np.round(rng.normal(mean, mean / 5, days), 2)
+    df.to_csv(path, index=False)
+
+
+def percentile_ms(samples, q):
+    return np.percentile(samples, q) * 1000
+
+
+def main():
+    start = time.perf_counter()
+    registry = ModelRegistry()
+    load_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Imported into the store by SalesService on first start
+        make_history(os.path.join(tmp, "ingredients_historical.csv"))
+        sales_service = SalesService(data_dir=tmp)
+
+        service = PredictionService(sales_service, registry)
+        weather_day = {'temp': 27.5, 'feelslike': 30.1, 'dew': 23.0, 'humidity': 82.0, 'precip': 4.2}
+        dates = pd.date_range('2025-06-01', '2025-07-11').strftime('%Y-%m-%d').tolist()
+
+        for i in range(WARMUP):
+            service.predict(dates[i % len(dates)], weather_day)
+
+        samples = []
+        for i in range(REQUESTS):
+            start = time.perf_counter()
+            service.predict(dates[i % len(dates)], weather_day)
+            samples.append(time.perf_counter() - start)
+
+        batch_samples = {}
+        for size in BATCH_SIZES:
+            batch = pd.date_range('2025-07-01', periods=size).strftime('%Y-%m-%d').tolist()
+            weather_days = {day: weather_day for day in batch}
+            timings = []
+            for _ in range(200):
+                start = time.perf_counter()
+                service.predict_many(batch, weather_days)
+                timings.append(time.perf_counter() - start)
+            batch_samples[size] = timings
+
+    print(f"Model load (4 boosters): {load_seconds * 1000:.0f} ms")
+    print(f"Single-date prediction over {REQUESTS} requests, {HISTORY_DAYS} history days:")
+    print(f"  p50 {percentile_ms(samples, 50):.2f} ms   p99 {percentile_ms(samples, 99):.2f} ms   "
+          f"max {max(samples) * 1000:.2f} ms")
+    print("Batch prediction (predict_many):")
+    for size, timings in batch_samples.items():
+        print(f"  {size:>3} dates: p50 {percentile_ms(timings, 50):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Benchmark: buffered vs streaming processing of a /sales/upload-history file
+#
+# Generates synthetic rekaphari_produk exports of the requested sizes and runs
+# each path in a fresh subprocess, so peak RSS (ru_maxrss) belongs to that
+# path alone. "buffered" is the original route: read all bytes, wrap them in
+# BytesIO and build one DataFrame. "streaming" parses the spooled file in chunks.
+#
+# Run from the repository root:
+#   python -m benchmarks.upload_stream
+#   python -m benchmarks.upload_stream --sizes 1 100 1024
+
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.sales_service import SalesService
+
+DEFAULT_SIZES_MB = [1, 100]
+EXTRA_PRODUCTS = [
+    'Es Teh Manis', 'Nasi Putih', 'Tahu Goreng', 'Tempe Mendoan', 'Bakso Sapi',
+    'Ayam Geprek Sambal', 'Spaghetti Bolognese', 'Kopi Susu', 'Cumi Goreng Tepung'
+]
+
+
+def make_export(path: str, size_mb: int, seed: int = 0):
+    """Write a synthetic export of roughly size_mb megabytes"""
+    rng = random.Random(seed)
+    menu = list(SalesService.MENU_INGREDIENTS) + EXTRA_PRODUCTS
+    # Pre-render a block of lines and repeat it; generation is not what we measure
+    block = ''.join(f'"{rng.choice(menu)}",{rng.randint(1, 9)},{rng.randint(5, 50) * 1000}\n' for _ in range(10_000))
+    with open(path, 'w') as f:
+        f.write('REKAP HARIAN PRODUK,,\nOutlet Demo,,\nPRODUK,JUMLAH,HARGA\n')
+        for _ in range(max(1, size_mb * 1024 * 1024 // len(block))):
+            f.write(block)
+        f.write('HARGA JUAL,,100000\nDiskon,,0\n')
+
+
+def run_path(mode: str, path: str):
+    """Child process: process one file and print timing plus peak RSS as JSON"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        service = SalesService(data_dir=data_dir)
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            if mode == 'buffered':
+                content = f.read()
+                result = service.process_sales_history('2025-07-06', service.read_sales_csv(io.BytesIO(content)))
+            else:
+                result = service.process_sales_stream('2025-07-06', f)
+        elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"seconds": elapsed, "peak_rss_mb": peak_mb, "ingredients": result["ingredients_needed"]}))
+
+
+def measure(mode: str, path: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.upload_stream', '--run', mode, path],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES_MB, help='file sizes in MB')
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_path(*args.run)
+        return
+
+    print(f"{'size (MB)':>10} {'path':>10} {'time (s)':>9} {'MB/s':>8} {'peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes:
+            path = os.path.join(tmp, f'export_{size_mb}mb.csv')
+            make_export(path, size_mb)
+            actual_mb = os.path.getsize(path) / (1024 * 1024)
+
+            results = {}
+            for mode in ['buffered', 'streaming']:
+                results[mode] = measure(mode, path)
+                r = results[mode]
+                print(f"{size_mb:>10} {mode:>10} {r['seconds']:>9.2f} {actual_mb / r['seconds']:>8.1f} "
+                      f"{r['peak_rss_mb']:>14.0f}")
+
+            assert results['buffered']['ingredients'] == results['streaming']['ingredients']
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
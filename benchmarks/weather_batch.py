@@ -0,0 +1,80 @@
+# Benchmark: per-location weather requests in series vs one batch request
+#
+# The stand-in upstream answers each location with its own latency, and fails
+# one location, like a large multi-outlet forecast. Compares calling
+# fetch_weather_data location after location with fetch_weather_batch.
+#
+# Run from the repository root:
+#   python -m benchmarks.weather_batch
+
+import asyncio
+import os
+import tempfile
+import time
+from urllib.parse import unquote, urlparse
+
+from app.services.weather_service import WeatherService
+from tests.weather_stand_in import StandInHandler, start_stand_in
+
+LATENCY = {"Jakarta": 0.30, "Bandung": 0.20, "Surabaya": 0.25, "Medan": 0.15, "Denpasar": 0.35}
+FAILING = "Nowhere"
+START, END = "2024-06-01", "2024-06-14"
+
+
+class LocationHandler(StandInHandler):
+    """Latency depends on the location; FAILING gets a 400"""
+
+    def do_GET(self):
+        location = unquote(urlparse(self.path).path.split('/')[-3])
+        if location == FAILING:
+            self.send_response(400)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.latency = LATENCY[location]
+        super().do_GET()
+
+
+def new_service(base_url: str, tmp: str) -> WeatherService:
+    # A fresh archive and cache per run, so every run goes upstream
+    service = WeatherService(base_url=base_url, archive_file=os.path.join(tmp, f"archive_{time.perf_counter_ns()}.db"),
+                             max_retries=0)
+    service.limiter.configure("bench", rate=1e6, burst=10**6, daily_quota=10**9)  # measure the client, not the limiter
+    return service
+
+
+async def serial(service: WeatherService, locations):
+    results = {}
+    for location in locations:
+        try:
+            results[location] = await service.fetch_weather_data(location, START, END, "bench")
+        except Exception:
+            pass
+    return results
+
+
+async def main():
+    server, base_url = start_stand_in(LocationHandler)
+    locations = list(LATENCY) + [FAILING]
+    print(f"{len(locations)} locations ({FAILING} fails), slowest {max(LATENCY.values()) * 1000:.0f} ms, "
+          f"sum {sum(LATENCY.values()) * 1000:.0f} ms")
+    print(f"{'mode':>8} {'locations':>10} {'errors':>7} {'wall (s)':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        service = new_service(base_url, tmp)
+        start = time.perf_counter()
+        results = await serial(service, locations)
+        elapsed = time.perf_counter() - start
+        await service.aclose()
+        print(f"{'serial':>8} {len(results):>10} {len(locations) - len(results):>7} {elapsed:>9.2f}")
+
+        service = new_service(base_url, tmp)
+        start = time.perf_counter()
+        batch = await service.fetch_weather_batch(locations, START, END, "bench")
+        elapsed = time.perf_counter() - start
+        await service.aclose()
+        print(f"{'batch':>8} {len(batch['locations']):>10} {len(batch['errors']):>7} {elapsed:>9.2f}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+# Benchmark: blocking requests.get vs the pooled async client in WeatherService
+#
+# Starts a local stand-in for the Visual Crossing timeline API (fixed latency),
+# fires concurrent fetches from one event loop and reports throughput plus the
+# longest event-loop stall seen by a heartbeat task.
+#
+# Run from the repository root:
+#   python -m benchmarks.weather_client
+
+import asyncio
+import os
+import tempfile
+import time
+
+import requests
+
+from app.services.weather_service import WeatherService
+from tests.weather_stand_in import StandInHandler, start_stand_in
+
+CONCURRENCY = [1, 10, 50]
+
+
+async def legacy_fetch(base_url: str, location: str, start: str, end: str) -> dict:
+    """The original fetch: blocking requests.get with no session and no timeout"""
+    response = requests.get(f"{base_url}/{location}/{start}/{end}", params={"key": "bench", "include": "days"})
+    response.raise_for_status()
+    return response.json()
+
+
+async def heartbeat(stop: asyncio.Event, stalls: list):
+    """Record how late a 10 ms timer fires; a blocked loop shows up as a large stall"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        stalls.append(time.perf_counter() - start - 0.01)
+
+
+async def run(fetch, concurrency: int):
+    stop, stalls = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, stalls))
+    start = time.perf_counter()
+    # Distinct locations per run so nothing is served from the weather cache
+    await asyncio.gather(*(fetch(f"loc{concurrency}-{i}") for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, max(stalls, default=0.0)
+
+
+async def main():
+    server, base_url = start_stand_in()
+    archive_dir = tempfile.TemporaryDirectory()
+    service = WeatherService(base_url=base_url, archive_file=os.path.join(archive_dir.name, "weather_archive.db"))
+    service.limiter.configure("bench", rate=1e6, burst=10**6, daily_quota=10**9)  # measure the client, not the limiter
+
+    print(f"Stand-in upstream latency: {StandInHandler.latency * 1000:.0f} ms")
+    print(f"{'concurrent':>10} {'client':>10} {'wall (s)':>9} {'req/s':>8} {'max loop stall (ms)':>20}")
+    for concurrency in CONCURRENCY:
+        for name, fetch in [
+            ("blocking", lambda loc: legacy_fetch(base_url, loc, "2025-07-01", "2025-07-07")),
+            ("async", lambda loc: service.fetch_weather_data(loc, "2025-07-01", "2025-07-07", "bench")),
+        ]:
+            elapsed, stall = await run(fetch, concurrency)
+            print(f"{concurrency:>10} {name:>10} {elapsed:>9.2f} {concurrency / elapsed:>8.1f} {stall * 1000:>20.0f}")
+
+    await service.aclose()
+    server.stop()
+    archive_dir.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
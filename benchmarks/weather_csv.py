@@ -0,0 +1,81 @@
+# Benchmark: streaming weather CSV export vs DataFrame + StringIO
+#
+# Renders a multi-year Visual Crossing shaped payload both ways and reports
+# time to the first chunk, total time and peak Python memory (tracemalloc) on
+# top of the parsed JSON. Daily output of both must parse to the same table.
+# With hours, the DataFrame exporter writes each day's hour list as one repr
+# string while the streaming one writes a row per hour.
+#
+# Run from the repository root:
+#   python -m benchmarks.weather_csv
+
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.services.weather_service import WeatherService
+from tests.weather_stand_in import make_payload
+
+START, END = "2022-01-01", "2025-12-31"
+
+
+def dataframe_csv(weather_data: dict, location: str) -> list:
+    """The original exporter: one DataFrame, reordered, rendered into a StringIO"""
+    df = pd.DataFrame(weather_data['days'])
+    df['location'] = weather_data.get('address', location)
+    df['latitude'] = weather_data.get('latitude', '')
+    df['longitude'] = weather_data.get('longitude', '')
+    columns_order = ['location', 'latitude', 'longitude', 'datetime'] + [
+        col for col in df.columns if col not in ['location', 'latitude', 'longitude', 'datetime']
+    ]
+    df = df.reindex(columns=columns_order)
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    return [buffer.getvalue()]
+
+
+def measure(render):
+    start = time.perf_counter()
+    chunks = iter(render())
+    first = next(chunks)
+    first_seconds = time.perf_counter() - start
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total_seconds = time.perf_counter() - start
+
+    # Separate pass: tracemalloc slows allocation down
+    tracemalloc.start()
+    for _ in render():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_seconds, total_seconds, peak, size
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        service = WeatherService(archive_file=os.path.join(tmp, "weather_archive.db"))
+
+        daily = make_payload("Jakarta", START, END)
+        expected = pd.read_csv(io.StringIO(dataframe_csv(daily, "Jakarta")[0]))
+        streamed = pd.read_csv(io.StringIO(''.join(service.iter_csv(daily, "Jakarta"))))
+        pd.testing.assert_frame_equal(expected, streamed)
+
+        hourly = make_payload("Jakarta", START, END, include_hours=True)
+        print(f"{len(hourly['days'])} days, {24 * len(hourly['days'])} hours")
+        print(f"{'exporter':>22} {'first chunk (ms)':>17} {'total (ms)':>11} {'peak MiB':>9} {'output MiB':>11}")
+        for name, render in [
+            ("DataFrame, daily", lambda: dataframe_csv(daily, "Jakarta")),
+            ("streaming, daily", lambda: service.iter_csv(daily, "Jakarta")),
+            ("DataFrame, hours", lambda: dataframe_csv(hourly, "Jakarta")),
+            ("streaming, hourly", lambda: service.iter_csv(hourly, "Jakarta")),
+        ]:
+            first, total, peak, size = measure(render)
+            print(f"{name:>22} {first * 1000:>17.1f} {total * 1000:>11.1f} {peak / 2**20:>9.1f} {size / 2**20:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
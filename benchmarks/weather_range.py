@@ -0,0 +1,57 @@
+# Benchmark: one-year weather backfill as one request vs concurrent windows
+#
+# The stand-in upstream takes a fixed latency plus a per-day cost, like a
+# large Visual Crossing timeline query. Compares one request for the whole
+# year against WeatherService's windowed fetch at a few concurrency limits.
+#
+# Run from the repository root:
+#   python -m benchmarks.weather_range
+
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date
+
+from app.services.weather_service import WeatherService
+from tests.weather_stand_in import StandInHandler, start_stand_in
+
+BASE_LATENCY = 0.15
+PER_DAY_LATENCY = 0.004
+START, END = "2024-01-01", "2024-12-31"
+
+
+class SizedHandler(StandInHandler):
+    """Latency grows with the number of days requested"""
+
+    def do_GET(self):
+        start, end = self.path.split('?')[0].split('/')[-2:]
+        self.latency = BASE_LATENCY + PER_DAY_LATENCY * ((date.fromisoformat(end) - date.fromisoformat(start)).days + 1)
+        super().do_GET()
+
+
+async def backfill(base_url: str, window_days: int, max_concurrency: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        service = WeatherService(base_url=base_url, archive_file=os.path.join(tmp, "weather_archive.db"),
+                                 window_days=window_days, max_concurrency=max_concurrency)
+        service.limiter.configure("bench", rate=1e6, burst=10**6, daily_quota=10**9)  # measure the client, not the limiter
+        served = SizedHandler.requests_served
+        start = time.perf_counter()
+        data = await service.fetch_weather_data("Jakarta", START, END, "bench")
+        elapsed = time.perf_counter() - start
+        await service.aclose()
+    return elapsed, SizedHandler.requests_served - served, len(data['days'])
+
+
+async def main():
+    server, base_url = start_stand_in(SizedHandler)
+    print(f"Stand-in latency: {BASE_LATENCY * 1000:.0f} ms + {PER_DAY_LATENCY * 1000:.0f} ms/day, {START} to {END}")
+    print(f"{'window':>8} {'concurrency':>12} {'requests':>9} {'days':>5} {'wall (s)':>9}")
+    for window_days, max_concurrency in [(100_000, 1), (31, 4), (31, 6), (31, 12)]:
+        elapsed, requests, days = await backfill(base_url, window_days, max_concurrency)
+        print(f"{window_days:>8} {max_concurrency:>12} {requests:>9} {days:>5} {elapsed:>9.2f}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
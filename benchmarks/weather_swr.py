@@ -0,0 +1,68 @@
+# Benchmark: forecast latency with and without stale-while-revalidate
+#
+# Pre-warms three outlet locations, then reads their 15-day forecast for a few
+# seconds while cache entries keep expiring (1 s forecast TTL against a 200 ms
+# stand-in upstream). Without stale-while-revalidate each expiry puts a caller
+# on the upstream path; with it, callers get the cached days and the refresh
+# runs in the background.
+#
+# Run from the repository root:
+#   python -m benchmarks.weather_swr
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app.services.weather_prewarm import WeatherPrewarmer
+from app.services.weather_service import WeatherService
+from tests.weather_stand_in import StandInHandler, start_stand_in
+
+LOCATIONS = ["Jakarta", "Bandung", "Surabaya"]
+FORECAST_TTL = 1.0
+DURATION = 5.0
+CLIENTS = 10
+
+
+async def read_forecasts(base_url: str, stale_ttl: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        service = WeatherService(base_url=base_url, archive_file=os.path.join(tmp, "weather_archive.db"))
+        service.limiter.configure("bench", rate=1e6, burst=10**6, daily_quota=10**9)  # measure the cache, not the limiter
+        service.cache.forecast_ttl = FORECAST_TTL
+        service.stale_ttl = stale_ttl
+        await WeatherPrewarmer(service, locations=LOCATIONS, api_key="bench").run_once()
+
+        start, end = date.today().isoformat(), (date.today() + timedelta(days=14)).isoformat()
+        latencies = []
+        served = StandInHandler.requests_served
+        stop_at = time.perf_counter() + DURATION
+
+        async def client():
+            while time.perf_counter() < stop_at:
+                began = time.perf_counter()
+                await service.fetch_weather_data(random.choice(LOCATIONS), start, end, "bench")
+                latencies.append(time.perf_counter() - began)
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*(client() for _ in range(CLIENTS)))
+        upstream = StandInHandler.requests_served - served
+        await service.aclose()
+
+    latencies.sort()
+    return len(latencies), latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)], upstream
+
+
+async def main():
+    server, base_url = start_stand_in()
+    print(f"{len(LOCATIONS)} locations, 15-day forecast, TTL {FORECAST_TTL:.0f} s, {CLIENTS} clients for {DURATION:.0f} s")
+    print(f"{'mode':>24} {'reads':>6} {'p50 (ms)':>9} {'p99 (ms)':>9} {'upstream':>9}")
+    for name, stale_ttl in [("expire and refetch", 0), ("stale-while-revalidate", 3600)]:
+        reads, p50, p99, upstream = await read_forecasts(base_url, stale_ttl)
+        print(f"{name:>24} {reads:>6} {p50 * 1000:>9.1f} {p99 * 1000:>9.1f} {upstream:>9}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.api.weather import router as weather_router
-from app.api.sales import router as sales_router
+from app.api.weather import router as weather_router, prewarmer, weather_service
+from app.api.sales import router as sales_router, etl_pool, outlets, prediction_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Reprice stored history of every outlet if the menu mapping changed since the last start
+    outlets.fan_out(lambda outlet: outlet.sales.recompute_for_mapping())
+    # Pick up upload jobs interrupted by the last shutdown
+    outlets.resume_jobs()
+    # Swap in model files replaced while running
+    prediction_service.registry.start_watching()
+    # Refresh configured locations' forecasts ahead of the morning run
+    prewarmer.start()
+    yield
+    await prewarmer.stop()
+    prediction_service.registry.stop_watching()
+    # Close the pooled weather client
+    await weather_service.aclose()
+    # Let running uploads finish
+    etl_pool.shutdown()
+    outlets.shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Demand Forecast Endpoint",
     description="API for weather forecasting and AI inference",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Include routers
@@ -22,10 +45,22 @@ async def root():
             "weather_forecast": "/weather/forecast",
             "weather_forecast_json": "/weather/forecast/json",
             "weather_forecast_csv": "/weather/forecast/csv",
+            "weather_forecast_batch": "/weather/forecast/batch",
+            "weather_cache_stats": "/weather/cache/stats",
+            "weather_limiter_stats": "/weather/limiter/stats",
+            "weather_prewarm": "/weather/prewarm",
             "sales_history": "/sales/history",
             "sales_data": "/sales/data/{date}",
             "predict_demand": "/sales/predict-demand",
-            "upload_sales_history": "/sales/upload-history"
+            "predict_demand_batch": "/sales/predict-demand/batch",
+            "predict_demand_outlets": "/sales/predict-demand/outlets",
+            "outlets": "/sales/outlets",
+            "outlet_history_totals": "/sales/outlets/history",
+            "models": "/sales/models",
+            "prediction_cache_stats": "/sales/predict-demand/cache/stats",
+            "upload_sales_history": "/sales/upload-history",
+            "upload_job_status": "/sales/jobs/{job_id}",
+            "etl_stats": "/sales/etl/stats"
         }
     }
 
@@ -65,6 +65,58 @@ def test_csv_endpoint():
     else:
         print(f"❌ Error: {response.status_code} - {response.text}")
 
+def test_csv_gzip():
+    """Test the streamed CSV with gzip and hourly rows"""
+    print("Testing gzip-compressed hourly CSV...")
+    
+    params = {
+        "location": LOCATION,
+        "start_date": START_DATE,
+        "end_date": END_DATE,
+        "api_key": API_KEY,
+        "format_type": "csv",
+        "include_current": True
+    }
+    
+    response = requests.get(f"{BASE_URL}/weather/forecast", params=params, headers={"Accept-Encoding": "gzip"})
+    
+    if response.status_code == 200 and response.headers.get("Content-Encoding") == "gzip":
+        lines = response.text.splitlines()
+        print(f"✅ gzip CSV received: {len(lines) - 1} hourly rows")
+        print(f"   Columns: {lines[0]}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.headers.get('Content-Encoding')} - {response.text[:200]}")
+
+def test_weather_batch():
+    """Test the multi-location batch endpoint (JSON and long-format CSV)"""
+    print("Testing weather batch endpoint...")
+    
+    body = {
+        "locations": [LOCATION, "Bandung, Indonesia"],
+        "start_date": START_DATE,
+        "end_date": END_DATE,
+        "api_key": API_KEY
+    }
+    
+    response = requests.post(f"{BASE_URL}/weather/forecast/batch", json=body)
+    
+    if response.status_code == 200:
+        data = response.json()
+        print(f"✅ Batch received: {len(data['locations'])} locations, {len(data['errors'])} errors")
+        for location, weather_data in data['locations'].items():
+            print(f"   {location}: {len(weather_data.get('days', []))} days")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+        return
+    
+    response = requests.post(f"{BASE_URL}/weather/forecast/batch", json={**body, "format_type": "csv"})
+    
+    if response.status_code == 200:
+        lines = response.text.splitlines()
+        print(f"✅ Batch CSV received: {len(lines) - 1} rows, failed: {response.headers.get('X-Failed-Locations')}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
 def test_json_endpoint():
     """Test the JSON weather forecast endpoint (backward compatibility)"""
     print("Testing JSON endpoint (backward compatibility)...")
@@ -85,6 +137,51 @@ def test_json_endpoint():
     else:
         print(f"❌ Error: {response.status_code} - {response.text}")
 
+def test_cache_stats():
+    """Test the weather cache statistics endpoint"""
+    print("Testing weather cache stats endpoint...")
+    
+    response = requests.get(f"{BASE_URL}/weather/cache/stats")
+    
+    if response.status_code == 200:
+        stats = response.json()
+        print(f"✅ Cache hits: {stats['hits']}, misses: {stats['misses']}, "
+              f"upstream requests: {stats['upstream_requests']}, coalesced: {stats['coalesced_requests']}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
+def test_limiter_stats():
+    """Test the upstream rate limiter / quota statistics endpoint"""
+    print("Testing weather limiter stats endpoint...")
+    
+    response = requests.get(f"{BASE_URL}/weather/limiter/stats")
+    
+    if response.status_code == 200:
+        stats = response.json()
+        print(f"✅ Limiter defaults: {stats['defaults']}, quota resets in {stats['quota_resets_in']}s")
+        for key, state in stats['keys'].items():
+            print(f"   key {key}: {state['records_used']}/{state['daily_quota']} records, "
+                  f"{state['tokens_available']} tokens, {state['waiting']} waiting, "
+                  f"{state['stale_fallbacks']} stale fallbacks")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
+def test_prewarm_status():
+    """Test the forecast pre-warming status endpoint"""
+    print("Testing weather pre-warm endpoint...")
+    
+    response = requests.get(f"{BASE_URL}/weather/prewarm")
+    
+    if response.status_code == 200:
+        status = response.json()
+        if status['enabled']:
+            print(f"✅ Pre-warming {len(status['locations'])} locations at {', '.join(status['times'])}, "
+                  f"next run {status['next_run']}, last run {status['last_run']}")
+        else:
+            print("✅ Pre-warming disabled (set WEATHER_PREWARM_LOCATIONS and WEATHER_PREWARM_API_KEY)")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
 if __name__ == "__main__":
     print("Weather Forecast API Test")
     print("=" * 30)
@@ -109,3 +206,13 @@ if __name__ == "__main__":
         test_json_endpoint()
         print()
         test_csv_endpoint()
+        print()
+        test_csv_gzip()
+        print()
+        test_weather_batch()
+        print()
+        test_cache_stats()
+        print()
+        test_limiter_stats()
+        print()
+        test_prewarm_status()
@@ -0,0 +1,59 @@
+# Test script for backfill-sales.py against temporary export and data directories
+
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+
+from app.services.sales_service import SalesService
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backfill-sales.py")
+
+EXPORT = 'REKAP HARIAN PRODUK,,\nOutlet Demo,,\nPRODUK,JUMLAH,HARGA\n"Nasi Rempah Daging",7,7000\n'
+
+def run_backfill(*args) -> int:
+    """Run backfill-sales.py main() with the given arguments; returns its exit code"""
+    spec = importlib.util.spec_from_file_location("backfill_sales", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    argv, sys.argv = sys.argv, [SCRIPT, *args]
+    try:
+        return module.main()
+    finally:
+        sys.argv = argv
+
+def write_export(exports_dir: str, date: str, content):
+    mode = 'wb' if isinstance(content, bytes) else 'w'
+    with open(os.path.join(exports_dir, f"rekaphari_produk_{date}.csv"), mode) as f:
+        f.write(content)
+
+def test_replace_keeps_history_of_failed_exports():
+    """Test that --replace writes nothing when an export fails, instead of deleting its date"""
+    print("Testing --replace with a corrupt export...")
+    tmp = tempfile.mkdtemp()
+    try:
+        exports_dir, data_dir = os.path.join(tmp, "exports"), os.path.join(tmp, "data")
+        os.makedirs(exports_dir)
+        for date in ("2024-01-01", "2024-01-02"):
+            write_export(exports_dir, date, EXPORT)
+        assert run_backfill(exports_dir, "--data-dir", data_dir, "--workers", "1") == 0
+
+        write_export(exports_dir, "2024-01-02", b'REKAP,,\nOutlet,,\nPRODUK,JUMLAH,HARGA\n"\xff\xfe broken\n')
+        assert run_backfill(exports_dir, "--data-dir", data_dir, "--workers", "1", "--replace") == 1
+
+        service = SalesService(data_dir=data_dir)
+        assert service.history_store.get("2024-01-02") is not None, "history of the failed date was deleted"
+        assert len(service.count_store.counts_for_days(["2024-01-02"])) == 1, "product counts were deleted"
+        print("✅ --replace refused; history and product counts of the failed date kept")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    print("Backfill Test")
+    print("=" * 40)
+
+    test_replace_keeps_history_of_failed_exports()
+
+    print("\n" + "=" * 40)
+    print("🚀 All backfill checks passed!")
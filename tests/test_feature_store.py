@@ -0,0 +1,105 @@
+# Test script for the lag/rolling feature store (no server needed)
+
+import random
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from app.services.feature_store import FeatureStore
+
+TARGETS = ["chicken", "squid"]
+FIRST_DAY = date(2025, 1, 1).toordinal()
+DAYS = 120
+
+def make_values(seed: int = 0) -> np.ndarray:
+    """Dense daily values with a few days missing (NaN)"""
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0, 5000, size=(DAYS, len(TARGETS))).round(2)
+    values[rng.choice(DAYS, size=15, replace=False)] = np.nan
+    return values
+
+def reference_features(store: FeatureStore, values: np.ndarray) -> np.ndarray:
+    """From-scratch features with pandas for days first_day .. last + horizon"""
+    index = pd.RangeIndex(len(values) + store.horizon)
+    frame = pd.DataFrame(values, columns=TARGETS).reindex(index)
+    blocks = []
+    for target in TARGETS:
+        series = frame[target]
+        for lag in range(1, store.lags + 1):
+            blocks.append(series.shift(lag))
+        for window in store.windows:
+            previous = series.shift(1).rolling(window, min_periods=1)
+            blocks.append(previous.mean())
+            blocks.append(previous.std(ddof=0))
+    blocks.append(pd.Series((FIRST_DAY + index - 1) % 7, index=index))
+    return np.column_stack(blocks).astype(np.float64)
+
+def test_rebuild_matches_reference():
+    """Test batch build against pandas"""
+    print("Testing FeatureStore.rebuild...")
+
+    values = make_values()
+    store = FeatureStore(TARGETS)
+    store.rebuild(FIRST_DAY, values)
+
+    expected = reference_features(store, values)
+    assert store.batch_features().shape == expected.shape
+    assert np.allclose(store.batch_features(), expected, equal_nan=True)
+    print(f"✅ {store.rows} rows x {len(store.columns)} features match pandas")
+
+def test_incremental_matches_rebuild():
+    """Test day-by-day updates (any order, gaps, earlier days) against a batch build"""
+    print("\nTesting FeatureStore.set_day...")
+
+    values = make_values(1)
+    order = [i for i in range(DAYS) if not np.isnan(values[i]).all()]
+    random.Random(1).shuffle(order)
+
+    store = FeatureStore(TARGETS)
+    for i in order:
+        store.set_day(FIRST_DAY + i, values[i])
+    # Correct a few days after the fact
+    for i in order[:10]:
+        values[i] = values[i] + 1.5
+        store.set_day(FIRST_DAY + i, values[i])
+
+    batch = FeatureStore(TARGETS)
+    first = min(order)
+    batch.rebuild(FIRST_DAY + first, values[first:max(order) + 1])
+
+    assert store.first_day == batch.first_day and store.rows == batch.rows
+    assert np.allclose(store.batch_features(), batch.batch_features(), equal_nan=True)
+    print(f"✅ {len(order) + 10} updates match the batch build")
+
+def test_lookup():
+    """Test lookups inside and outside the materialized rows"""
+    print("\nTesting FeatureStore.lookup...")
+
+    values = make_values(2)
+    store = FeatureStore(TARGETS)
+    store.rebuild(FIRST_DAY, values)
+    expected = reference_features(store, values)
+
+    days = [FIRST_DAY + 40, FIRST_DAY + DAYS, FIRST_DAY - 3, FIRST_DAY + DAYS + 500]
+    result = store.lookup(days)
+    assert np.allclose(result[0], expected[40], equal_nan=True)
+    assert np.allclose(result[1], expected[DAYS], equal_nan=True)
+    assert np.isnan(result[2:, :-1]).all()
+    assert list(result[:, -1]) == [date.fromordinal(day).weekday() for day in days]
+
+    columns = ["squid_lag_1", "day_of_week"]
+    assert np.allclose(store.lookup(days[:1], columns), expected[40:41, [store.column_index[c] for c in columns]],
+                       equal_nan=True)
+    print("✅ Lookups match, unknown dates are NaN apart from the day of week")
+
+if __name__ == "__main__":
+    print("Feature Store Test")
+    print("=" * 40)
+
+    test_rebuild_matches_reference()
+    test_incremental_matches_rebuild()
+    test_lookup()
+
+    print("\n" + "=" * 40)
+    print("🚀 All feature store checks passed!")
@@ -0,0 +1,53 @@
+# Test script for background upload jobs against a temporary data directory
+
+import asyncio
+import hashlib
+import io
+import shutil
+import tempfile
+
+from app.services.etl_pool import EtlPool
+from app.services.ingest_jobs import IngestJobManager
+from app.services.sales_service import SalesService
+
+UPLOADS = {
+    'A': b'REKAP HARIAN PRODUK,,\nOutlet Demo,,\nPRODUK,JUMLAH,HARGA\n"Nasi Rempah Daging",7,7000\n',
+    'B': b'REKAP HARIAN PRODUK,,\nOutlet Demo,,\nPRODUK,JUMLAH,HARGA\n"Nasi Rempah Daging",2,7000\n'
+}
+
+def test_resubmit_while_superseded_job_runs():
+    """Test that resubmitting a job still in progress reuses it, and that jobs of a date land in order"""
+    print("Testing upload A, B, then A again while A is still queued...")
+    tmp = tempfile.mkdtemp()
+    try:
+        sales = SalesService(data_dir=tmp)
+        jobs = IngestJobManager(sales, EtlPool())
+
+        async def submit_all():
+            submitted = []
+            for name in ('A', 'B', 'A'):
+                job, created = await jobs.submit("2025-07-06", io.BytesIO(UPLOADS[name]), "rekap.csv")
+                submitted.append((job['job_id'], created))
+            errors = await asyncio.gather(*list(jobs._tasks), return_exceptions=True)
+            return submitted, errors
+
+        submitted, errors = asyncio.run(submit_all())
+
+        job_a = jobs.job_id_for("2025-07-06", hashlib.sha256(UPLOADS['A']).hexdigest())
+        assert [created for _, created in submitted] == [True, True, False]
+        assert submitted[2][0] == job_a and errors == [None, None]
+        assert jobs.status(job_a)['status'] == 'succeeded'
+        # B was submitted after A's first run, so it is the one stored
+        assert sales.history_store.get("2025-07-06")['beef'] == 200.0
+        print("✅ A reused while queued; B stored last")
+    finally:
+        shutil.rmtree(tmp)
+
+if __name__ == "__main__":
+    print("Ingest Job Test")
+    print("=" * 40)
+
+    test_resubmit_while_superseded_job_runs()
+
+    print("\n" + "=" * 40)
+    print("🚀 All ingest job checks passed!")
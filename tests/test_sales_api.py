@@ -1,5 +1,6 @@
 # Test script for Sales API placeholder endpoints
 
+import time
 import requests
 from pathlib import Path
 
@@ -10,13 +11,13 @@ def test_get_sales_history():
     """Test getting sales history"""
     print("Testing GET /sales/history...")
     
-    response = requests.get(f"{BASE_URL}/sales/history")
+    response = requests.get(f"{BASE_URL}/sales/history", params={"limit": 10})
     
     if response.status_code == 200:
         result = response.json()
         print("✅ Success!")
         print(f"   Message: {result['message']}")
-        print(f"   Available dates: {result['available_dates']}")
+        print(f"   Available dates: {result['available_dates']} (total {result['total']})")
     else:
         print(f"❌ Error: {response.status_code} - {response.text}")
 
@@ -36,6 +37,23 @@ def test_get_sales_data():
     else:
         print(f"❌ Error: {response.status_code} - {response.text}")
 
+def test_sales_data_not_modified():
+    """Test that an unchanged date answers 304 to If-None-Match"""
+    print("\nTesting GET /sales/data/{date} with If-None-Match...")
+    
+    test_date = "2025-07-06"
+    first = requests.get(f"{BASE_URL}/sales/data/{test_date}")
+    etag = first.headers.get("ETag")
+    
+    if first.status_code == 200 and etag:
+        response = requests.get(f"{BASE_URL}/sales/data/{test_date}", headers={"If-None-Match": etag})
+        if response.status_code == 304:
+            print(f"✅ Success! ETag {etag} -> 304 Not Modified")
+        else:
+            print(f"❌ Error: expected 304, got {response.status_code}")
+    else:
+        print(f"❌ Error: {first.status_code} - {first.text}")
+
 def test_predict_demand():
     """Test demand prediction"""
     print("\nTesting POST /sales/predict-demand...")
@@ -52,6 +70,54 @@ def test_predict_demand():
     else:
         print(f"❌ Error: {response.status_code} - {response.text}")
 
+def test_predict_demand_batch():
+    """Test batch demand prediction over a date range"""
+    print("\nTesting POST /sales/predict-demand/batch...")
+    
+    data = {'start_date': '2025-07-07', 'end_date': '2025-07-13'}
+    response = requests.post(f"{BASE_URL}/sales/predict-demand/batch", data=data)
+    
+    if response.status_code == 200:
+        result = response.json()
+        print("✅ Success!")
+        print(f"   Message: {result['message']}")
+        print(f"   Dates: {result['dates']}")
+        print(f"   Predictions: {result['predictions']}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
+def test_get_models():
+    """Test reporting the active model versions"""
+    print("\nTesting GET /sales/models...")
+    
+    response = requests.get(f"{BASE_URL}/sales/models")
+    
+    if response.status_code == 200:
+        result = response.json()
+        print("✅ Success!")
+        print(f"   Version: {result['version']} (reloads: {result['reloads']}, watching: {result['watching']})")
+        for target, model in result['models'].items():
+            print(f"   {target}: {model['sha256'][:12]} loaded {model['loaded_at']}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
+def test_prediction_cache_stats():
+    """Test that a repeated prediction is served from the cache"""
+    print("\nTesting GET /sales/predict-demand/cache/stats...")
+    
+    before = requests.get(f"{BASE_URL}/sales/predict-demand/cache/stats").json()
+    for _ in range(2):
+        requests.post(f"{BASE_URL}/sales/predict-demand", data={'date': '2025-07-07'})
+    response = requests.get(f"{BASE_URL}/sales/predict-demand/cache/stats")
+    
+    if response.status_code == 200 and response.json()['hits'] > before['hits']:
+        stats = response.json()
+        print("✅ Success!")
+        print(f"   Hits: {stats['hits']}, misses: {stats['misses']}, hit rate: {stats['hit_rate']}")
+        print(f"   Entries: {stats['entries']}, model version: {stats['model_version']}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
 def test_upload_sales_history():
     """Test uploading sales history"""
     print("\nTesting POST /sales/upload-history...")
@@ -84,6 +150,131 @@ def test_upload_sales_history():
         # Cleanup temp file
         Path("temp_test.csv").unlink(missing_ok=True)
 
+def test_upload_sales_history_async():
+    """Test queuing an upload as a background job and polling its status"""
+    print("\nTesting POST /sales/upload-history (async_mode)...")
+    
+    csv_content = "REKAP HARIAN PRODUK,,\nOutlet,,\nPRODUK,JUMLAH,HARGA\nAyam Goreng,5,50000\n"
+    files = {'file': ('test_sales.csv', csv_content.encode(), 'text/csv')}
+    data = {'date': '2025-07-06', 'async_mode': 'true'}
+    
+    response = requests.post(f"{BASE_URL}/sales/upload-history", files=files, data=data)
+    
+    if response.status_code not in (200, 202):
+        print(f"❌ Error: {response.status_code} - {response.text}")
+        return
+    
+    job = response.json()
+    print(f"✅ Job {job['job_id']} {job['status']}")
+    
+    for _ in range(30):
+        job = requests.get(f"{BASE_URL}{job['status_url']}").json()
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        time.sleep(1)
+    
+    if job['status'] == 'succeeded':
+        print("✅ Success!")
+        print(f"   Rows read: {job['rows_read']}")
+        print(f"   Ingredients needed: {job['ingredients_needed']}")
+    else:
+        print(f"❌ Job ended as {job['status']}: {job['error']}")
+
+def test_upload_resubmit_after_newer():
+    """Test that resubmitting an older upload after a newer one for the same date reprocesses it"""
+    print("\nTesting upload A, B, then A again for one date (async_mode)...")
+    
+    uploads = {
+        'A': "REKAP HARIAN PRODUK,,\nOutlet,,\nPRODUK,JUMLAH,HARGA\nAyam Goreng,5,50000\n",
+        'B': "REKAP HARIAN PRODUK,,\nOutlet,,\nPRODUK,JUMLAH,HARGA\nAyam Goreng,9,90000\n"
+    }
+    data = {'date': '2025-07-05', 'async_mode': 'true'}
+    
+    for name in ('A', 'B', 'A'):
+        files = {'file': ('test_sales.csv', uploads[name].encode(), 'text/csv')}
+        response = requests.post(f"{BASE_URL}/sales/upload-history", files=files, data=data)
+        if response.status_code not in (200, 202):
+            print(f"❌ Error: {response.status_code} - {response.text}")
+            return
+        job = response.json()
+        for _ in range(30):
+            job = requests.get(f"{BASE_URL}{job['status_url']}").json()
+            if job['status'] in ('succeeded', 'failed'):
+                break
+            time.sleep(1)
+    
+    # The last A must have been queued again (202), not answered with its first job
+    if response.status_code == 202 and job['status'] == 'succeeded':
+        history = requests.get(f"{BASE_URL}/sales/data/2025-07-05").json()
+        print("✅ Success! A was reprocessed after B")
+        print(f"   Stored: {history}")
+    else:
+        print(f"❌ Last upload returned {response.status_code}, job {job['status']}")
+
+def test_outlets():
+    """Test uploading to a second outlet and predicting across all outlets"""
+    print("\nTesting outlet partitions...")
+    
+    csv_content = "REKAP HARIAN PRODUK,,\nOutlet,,\nPRODUK,JUMLAH,HARGA\nNasi Rempah Ayam,7,25000\n"
+    files = {'file': ('test_sales.csv', csv_content.encode(), 'text/csv')}
+    data = {'date': '2025-07-06', 'outlet': 'test-outlet'}
+    
+    response = requests.post(f"{BASE_URL}/sales/upload-history", files=files, data=data)
+    if response.status_code != 200:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+        return
+    print(f"✅ Uploaded to outlet {response.json()['outlet']}")
+    
+    outlets = requests.get(f"{BASE_URL}/sales/outlets").json()
+    print(f"   Outlets: {outlets['dates_per_outlet']}")
+    
+    response = requests.post(f"{BASE_URL}/sales/predict-demand/outlets", data={'start_date': '2025-07-07'})
+    if response.status_code == 200:
+        result = response.json()
+        print("✅ Success!")
+        print(f"   Message: {result['message']}")
+        print(f"   Totals: {result['totals']}")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
+def test_rejected_upload_creates_no_outlet():
+    """Test that an upload with a bad date or file is refused before its outlet partition is created"""
+    print("\nTesting rejected uploads to a new outlet...")
+    
+    csv_content = "REKAP HARIAN PRODUK,,\nOutlet,,\nPRODUK,JUMLAH,HARGA\nNasi Rempah Ayam,7,25000\n"
+    attempts = [
+        ('not-a-date', csv_content.encode()),
+        ('2025-07-06', b"\xff\xfe not a csv export")
+    ]
+    for date, content in attempts:
+        files = {'file': ('test_sales.csv', content, 'text/csv')}
+        data = {'date': date, 'outlet': 'rejected-outlet'}
+        response = requests.post(f"{BASE_URL}/sales/upload-history", files=files, data=data)
+        if response.status_code != 400:
+            print(f"❌ Expected 400 for date {date}, got {response.status_code} - {response.text}")
+            return
+    
+    outlets = requests.get(f"{BASE_URL}/sales/outlets").json()
+    if 'rejected-outlet' in outlets['outlets']:
+        print(f"❌ Rejected uploads created an outlet: {outlets['outlets']}")
+    else:
+        print("✅ Success! Both uploads got 400 and no outlet was created")
+
+def test_etl_stats():
+    """Test ETL worker pool metrics"""
+    print("\nTesting GET /sales/etl/stats...")
+    
+    response = requests.get(f"{BASE_URL}/sales/etl/stats")
+    
+    if response.status_code == 200:
+        stats = response.json()
+        print("✅ Success!")
+        print(f"   Workers: {stats['max_workers']} ({stats['executor']}), queue: {stats['max_queue']}")
+        print(f"   Completed: {stats['completed']}, rejected: {stats['rejected']}")
+        print(f"   Run time p50: {stats['run_time_p50']}s")
+    else:
+        print(f"❌ Error: {response.status_code} - {response.text}")
+
 if __name__ == "__main__":
     print("Sales API Placeholder Test")
     print("=" * 40)
@@ -91,8 +282,17 @@ if __name__ == "__main__":
     # Test all placeholder endpoints
     test_get_sales_history()
     test_get_sales_data()
+    test_sales_data_not_modified()
     test_predict_demand()
+    test_predict_demand_batch()
+    test_get_models()
+    test_prediction_cache_stats()
     test_upload_sales_history()
+    test_upload_sales_history_async()
+    test_upload_resubmit_after_newer()
+    test_outlets()
+    test_rejected_upload_creates_no_outlet()
+    test_etl_stats()
     
     print("\n" + "=" * 40)
     print("🚀 All placeholder endpoints tested!")
@@ -0,0 +1,141 @@
+# Test script for the upstream rate limiter and daily quota against a local stand-in upstream (no API key needed)
+
+import asyncio
+import time
+from datetime import date, timedelta
+
+from fastapi import HTTPException
+
+from tests.weather_stand_in import StandInHandler, with_service
+
+class TimedHandler(StandInHandler):
+    """Stand-in that logs when each request arrives"""
+
+    latency = 0.0
+    arrivals = []
+    started = 0.0
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            TimedHandler.arrivals.append(time.monotonic())
+        super().do_GET()
+
+class ThrottledHandler(TimedHandler):
+    """Stand-in that answers its first request with 429 and a Retry-After"""
+
+    retry_after = 0.4
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            TimedHandler.arrivals.append(time.monotonic())
+            throttled = len(TimedHandler.arrivals) == 1
+        if not throttled:
+            return StandInHandler.do_GET(self)
+        self.send_response(429)
+        self.send_header("Retry-After", str(self.retry_after))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+def with_timed_service(test, handler=TimedHandler, max_retries=0, **limits):
+    """with_service on a fresh arrival log; limits go to the test key"""
+    TimedHandler.arrivals = []
+    return with_service(test, handler, limits, max_retries=max_retries, backoff=0.01)
+
+def forecast_range(days: int):
+    """Future dates: never archived, so every expired read goes back upstream"""
+    start = date.today() + timedelta(days=1)
+    return start.isoformat(), (start + timedelta(days=days - 1)).isoformat()
+
+def test_burst_waits_in_turn():
+    """Test that a burst over the rate is queued and spread out instead of failing"""
+    print("Testing a burst over the rate limit...")
+    rate, burst, requests = 20, 2, 8
+    start_date, end_date = forecast_range(1)
+
+    async def burst_of_locations(service):
+        TimedHandler.started = time.monotonic()
+        return await asyncio.gather(*(
+            service.fetch_weather_data(f"Outlet {i}", start_date, end_date, "test") for i in range(requests)
+        ))
+
+    results = with_timed_service(burst_of_locations, rate=rate, burst=burst)
+
+    assert all(len(data['days']) == 1 for data in results)
+    span = max(TimedHandler.arrivals) - TimedHandler.started
+    assert span >= (requests - burst) / rate * 0.9, f"requests were not spread out ({span:.3f}s)"
+    print(f"✅ {requests} requests answered, spread over {span:.2f}s at {rate}/s with burst {burst}")
+
+def test_quota_falls_back_to_stale():
+    """Test that a nearly spent quota serves expired cache entries, and refuses without them"""
+    print("\nTesting the daily quota fallback...")
+    start_date, end_date = forecast_range(3)
+
+    async def spend_quota(service):
+        service.cache.forecast_ttl = 0
+        first = await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        second = await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        try:
+            await service.fetch_weather_data("Bandung", start_date, end_date, "test")
+            refused = None
+        except HTTPException as e:
+            refused = e
+        return first, second, refused, service.limiter.stats()
+
+    # Enough for one request; a second would dip into the 10% reserve
+    first, second, refused, stats = with_timed_service(spend_quota, daily_quota=5)
+
+    assert len(TimedHandler.arrivals) == 1, "the quota should allow exactly one upstream request"
+    assert 'stale_days' not in first
+    assert second['stale_days'] == [day['datetime'] for day in second['days']] and len(second['days']) == 3
+    assert refused is not None and refused.status_code == 429 and 'Retry-After' in refused.headers
+    key_stats = next(iter(stats['keys'].values()))
+    assert key_stats['records_used'] == 3 and key_stats['stale_fallbacks'] == 1 and key_stats['rejected'] == 1
+    assert "test" not in stats['keys'], "metrics must not expose API keys"
+    print(f"✅ stale days served, then 429 (used {key_stats['records_used']}/{key_stats['daily_quota']} records)")
+
+def test_retry_goes_through_limiter():
+    """Test that a retry after a 429 takes a token, honours Retry-After and keeps the 429 charged"""
+    print("\nTesting a retry after an upstream 429...")
+    start_date, end_date = forecast_range(1)
+
+    async def throttled(service):
+        data = await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        return data, service.limiter.stats()
+
+    data, stats = with_timed_service(throttled, handler=ThrottledHandler, max_retries=2)
+
+    key_stats = next(iter(stats['keys'].values()))
+    assert len(data['days']) == 1 and len(TimedHandler.arrivals) == 2
+    gap = TimedHandler.arrivals[1] - TimedHandler.arrivals[0]
+    assert gap >= ThrottledHandler.retry_after * 0.9, f"retry ignored Retry-After ({gap:.3f}s)"
+    assert key_stats['requests'] == 2 and key_stats['records_used'] == 2
+    print(f"✅ retried after {gap:.2f}s, {key_stats['requests']} attempts charged")
+
+def test_include_current_fits_quota():
+    """Test that a long include_current range is not refused on a fresh process"""
+    print("\nTesting a long include_current range...")
+    start = date.today() + timedelta(days=1)
+    start_date, end_date = start.isoformat(), (start + timedelta(days=59)).isoformat()
+
+    async def long_range(service):
+        data = await service.fetch_weather_data("Jakarta", start_date, end_date, "test", include_current=True)
+        return data, service.limiter.stats()
+
+    data, stats = with_timed_service(long_range, daily_quota=1000)
+
+    key_stats = next(iter(stats['keys'].values()))
+    assert len(data['days']) == 60 and key_stats['rejected'] == 0
+    assert key_stats['records_used'] == 60
+    print(f"✅ 60 days with hours fetched for {key_stats['records_used']} records")
+
+if __name__ == "__main__":
+    print("Weather Limiter Test")
+    print("=" * 40)
+
+    test_burst_waits_in_turn()
+    test_quota_falls_back_to_stale()
+    test_retry_goes_through_limiter()
+    test_include_current_fits_quota()
+
+    print("\n" + "=" * 40)
+    print("🚀 All limiter checks passed!")
@@ -0,0 +1,106 @@
+# Test script for stale-while-revalidate and forecast pre-warming against a local stand-in upstream (no API key needed)
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+from app.services.weather_prewarm import WeatherPrewarmer
+from tests.weather_stand_in import StandInHandler, with_service
+
+class SlowHandler(StandInHandler):
+    latency = 0.3
+
+def test_stale_forecast_served_while_refreshing():
+    """Test that an expired forecast day is returned at once and refreshed in the background"""
+    print("Testing stale-while-revalidate...")
+    start = date.today() + timedelta(days=1)
+    start_date, end_date = start.isoformat(), (start + timedelta(days=6)).isoformat()
+
+    async def expire_and_read(service):
+        service.cache.forecast_ttl = 0
+        await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        served = SlowHandler.requests_served
+
+        loop = asyncio.get_running_loop()
+        began = loop.time()
+        stale = await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        elapsed = loop.time() - began
+
+        service.cache.forecast_ttl = 3600
+        while service._refreshes:
+            await asyncio.sleep(0.05)
+        fresh = await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        return stale, elapsed, fresh, SlowHandler.requests_served - served, service.cache.stats()
+
+    stale, elapsed, fresh, upstream, stats = with_service(expire_and_read, SlowHandler)
+
+    assert elapsed < SlowHandler.latency, f"stale read waited for upstream ({elapsed:.3f}s)"
+    assert len(stale['days']) == 7 and len(stale['stale_days']) == 7
+    assert upstream == 1 and stats['revalidations'] == 1
+    assert len(fresh['days']) == 7 and 'stale_days' not in fresh
+    print(f"✅ stale read in {elapsed * 1000:.1f} ms, refreshed by {upstream} background request")
+
+def test_refresh_coalesced_and_paused():
+    """Test that concurrent stale reads start one refresh, and that a refused refresh is not retried per read"""
+    print("\nTesting refresh coalescing and back-off...")
+    start = date.today() + timedelta(days=1)
+    start_date, end_date = start.isoformat(), (start + timedelta(days=6)).isoformat()
+
+    async def stale_reads(service):
+        service.cache.forecast_ttl = 0
+        await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+        await asyncio.gather(*(service.fetch_weather_data("Jakarta", start_date, end_date, "test") for _ in range(3)))
+        while service._refreshes:
+            await asyncio.sleep(0.05)
+        coalesced = service.cache.stats()['revalidations']
+
+        # 14 of 20 records used: the next refresh would exhaust the quota
+        service.limiter.configure("test", daily_quota=20)
+        scheduled = []
+        for _ in range(3):
+            await service.fetch_weather_data("Jakarta", start_date, end_date, "test")
+            scheduled.append(len(service._refreshes))
+            while service._refreshes:
+                await asyncio.sleep(0.05)
+        key_stats = next(iter(service.limiter.stats()['keys'].values()))
+        return coalesced, scheduled, service.cache.stats()['revalidations'], key_stats
+
+    coalesced, scheduled, revalidations, key_stats = with_service(stale_reads, SlowHandler)
+
+    assert coalesced == 1, f"{coalesced} refreshes for one stale range"
+    assert scheduled == [1, 0, 0] and key_stats['stale_fallbacks'] == 1
+    assert revalidations == 1, "a refused refresh must not count as a revalidation"
+    print(f"✅ one refresh for concurrent stale reads; refreshes paused after {key_stats['stale_fallbacks']} refusal")
+
+def test_prewarm():
+    """Test the pre-warm schedule and that a run fills the cache"""
+    print("\nTesting forecast pre-warming...")
+
+    async def prewarm(service):
+        prewarmer = WeatherPrewarmer(service, locations=["Jakarta", "Bandung"], api_key="test",
+                                     times=["05:30", "11:00"], days=15)
+        assert prewarmer.next_run(datetime(2025, 7, 1, 6, 0)) == datetime(2025, 7, 1, 11, 0)
+        assert prewarmer.next_run(datetime(2025, 7, 1, 11, 0)) == datetime(2025, 7, 2, 5, 30)
+        result = await prewarmer.run_once()
+
+        served = SlowHandler.requests_served
+        today = date.today()
+        data = await service.fetch_weather_data("Bandung", today.isoformat(),
+                                                (today + timedelta(days=14)).isoformat(), "test")
+        return result, len(data['days']), SlowHandler.requests_served - served
+
+    result, days, upstream = with_service(prewarm, SlowHandler)
+
+    assert result == {"Jakarta": {"days": 15}, "Bandung": {"days": 15}}
+    assert days == 15 and upstream == 0, "pre-warmed forecast should come from the cache"
+    print(f"✅ pre-warmed {len(result)} locations; forecast read without upstream requests")
+
+if __name__ == "__main__":
+    print("Weather Refresh Test")
+    print("=" * 40)
+
+    test_stale_forecast_served_while_refreshing()
+    test_refresh_coalesced_and_paused()
+    test_prewarm()
+
+    print("\n" + "=" * 40)
+    print("🚀 All refresh checks passed!")
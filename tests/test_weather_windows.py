@@ -0,0 +1,88 @@
+# Test script for windowed weather range fetching against a local stand-in upstream (no API key needed)
+
+import asyncio
+import time
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
+from tests.weather_stand_in import StandInHandler, make_payload, with_service
+
+WINDOW_DAYS = 31
+MAX_CONCURRENCY = 4
+
+class RecordingHandler(StandInHandler):
+    """Stand-in that logs each requested window and answers days newest first,
+    plus the day before the window (which the previous window also returns)"""
+
+    latency = 0.05
+    windows = []
+    in_flight = 0
+    max_in_flight = 0
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            RecordingHandler.in_flight += 1
+            RecordingHandler.max_in_flight = max(RecordingHandler.max_in_flight, RecordingHandler.in_flight)
+        try:
+            time.sleep(self.latency)
+            location, start, end = urlparse(self.path).path.split('/')[-3:]
+            with StandInHandler.lock:
+                RecordingHandler.windows.append((start, end))
+
+            before = (date.fromisoformat(start) - timedelta(days=1)).isoformat()
+            data = make_payload(location, before, end)
+            data['days'].reverse()
+            self.send_json(data)
+        finally:
+            with StandInHandler.lock:
+                RecordingHandler.in_flight -= 1
+
+def run_fetches(*ranges):
+    """Fetch ranges concurrently from a fresh service; returns (results, requested windows)"""
+    RecordingHandler.windows, RecordingHandler.max_in_flight = [], 0
+
+    async def fetch_all(service):
+        return await asyncio.gather(*(
+            service.fetch_weather_data("Jakarta", start, end, "test") for start, end in ranges
+        ))
+
+    results = with_service(fetch_all, RecordingHandler, window_days=WINDOW_DAYS, max_concurrency=MAX_CONCURRENCY)
+    return results, list(RecordingHandler.windows)
+
+def test_year_in_windows():
+    """Test that a one-year range is fetched in bounded, concurrent windows and merged in order"""
+    print("Testing a one-year range in windows...")
+
+    (data,), windows = run_fetches(("2024-01-01", "2024-12-31"))
+
+    expected = [(date(2024, 1, 1) + timedelta(days=i)).isoformat() for i in range(366)]
+    days = [record['datetime'] for record in data['days']]
+    assert days == expected, "days must be complete, ordered and unique"
+    assert all((date.fromisoformat(b) - date.fromisoformat(a)).days < WINDOW_DAYS for a, b in windows)
+    # Windows follow a fixed grid of WINDOW_DAYS day ordinals
+    grid = {date.fromisoformat(day).toordinal() // WINDOW_DAYS for day in expected}
+    assert len(windows) == len(set(windows)) == len(grid)
+    assert RecordingHandler.max_in_flight <= MAX_CONCURRENCY
+    print(f"✅ {len(days)} days from {len(windows)} windows, at most {RecordingHandler.max_in_flight} in flight")
+
+def test_overlapping_ranges_share_windows():
+    """Test that concurrent overlapping ranges fetch each window once"""
+    print("\nTesting overlapping ranges...")
+
+    (first, second), windows = run_fetches(("2024-01-01", "2024-06-30"), ("2024-03-01", "2024-08-31"))
+
+    assert len(windows) == len(set(windows)), "a window was fetched twice"
+    assert [r['datetime'] for r in second['days']][0] == "2024-03-01"
+    assert [r['datetime'] for r in first['days']][-1] == "2024-06-30"
+    print(f"✅ {len(windows)} windows for two overlapping half-year ranges")
+
+if __name__ == "__main__":
+    print("Weather Window Test")
+    print("=" * 40)
+
+    start = time.perf_counter()
+    test_year_in_windows()
+    test_overlapping_ranges_share_windows()
+
+    print("\n" + "=" * 40)
+    print(f"🚀 All window checks passed in {time.perf_counter() - start:.1f}s!")
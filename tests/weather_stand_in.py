@@ -0,0 +1,103 @@
+# Local stand-in for the Visual Crossing timeline API, shared by the weather tests and benchmarks
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from app.services.weather_service import WeatherService
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers /timeline/{location}/{start}/{end} with one synthetic day per date"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.2
+    requests_served = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            StandInHandler.requests_served += 1
+        time.sleep(self.latency)
+
+        parts = urlparse(self.path).path.split('/')
+        location, start, end = parts[-3], parts[-2], parts[-1]
+        include_hours = 'hours' in parse_qs(urlparse(self.path).query).get('include', [''])[0]
+        self.send_json(make_payload(location, start, end, include_hours))
+
+    def send_json(self, data: dict):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_payload(location: str, start: str, end: str, include_hours: bool = False) -> dict:
+    """Visual Crossing shaped response"""
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    days = []
+    for i in range((last - first).days + 1):
+        day = (first + timedelta(days=i)).isoformat()
+        record = {"datetime": day, "tempmax": 32.0, "tempmin": 24.0, "temp": 27.5, "feelslike": 30.1,
+                  "dew": 23.0, "humidity": 80.0 + i % 10, "precip": 1.5, "windspeed": 10.0,
+                  "conditions": "Partially cloudy", "description": "Stand-in data"}
+        if include_hours:
+            record["hours"] = [{"datetime": f"{h:02d}:00:00", "temp": 25.0 + h / 10} for h in range(24)]
+        days.append(record)
+    return {"address": location, "resolvedAddress": location, "latitude": -6.2, "longitude": 106.8, "days": days}
+
+
+class StandInServer(ThreadingHTTPServer):
+    # The default listen backlog (5) drops bursts of concurrent connects
+    request_queue_size = 128
+
+    def stop(self):
+        """Stop serving and close the listening socket"""
+        self.shutdown()
+        self.server_close()
+
+
+def start_stand_in(handler=StandInHandler):
+    """Start the stand-in upstream on a free port; returns (server, base_url)"""
+    server = StandInServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/timeline"
+
+
+def with_service(test, handler=StandInHandler, limits=None, **options):
+    """
+    Run test(service) on a fresh WeatherService talking to the stand-in
+
+    The service gets a temporary archive and no retries unless options say
+    otherwise; limits are set on the "test" API key. Returns what test returns.
+    """
+    server, base_url = start_stand_in(handler)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            options.setdefault("max_retries", 0)
+            service = WeatherService(base_url=base_url, archive_file=os.path.join(tmp, "weather_archive.db"),
+                                     **options)
+            if limits:
+                service.limiter.configure("test", **limits)
+
+            async def run():
+                try:
+                    return await test(service)
+                finally:
+                    await service.aclose()
+
+            return asyncio.run(run())
+    finally:
+        server.stop()